@@ -14,12 +14,15 @@ db = None
 socketio = None # Añadir una instancia global para SocketIO
 scheduler = None # Añadir una instancia global para el scheduler
 
-def create_app(config_class):
+def create_app(config_class, background_workers: bool = False):
     """
     Factory pattern para crear la aplicación Flask
     
     Args:
         config_class: Clase de configuración a usar
+        background_workers: Iniciar el despachador ESP32 y el monitor de máquinas.
+                            Solo lo activa el servidor (run.py); los scripts de
+                            mantenimiento no reclaman comandos ni compiten por el liderazgo
         
     Returns:
         app: Instancia de la aplicación Flask configurada
@@ -31,20 +34,34 @@ def create_app(config_class):
     if not app.debug:
         logging.basicConfig(level=logging.INFO)
     
+    # Serialización JSON (orjson) para las respuestas
+    from app.utils.json_provider import configure_json
+    configure_json(app)
+    
     # Inicializar extensiones
     init_extensions(app) # Esto ahora inicializará SocketIO
     
     # Inicializar base de datos
     init_database(app)
     
+    # Aplicar índices declarados por los repositorios (una sola vez)
+    init_indexes(app)
+    
+    # Cargar directorio de dispositivos ESP32 en memoria
+    init_esp32_directory(app)
+    
     # Registrar blueprints
     register_blueprints(app)
     
+    # Registrar handlers de conexión de Socket.IO (salas por tienda)
+    register_socket_handlers(app)
+    
     # Configurar manejo de errores
     configure_error_handlers(app)
     
-    # Inicializar scheduler de monitoreo
-    init_scheduler(app)
+    # Inicializar scheduler de monitoreo y despachador ESP32 (solo en el servidor)
+    if background_workers:
+        init_scheduler(app)
     
     return app
 
@@ -55,17 +72,77 @@ def init_extensions(app):
     # Configurar JWT
     jwt = JWTManager(app)
     
+    # Configurar caché de perfiles de usuario
+    from app.utils.cache_utils import user_info_cache
+    user_info_cache.configure(app.config['USER_CACHE_MAX_ENTRIES'], app.config['USER_CACHE_TTL_SECONDS'])
+    
+    # Configurar pool de contraseñas (bcrypt)
+    from app.utils.password_hasher import password_hasher
+    password_hasher.configure(
+        app.config['BCRYPT_ROUNDS'],
+        app.config['PASSWORD_POOL_WORKERS'],
+        app.config['PASSWORD_POOL_QUEUE_LIMIT'],
+        app.config['PASSWORD_POOL_WAIT_SECONDS']
+    )
+    
+    # Configurar lista de tokens revocados
+    from app.services.token_blocklist import token_blocklist
+    token_blocklist.configure(app.config['TOKEN_REVOCATION_SYNC_SECONDS'])
+    
+    # Configurar clientes HTTP de los microservicios ESP32 y NFC
+    from app.utils.http_client import http_clients
+    http_clients.configure(
+        'esp32', app.config['ESP32_SERVICE_URL'], app.config['HTTP_POOL_SIZE'],
+        app.config['ESP32_CONNECT_TIMEOUT'], app.config['ESP32_READ_TIMEOUT']
+    )
+    http_clients.configure(
+        'nfc', app.config['NFC_SERVICE_URL'], app.config['HTTP_POOL_SIZE'],
+        app.config['NFC_CONNECT_TIMEOUT'], app.config['NFC_READ_TIMEOUT']
+    )
+    
+    # Configurar bandeja de comandos ESP32
+    from app.services.esp32_dispatcher import esp32_dispatcher
+    esp32_dispatcher.configure(
+        app.config['ESP32_OUTBOX_ENABLED'],
+        app.config['ESP32_OUTBOX_CONCURRENCY'],
+        app.config['ESP32_OUTBOX_MAX_ATTEMPTS'],
+        app.config['ESP32_OUTBOX_BACKOFF_SECONDS'],
+        app.config['ESP32_OUTBOX_MAX_BACKOFF_SECONDS'],
+        app.config['ESP32_OUTBOX_POLL_SECONDS']
+    )
+    
+    # Configurar agrupación de eventos de máquinas
+    from app.services.machine_events import machine_events
+    machine_events.configure(
+        app.config['MACHINE_EVENTS_COALESCE'],
+        app.config['MACHINE_EVENTS_WINDOW_MS'] / 1000,
+        app.config['MACHINE_EVENTS_LEGACY']
+    )
+    
     # Configurar CORS
     CORS(app, origins=app.config['CORS_ORIGINS'])
     
-    # Inicializar Flask-SocketIO
-    socketio = SocketIO(app, cors_allowed_origins=app.config['CORS_ORIGINS'])
+    # Inicializar Flask-SocketIO (con cola de mensajes, las emisiones llegan a los clientes de todos los workers)
+    message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    socketio = SocketIO(
+        app,
+        cors_allowed_origins=app.config['CORS_ORIGINS'],
+        message_queue=message_queue,
+        channel=app.config.get('SOCKETIO_CHANNEL', 'lavanderia-socketio')
+    )
+    if message_queue:
+        app.logger.info(f"Socket.IO con cola de mensajes {message_queue.split('://')[0]}://")
     
     # Configurar JWT callbacks
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        # Aquí podrías implementar una lista de tokens revocados
-        return False
+        # Verificación en memoria; los deltas se traen de MongoDB cada pocos segundos
+        return token_blocklist.is_revoked(jwt_payload.get('jti'), jwt_payload.get('sub'), jwt_payload.get('iat'))
+    
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        from app.utils.response_utils import error_response
+        return error_response('Token revocado', 401)
     
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -101,6 +178,31 @@ def init_database(app):
         app.logger.error(f"Error al conectar con MongoDB: {e}")
         raise
 
+def init_indexes(app):
+    """Aplicar una sola vez los índices de todos los repositorios y reportar diferencias"""
+    if not app.config.get('MONGODB_ENSURE_INDEXES', True):
+        app.logger.info("Creación de índices al iniciar deshabilitada (usar ensure_indexes.py)")
+        return
+    
+    from app.repositories.index_registry import index_registry
+    
+    index_registry.ensure_indexes()
+    
+    drift = index_registry.drift_report()
+    for collection_name, differences in drift.items():
+        app.logger.warning(f"Índices no declarados o distintos en '{collection_name}': {differences}")
+
+def init_esp32_directory(app):
+    """Cargar el directorio esp32_id -> URL para que los comandos a máquinas no consulten la base de datos"""
+    from app.repositories.esp32_directory import esp32_directory
+    
+    esp32_directory.configure(app.config['ESP32_DIRECTORY_TTL_SECONDS'])
+    try:
+        esp32_directory.load(get_db())
+    except Exception as e:
+        # Se reintentará en el primer comando
+        app.logger.error(f"Error al cargar el directorio de ESP32: {e}")
+
 def register_blueprints(app):
     """Registrar blueprints de la aplicación"""
     
@@ -130,6 +232,12 @@ def register_blueprints(app):
     app.register_blueprint(service_cycle_bp, url_prefix='/api')
     app.register_blueprint(sale_bp, url_prefix='/api')
 
+def register_socket_handlers(app):
+    """Registrar la autenticación de Socket.IO y las suscripciones por tienda y tema"""
+    from app.routes.socket_routes import register_socket_handlers as register_handlers
+    
+    register_handlers(socketio, app.config.get('SOCKETIO_REQUIRE_AUTH', True))
+
 def configure_error_handlers(app):
     """Configurar manejadores de errores"""
     
@@ -160,7 +268,10 @@ def get_db():
     return db
 
 def init_scheduler(app):
-    """Inicializar scheduler para monitoreo automático de máquinas"""
+    """
+    Inicializar planificador por fecha límite y barrido de reconciliación de máquinas.
+    Con varios workers o nodos solo los ejecuta el líder elegido con un lease en MongoDB.
+    """
     global scheduler
     
     try:
@@ -169,23 +280,54 @@ def init_scheduler(app):
             
             # Importar aquí para evitar imports circulares
             from app.services.machine_monitor import machine_monitor
+            from app.services.completion_scheduler import completion_scheduler
+            from app.services.monitor_leader import monitor_leader
             
-            # Programar verificación cada 30 segundos
-            scheduler.add_job(
-                func=machine_monitor.check_and_notify_completed_services,
-                trigger="interval",
-                seconds=30,
-                id='machine_monitor',
-                name='Monitor de máquinas y servicios',
-                replace_existing=True
-            )
+            # Despachador de la bandeja de comandos ESP32 (seguro con varios procesos: corre en todos)
+            from app.services.esp32_dispatcher import esp32_dispatcher
+            if esp32_dispatcher.enabled:
+                esp32_dispatcher.start()
+            
+            reconcile_seconds = app.config.get('MONITOR_RECONCILE_SECONDS', 300)
+            
+            def start_monitor():
+                # Planificador por fecha límite: dispara la finalización en el estimated_end_at exacto
+                completion_scheduler.start(machine_monitor.check_and_notify_completed_services)
+                seeded = machine_monitor.seed_deadlines()
+                app.logger.info(f"✅ Planificador de finalización iniciado con {seeded} servicios activos")
+                
+                # Barrido lento de reconciliación como red de seguridad
+                scheduler.add_job(
+                    func=machine_monitor.check_and_notify_completed_services,
+                    trigger="interval",
+                    seconds=reconcile_seconds,
+                    id='machine_monitor',
+                    name='Reconciliación de máquinas y servicios',
+                    replace_existing=True
+                )
+                app.logger.info(f"✅ Scheduler de reconciliación iniciado - verificando cada {reconcile_seconds} segundos")
             
-            # Iniciar scheduler
+            def stop_monitor():
+                completion_scheduler.stop()
+                if scheduler.get_job('machine_monitor'):
+                    scheduler.remove_job('machine_monitor')
+            
+            # Iniciar scheduler (sin tareas hasta que esta instancia sea líder)
             scheduler.start()
-            app.logger.info("✅ Scheduler de monitoreo iniciado - verificando cada 30 segundos")
+            
+            monitor_leader.configure(
+                app.config['MONITOR_LEADER_ELECTION'],
+                app.config['MONITOR_LEASE_SECONDS'],
+                app.config['MONITOR_HEARTBEAT_SECONDS']
+            )
+            monitor_leader.start(start_monitor, stop_monitor, machine_monitor.sync_deadlines)
             
             # Asegurar que el scheduler se cierre correctamente al terminar la aplicación
+            # (atexit ejecuta en orden inverso: primero se libera el lease)
             atexit.register(lambda: scheduler.shutdown() if scheduler else None)
+            atexit.register(completion_scheduler.stop)
+            atexit.register(esp32_dispatcher.stop)
+            atexit.register(monitor_leader.stop)
             
     except Exception as e:
         app.logger.error(f"❌ Error al inicializar scheduler: {e}")
@@ -11,6 +11,11 @@ from .store_repository import StoreRepository
 from .card_repository import CardRepository
 from .service_cycle_repository import ServiceCycleRepository
 from .sale_repository import SaleRepository
+from .active_service_repository import ActiveServiceRepository
+from .machine_repository import MachineRepository
+from .revoked_token_repository import RevokedTokenRepository
+from .esp32_command_repository import ESP32CommandRepository
+from .lease_repository import LeaseRepository
 
 __all__ = [
     # Repositorios existentes
@@ -25,5 +30,10 @@ __all__ = [
     # Repositorios nuevos (Segunda Fase)
     'CardRepository',
     'ServiceCycleRepository',
-    'SaleRepository'
+    'SaleRepository',
+    'ActiveServiceRepository',
+    'MachineRepository',
+    'RevokedTokenRepository',
+    'ESP32CommandRepository',
+    'LeaseRepository'
 ]
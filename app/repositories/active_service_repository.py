@@ -0,0 +1,254 @@
+from typing import Dict, Any, Optional, List
+from app.repositories.base_repository import BaseRepository
+from pymongo import IndexModel, ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+from bson import ObjectId
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ActiveServiceRepository(BaseRepository):
+    """
+    Índice materializado de servicios en curso (colección 'active_services').
+    Contiene una fila por servicio activo para que el monitor no tenga que
+    recorrer todo el historial de ventas.
+    """
+
+    def __init__(self):
+        super().__init__('active_services')
+
+    def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Obtener filtro basado en campos únicos para servicios activos
+
+        Args:
+            data: Datos del servicio activo
+
+        Returns:
+            Dict: Filtro basado en sale_id y service_index
+        """
+        filter_criteria = {}
+
+        if 'sale_id' in data and 'service_index' in data:
+            filter_criteria = {
+                'sale_id': str(data['sale_id']),
+                'service_index': int(data['service_index'])
+            }
+
+        return filter_criteria
+
+    def add_service(self, sale: Dict[str, Any], service_index: int, service: Dict[str, Any],
+                    started_at: Optional[datetime], estimated_end_at: Optional[datetime]) -> Optional[Dict[str, Any]]:
+        """
+        Registrar un servicio recién activado en el índice
+
+        Args:
+            sale: Venta a la que pertenece el servicio
+            service_index: Índice del servicio en la venta
+            service: Datos del servicio (machine_id, service_cycle_id, ...)
+            started_at: Hora de inicio del servicio
+            estimated_end_at: Hora estimada de finalización
+
+        Returns:
+            Dict: Fila del índice creada o actualizada
+        """
+        return self.upsert(self._build_row(sale, service_index, service, started_at, estimated_end_at))
+
+    def add_services(self, sale: Dict[str, Any], activations: List[Dict[str, Any]]) -> int:
+        """
+        Registrar varios servicios recién activados en una sola operación (bulk_write)
+
+        Args:
+            sale: Venta a la que pertenecen los servicios
+            activations: Servicios activados con service_index, service, started_at y estimated_end_at
+
+        Returns:
+            int: Número de filas creadas o actualizadas
+        """
+        if not activations:
+            return 0
+
+        now = datetime.utcnow()
+        operations = []
+        for activation in activations:
+            row = self._build_row(
+                sale, activation['service_index'], activation['service'],
+                activation.get('started_at'), activation.get('estimated_end_at')
+            )
+            row['updated_at'] = now
+            operations.append(UpdateOne(
+                {'sale_id': row['sale_id'], 'service_index': row['service_index']},
+                {'$set': row, '$setOnInsert': {'created_at': now}},
+                upsert=True
+            ))
+
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+
+        except PyMongoError as e:
+            logger.error(f"Error al registrar servicios activos de la venta {sale.get('_id')}: {e}")
+            raise
+
+    def remove_service(self, sale_id: str, service_index: int) -> bool:
+        """
+        Eliminar un servicio del índice (al completarse)
+
+        Args:
+            sale_id: ID de la venta
+            service_index: Índice del servicio en la venta
+
+        Returns:
+            bool: True si se eliminó la fila
+        """
+        try:
+            result = self.collection.delete_one({
+                'sale_id': str(sale_id),
+                'service_index': int(service_index)
+            })
+            return result.deleted_count > 0
+
+        except PyMongoError as e:
+            logger.error(f"Error al eliminar servicio activo {sale_id}/{service_index}: {e}")
+            raise
+
+    def remove_services(self, services: List[Dict[str, Any]]) -> int:
+        """
+        Eliminar varios servicios del índice en una sola operación
+
+        Args:
+            services: Servicios con sale_id y service_index
+
+        Returns:
+            int: Número de filas eliminadas
+        """
+        if not services:
+            return 0
+
+        try:
+            result = self.collection.delete_many({'$or': [
+                {'sale_id': str(service['sale_id']), 'service_index': int(service['service_index'])}
+                for service in services
+            ]})
+            return result.deleted_count
+
+        except PyMongoError as e:
+            logger.error(f"Error al eliminar {len(services)} servicios activos: {e}")
+            raise
+
+    def find_due_services(self, current_time: datetime) -> List[Dict[str, Any]]:
+        """
+        Obtener los servicios cuyo fin estimado ya pasó
+
+        Args:
+            current_time: Hora de referencia
+
+        Returns:
+            List: Servicios vencidos ordenados por estimated_end_at
+        """
+        cursor = self.collection.find(
+            {'estimated_end_at': {'$lte': current_time}}
+        ).sort('estimated_end_at', ASCENDING)
+        return [self._format_document(doc) for doc in cursor]
+
+    def find_updated_since(self, since: datetime) -> List[Dict[str, Any]]:
+        """
+        Obtener los servicios registrados o modificados desde un momento dado
+        (para que el líder del monitor conozca las fechas límite creadas en otros workers)
+
+        Args:
+            since: Momento a partir del cual buscar
+
+        Returns:
+            List: Servicios con sale_id, service_index y estimated_end_at
+        """
+        cursor = self.collection.find(
+            {'updated_at': {'$gte': since}},
+            {'sale_id': 1, 'service_index': 1, 'estimated_end_at': 1}
+        )
+        return [self._format_document(doc) for doc in cursor]
+
+    def find_all_active(self) -> List[Dict[str, Any]]:
+        """
+        Obtener todos los servicios en curso
+
+        Returns:
+            List: Servicios activos ordenados por estimated_end_at
+        """
+        cursor = self.collection.find({}).sort('estimated_end_at', ASCENDING)
+        return [self._format_document(doc) for doc in cursor]
+
+    def rebuild_from_sales(self, sale_repository) -> int:
+        """
+        Regenerar el índice completo a partir de la colección 'sales'
+
+        Args:
+            sale_repository: Repositorio de ventas (fuente de verdad)
+
+        Returns:
+            int: Número de servicios activos indexados
+        """
+        rows = []
+        for entry in sale_repository.get_active_services():
+            sale = {
+                '_id': entry['sale_id'],
+                'store_id': entry.get('store_id'),
+                'client_id': entry.get('client_id'),
+                'employee_id': entry.get('employee_id')
+            }
+            service = entry['service']
+            rows.append(self._build_row(
+                sale,
+                entry['service_index'],
+                service,
+                service.get('started_at'),
+                service.get('estimated_end_at')
+            ))
+
+        try:
+            self.collection.delete_many({})
+            if rows:
+                now = datetime.utcnow()
+                for row in rows:
+                    row['created_at'] = now
+                    row['updated_at'] = now
+                self.collection.insert_many(rows)
+            logger.info(f"Índice de servicios activos regenerado: {len(rows)} servicios")
+            return len(rows)
+
+        except PyMongoError as e:
+            logger.error(f"Error al regenerar índice de servicios activos: {e}")
+            raise
+
+    def _build_row(self, sale: Dict[str, Any], service_index: int, service: Dict[str, Any],
+                   started_at: Optional[datetime], estimated_end_at: Optional[datetime]) -> Dict[str, Any]:
+        """
+        Construir la fila del índice para un servicio
+        """
+        sale_id = sale['_id']
+        return {
+            'sale_id': str(sale_id) if isinstance(sale_id, ObjectId) else sale_id,
+            'service_index': int(service_index),
+            'machine_id': service.get('machine_id'),
+            'machine_type': service.get('machine_type'),
+            'service_cycle_id': service.get('service_cycle_id'),
+            'store_id': sale.get('store_id'),
+            'client_id': sale.get('client_id'),
+            'employee_id': sale.get('employee_id'),
+            'started_at': started_at,
+            'estimated_end_at': estimated_end_at
+        }
+
+    def get_indexes(self) -> List[IndexModel]:
+        """
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
+        """
+        indexes = [
+            IndexModel([('sale_id', ASCENDING), ('service_index', ASCENDING)], unique=True),
+            IndexModel([('estimated_end_at', ASCENDING)]),
+            IndexModel([('machine_id', ASCENDING)]),
+            IndexModel([('updated_at', ASCENDING)])
+        ]
+
+        return indexes
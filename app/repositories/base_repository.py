@@ -1,15 +1,28 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Union, cast
+from pymongo import IndexModel, ReturnDocument
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
-from bson import ObjectId
+from bson import ObjectId, json_util
 from datetime import datetime
 from decimal import Decimal
 from app import get_db
+from app.utils.identity_map_utils import get_identity_map, record_identity_map_lookup
+from app.utils.pagination_utils import encode_cursor, decode_cursor
+from app.utils.projection_utils import build_projection, strip_fields
+import copy
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Vigencia y tamaño máximo de los totales en caché para count='estimated' con filtro
+COUNT_CACHE_SECONDS = 30
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+# Totales en caché por (colección, filtro): (total, momento del conteo)
+_count_cache: Dict[Any, Any] = {}
+
 class BaseRepository(ABC):
     """
     Repositorio base con operaciones UPSERT para MongoDB
@@ -59,81 +72,152 @@ class BaseRepository(ABC):
                     # Si unique_filter_from_subclass es {}, final_filter seguirá siendo None, indicando inserción pura.
 
             if final_filter: # Si tenemos un filtro, es una operación de update/upsert
-                result = self.collection.update_one(
+                # Un solo viaje al servidor: actualizar y devolver el documento resultante
+                document = self.collection.find_one_and_update(
                     final_filter,
                     {'$set': insert_or_update_data},
-                    upsert=True
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
                 )
-                
-                if result.upserted_id:
-                    document = self.collection.find_one({'_id': result.upserted_id})
-                    logger.info(f"Documento creado en {self.collection_name}: {result.upserted_id}")
-                else:
-                    document = self.collection.find_one(final_filter)
-                    logger.info(f"Documento actualizado en {self.collection_name}")
+                logger.info(f"Documento creado/actualizado en {self.collection_name}")
             else: # No hay filtro final, es una inserción pura
                 result = self.collection.insert_one(insert_or_update_data)
-                document = self.collection.find_one({'_id': result.inserted_id})
+                # insert_one asigna el _id al propio diccionario; no hace falta releerlo
+                document = insert_or_update_data
                 logger.info(f"Documento insertado en {self.collection_name}: {result.inserted_id}")
 
             if document is None:
                 raise RuntimeError(f"No se pudo recuperar el documento después del upsert/insert en {self.collection_name}")
             
-            return cast(Dict[str, Any], self._format_document(document))
+            formatted_document = cast(Dict[str, Any], self._format_document(document))
+            self._remember(formatted_document)
+            return formatted_document
             
         except PyMongoError as e:
             logger.error(f"Error en upsert/insert de {self.collection_name}: {e}")
             raise
     
-    def find_by_id(self, document_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+    def find_by_id(self, document_id: Union[str, ObjectId], projection: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
         """
         Encontrar documento por ID
         
         Args:
             document_id: ID del documento
+            projection: Campos a leer (None = documento completo)
             
         Returns:
             Dict: Documento encontrado o None
         """
         try:
+            if projection:
+                # Los documentos parciales no pasan por el mapa de identidad
+                if isinstance(document_id, str):
+                    document_id = ObjectId(document_id)
+                document = self.collection.find_one({'_id': document_id}, build_projection(projection))
+                return self._format_document(document) if document else None
+            
+            # Reutilizar el documento si ya se cargó en este request
+            identity_map = get_identity_map(self.collection_name)
+            if identity_map is not None:
+                cached = identity_map.get(str(document_id))
+                record_identity_map_lookup(cached is not None)
+                if cached is not None:
+                    return copy.deepcopy(cached)
+            
             if isinstance(document_id, str):
                 document_id = ObjectId(document_id)
             
             document = self.collection.find_one({'_id': document_id})
-            return self._format_document(document) if document else None
+            if not document:
+                return None
+            
+            formatted_document = self._format_document(document)
+            self._remember(formatted_document)
+            return formatted_document
             
         except PyMongoError as e:
             logger.error(f"Error al buscar por ID en {self.collection_name}: {e}")
             raise
     
-    def find_one(self, filter_criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def find_by_ids(self, document_ids: List[Union[str, ObjectId]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Encontrar varios documentos por ID con una sola consulta $in
+        
+        Args:
+            document_ids: IDs de los documentos (los IDs inválidos se ignoran)
+            
+        Returns:
+            Dict: Documentos encontrados indexados por su ID en texto
+        """
+        try:
+            found: Dict[str, Dict[str, Any]] = {}
+            identity_map = get_identity_map(self.collection_name)
+            
+            object_ids = []
+            for document_id in document_ids:
+                # Reutilizar los documentos ya cargados en este request
+                if identity_map is not None:
+                    cached = identity_map.get(str(document_id))
+                    record_identity_map_lookup(cached is not None)
+                    if cached is not None:
+                        found[str(document_id)] = copy.deepcopy(cached)
+                        continue
+                
+                if isinstance(document_id, ObjectId):
+                    object_ids.append(document_id)
+                elif ObjectId.is_valid(document_id):
+                    object_ids.append(ObjectId(document_id))
+            
+            if not object_ids:
+                return found
+            
+            cursor = self.collection.find({'_id': {'$in': list(set(object_ids))}})
+            for document in cursor:
+                formatted_document = self._format_document(document)
+                self._remember(formatted_document)
+                found[formatted_document['_id']] = formatted_document
+            return found
+            
+        except PyMongoError as e:
+            logger.error(f"Error al buscar por IDs en {self.collection_name}: {e}")
+            raise
+    
+    def find_one(self, filter_criteria: Dict[str, Any], projection: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
         """
         Encontrar un documento por criterios
         
         Args:
             filter_criteria: Criterios de búsqueda
+            projection: Campos a leer (None = documento completo)
             
         Returns:
             Dict: Documento encontrado o None
         """
         try:
-            document = self.collection.find_one(filter_criteria)
+            document = self.collection.find_one(filter_criteria, build_projection(projection))
             return self._format_document(document) if document else None
             
         except PyMongoError as e:
             logger.error(f"Error al buscar en {self.collection_name}: {e}")
             raise
     
-    def find_many(self, filter_criteria: Dict[str, Any] = None, page: int = 1, per_page: int = 10, sort_by: str = 'created_at', sort_order: int = -1) -> Dict[str, Any]:
+    def find_many(self, filter_criteria: Dict[str, Any] = None, page: int = 1, per_page: int = 10, sort_by: str = 'created_at', sort_order: int = -1, after: Optional[str] = None, count: str = 'exact', projection: Optional[List[str]] = None, raw: bool = False) -> Dict[str, Any]:
         """
-        Encontrar múltiples documentos con paginación
+        Encontrar múltiples documentos con paginación.
+        Por página (skip/limit) por defecto; por cursor (keyset sobre sort_by + _id)
+        si se indica 'after' (cadena vacía = primera página).
         
         Args:
             filter_criteria: Criterios de búsqueda
-            page: Página actual
+            page: Página actual (solo paginación por página)
             per_page: Elementos por página
             sort_by: Campo para ordenar
             sort_order: Orden de clasificación (1 ascendente, -1 descendente)
+            after: Cursor devuelto como next_cursor por la página anterior
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            projection: Campos a leer (None = documentos completos)
+            raw: Devolver los documentos tal como llegan de pymongo (ObjectId, Decimal128),
+                 sin _format_document; los serializa el proveedor JSON de la aplicación
             
         Returns:
             Dict: Documentos encontrados con información de paginación
@@ -141,28 +225,131 @@ class BaseRepository(ABC):
         try:
             filter_criteria = filter_criteria or {}
             
+            if after is not None:
+                return self._find_page_after(filter_criteria, per_page, sort_by, sort_order, after, count, projection, raw)
+            
             # Calcular skip para paginación
             skip = (page - 1) * per_page
             
             # Obtener documentos con paginación
-            cursor = self.collection.find(filter_criteria).sort(sort_by, sort_order).skip(skip).limit(per_page)
-            documents = [self._format_document(doc) for doc in cursor]
+            cursor = self.collection.find(filter_criteria, build_projection(projection)).sort(sort_by, sort_order).skip(skip).limit(per_page)
+            documents = list(cursor) if raw else [self._format_document(doc) for doc in cursor]
             
             # Contar total de documentos
-            total = self.collection.count_documents(filter_criteria)
+            total = self._count(filter_criteria, count)
             
             return {
                 'documents': documents,
                 'total': total,
                 'page': page,
                 'per_page': per_page,
-                'total_pages': (total + per_page - 1) // per_page
+                'total_pages': (total + per_page - 1) // per_page if total is not None else None
             }
             
         except PyMongoError as e:
             logger.error(f"Error al buscar múltiples en {self.collection_name}: {e}")
             raise
     
+    def _find_page_after(self, filter_criteria: Dict[str, Any], per_page: int, sort_by: str, sort_order: int, after: str, count: str, projection: Optional[List[str]] = None, raw: bool = False) -> Dict[str, Any]:
+        """
+        Obtener una página por cursor: se pide un documento extra para saber si hay más.
+        El campo de orden se lee siempre para poder generar next_cursor.
+        """
+        find_projection = build_projection(projection, required=[sort_by])
+        # El campo de orden solo se lee para el cursor: no devolverlo si no se pidió
+        cursor_only = set(find_projection) - set(build_projection(projection)) if find_projection else set()
+        cursor = self.collection.find(
+            self._keyset_filter(filter_criteria, sort_by, sort_order, after),
+            find_projection
+        ) \
+            .sort([(sort_by, sort_order), ('_id', sort_order)]) \
+            .limit(per_page + 1)
+        documents = list(cursor)
+        
+        has_more = len(documents) > per_page
+        documents = documents[:per_page]
+        next_cursor = self._next_cursor(documents[-1], sort_by) if has_more else None
+        strip_fields(documents, cursor_only)
+        
+        return {
+            'documents': documents if raw else [self._format_document(doc) for doc in documents],
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'total': self._count(filter_criteria, count)
+        }
+    
+    def _keyset_filter(self, filter_criteria: Dict[str, Any], sort_by: str, sort_order: int, after: str) -> Dict[str, Any]:
+        """
+        Combinar el filtro con la condición "después del cursor" sobre (sort_by, _id).
+        El campo de orden debe existir en todos los documentos (p. ej. created_at).
+        
+        Args:
+            filter_criteria: Criterios de búsqueda
+            sort_by: Campo de ordenamiento
+            sort_order: Orden de clasificación
+            after: Cursor (vacío = primera página)
+            
+        Returns:
+            Dict: Filtro para la página siguiente
+        """
+        if not after:
+            return filter_criteria
+        
+        sort_value, last_id = decode_cursor(after)
+        operator = '$lt' if sort_order < 0 else '$gt'
+        keyset = {
+            '$or': [
+                {sort_by: {operator: sort_value}},
+                {sort_by: sort_value, '_id': {operator: last_id}}
+            ]
+        }
+        
+        if not filter_criteria:
+            return keyset
+        return {'$and': [filter_criteria, keyset]}
+    
+    def _next_cursor(self, document: Dict[str, Any], sort_by: str) -> str:
+        """
+        Generar el cursor del último documento de la página (antes de formatearlo)
+        """
+        sort_value: Any = document
+        for part in sort_by.split('.'):
+            sort_value = sort_value.get(part) if isinstance(sort_value, dict) else None
+        return encode_cursor(sort_value, document['_id'])
+    
+    def _count(self, filter_criteria: Dict[str, Any], count: str = 'exact') -> Optional[int]:
+        """
+        Contar documentos según el modo solicitado
+        
+        Args:
+            filter_criteria: Criterios de búsqueda
+            count: 'exact' (count_documents), 'estimated' (metadatos de la colección
+                   sin filtro o conteo en caché por COUNT_CACHE_SECONDS) o 'none'
+            
+        Returns:
+            int: Total de documentos o None si no se solicitó
+        """
+        if count == 'none':
+            return None
+        
+        if count == 'estimated':
+            if not filter_criteria:
+                return self.collection.estimated_document_count()
+            
+            cache_key = (self.collection_name, json_util.dumps(filter_criteria, sort_keys=True))
+            cached = _count_cache.get(cache_key)
+            if cached and time.monotonic() - cached[1] < COUNT_CACHE_SECONDS:
+                return cached[0]
+            
+            total = self.collection.count_documents(filter_criteria)
+            if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+                _count_cache.clear()
+            _count_cache[cache_key] = (total, time.monotonic())
+            return total
+        
+        return self.collection.count_documents(filter_criteria)
+    
     def delete_by_id(self, document_id: Union[str, ObjectId]) -> bool:
         """
         Eliminar documento por ID
@@ -178,6 +365,7 @@ class BaseRepository(ABC):
                 document_id = ObjectId(document_id)
             
             result = self.collection.delete_one({'_id': document_id})
+            self._forget(document_id)
             
             if result.deleted_count > 0:
                 logger.info(f"Documento eliminado de {self.collection_name}: {document_id}")
@@ -207,6 +395,7 @@ class BaseRepository(ABC):
                 {'_id': document_id},
                 {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}}
             )
+            self._forget(document_id)
             
             if result.modified_count > 0:
                 logger.info(f"Documento marcado como inactivo en {self.collection_name}: {document_id}")
@@ -227,28 +416,53 @@ class BaseRepository(ABC):
             update_operators: Diccionario de operadores de actualización de MongoDB (ej. {'$set': {...}, '$unset': {...}}).
             
         Returns:
-            Dict: Documento actualizado o None.
+            Dict: Documento actualizado o None si no existe.
         """
         try:
             if isinstance(document_id, str):
                 document_id = ObjectId(document_id)
 
-            result = self.collection.update_one(
+            updated_document = self.collection.find_one_and_update(
                 {'_id': document_id},
-                update_operators
+                update_operators,
+                return_document=ReturnDocument.AFTER
             )
 
-            if result.modified_count > 0:
-                updated_document = self.collection.find_one({'_id': document_id})
+            if updated_document:
                 logger.info(f"Documento actualizado en {self.collection_name} por ID: {document_id}")
-                return cast(Dict[str, Any], self._format_document(updated_document))
+                formatted_document = cast(Dict[str, Any], self._format_document(updated_document))
+                self._remember(formatted_document)
+                return formatted_document
             
+            self._forget(document_id)
             return None
 
         except PyMongoError as e:
             logger.error(f"Error al actualizar documento por ID en {self.collection_name}: {e}")
             raise
 
+    def _remember(self, document: Optional[Dict[str, Any]]) -> None:
+        """
+        Guardar un documento en el mapa de identidad del request (si está activo)
+        
+        Args:
+            document: Documento ya formateado
+        """
+        identity_map = get_identity_map(self.collection_name)
+        if identity_map is not None and document and '_id' in document:
+            identity_map[str(document['_id'])] = copy.deepcopy(document)
+    
+    def _forget(self, document_id: Union[str, ObjectId]) -> None:
+        """
+        Quitar un documento del mapa de identidad del request (si está activo)
+        
+        Args:
+            document_id: ID del documento
+        """
+        identity_map = get_identity_map(self.collection_name)
+        if identity_map is not None:
+            identity_map.pop(str(document_id), None)
+
     def _prepare_update_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Preparar datos para actualización
@@ -321,9 +535,26 @@ class BaseRepository(ABC):
         """
         pass
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para la colección
+        Índices declarados para la colección
         Debe ser implementado por cada repositorio específico
+        
+        Returns:
+            List: Modelos de índice de la colección
         """
-        pass
+        return []
+    
+    def create_indexes(self) -> List[str]:
+        """
+        Aplicar los índices declarados en la colección.
+        No se llama al construir el repositorio: el registro de índices
+        (index_registry) los aplica una sola vez al iniciar la aplicación.
+        
+        Returns:
+            List: Nombres de los índices aplicados
+        """
+        indexes = self.get_indexes()
+        if not indexes:
+            return []
+        return self.collection.create_indexes(indexes)
@@ -1,6 +1,7 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.base_repository import BaseRepository
-from pymongo import IndexModel, ASCENDING
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
 from bson import ObjectId
 import random
 import string
@@ -14,9 +15,11 @@ class CardRepository(BaseRepository):
     Repositorio para tarjetas recargables con operaciones UPSERT
     """
     
+    # Saldo máximo permitido en una tarjeta
+    MAX_BALANCE = 1000
+    
     def __init__(self):
         super().__init__('cards')
-        self.create_indexes()
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -82,7 +85,7 @@ class CardRepository(BaseRepository):
     
     def update_balance(self, card_id: str, amount: float, operation: str) -> Optional[Dict[str, Any]]:
         """
-        Actualizar saldo de tarjeta
+        Actualizar saldo de tarjeta de forma atómica
         
         Args:
             card_id: ID de la tarjeta
@@ -90,32 +93,96 @@ class CardRepository(BaseRepository):
             operation: Tipo de operación (add, subtract)
             
         Returns:
-            Dict: Tarjeta actualizada o None
+            Dict: Tarjeta actualizada o None si la tarjeta no existe, está inactiva,
+                  no tiene saldo suficiente o se excedería el límite
         """
-        card = self.find_by_id(card_id)
-        if not card:
-            return None
-        
-        current_balance = float(card.get('balance', 0))
-        new_balance = current_balance
-        
         if operation == 'add':
-            new_balance = current_balance + amount
+            return self.credit_card(card_id, amount)
         elif operation == 'subtract':
-            new_balance = max(0, current_balance - amount)
+            return self.charge_card(card_id, amount)
         
-        # Validar límites
-        if new_balance > 1000:
-            return None
+        return None
+    
+    def charge_card(self, card_id: str, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        Descontar saldo de una tarjeta por ID en un solo viaje a la base de datos
         
-        # Actualizar saldo usando upsert
-        updated_data = {
-            '_id': card_id,
-            'balance': new_balance,
-            'last_used': self._get_current_datetime()
-        }
+        Args:
+            card_id: ID de la tarjeta
+            amount: Monto a descontar
+            
+        Returns:
+            Dict: Tarjeta actualizada o None si no se pudo cobrar
+        """
+        card_filter = {'_id': ObjectId(card_id) if isinstance(card_id, str) else card_id}
+        return self._apply_balance_delta(card_filter, -amount)
+    
+    def charge_nfc_card(self, nfc_uid: str, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        Descontar saldo de una tarjeta por UID NFC en un solo viaje a la base de datos
         
-        return self.upsert(updated_data)
+        Args:
+            nfc_uid: UID físico de la tarjeta NFC
+            amount: Monto a descontar
+            
+        Returns:
+            Dict: Tarjeta actualizada o None si no se pudo cobrar
+        """
+        return self._apply_balance_delta({'nfc_uid': nfc_uid}, -amount)
+    
+    def credit_card(self, card_id: str, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        Abonar saldo a una tarjeta por ID respetando el saldo máximo
+        
+        Args:
+            card_id: ID de la tarjeta
+            amount: Monto a abonar
+            
+        Returns:
+            Dict: Tarjeta actualizada o None si no se pudo abonar
+        """
+        card_filter = {'_id': ObjectId(card_id) if isinstance(card_id, str) else card_id}
+        return self._apply_balance_delta(card_filter, amount)
+    
+    def _apply_balance_delta(self, card_filter: Dict[str, Any], delta: float) -> Optional[Dict[str, Any]]:
+        """
+        Aplicar un $inc condicional al saldo: la verificación de saldo/límite y la
+        actualización ocurren en la misma operación, sin pérdidas por concurrencia.
+        
+        Args:
+            card_filter: Filtro que identifica la tarjeta
+            delta: Monto a sumar (negativo para cobros)
+            
+        Returns:
+            Dict: Tarjeta actualizada o None si la condición no se cumplió
+        """
+        condition = dict(card_filter)
+        condition['is_active'] = True
+        if delta < 0:
+            condition['balance'] = {'$gte': -delta}
+        else:
+            condition['balance'] = {'$lte': self.MAX_BALANCE - delta}
+        
+        try:
+            now = self._get_current_datetime()
+            card = self.collection.find_one_and_update(
+                condition,
+                {
+                    '$inc': {'balance': delta},
+                    '$set': {'last_used': now, 'updated_at': now}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if not card:
+                return None
+            
+            formatted_card = self._format_document(card)
+            self._remember(formatted_card)
+            return formatted_card
+            
+        except PyMongoError as e:
+            logger.error(f"Error al actualizar saldo en {self.collection_name}: {e}")
+            raise
     
     def transfer_balance(self, from_card_id: str, to_card_id: str, amount: float) -> Dict[str, Any]:
         """
@@ -146,12 +213,17 @@ class CardRepository(BaseRepository):
         
         # Verificar límite de tarjeta destino
         to_balance = float(to_card.get('balance', 0))
-        if to_balance + amount > 1000:
+        if to_balance + amount > self.MAX_BALANCE:
             return {'success': False, 'message': 'La transferencia excedería el límite de la tarjeta destino'}
         
-        # Realizar transferencia
-        self.update_balance(from_card_id, amount, 'subtract')
-        self.update_balance(to_card_id, amount, 'add')
+        # Realizar transferencia (cada movimiento es un $inc condicional)
+        if not self.charge_card(from_card_id, amount):
+            return {'success': False, 'message': 'Saldo insuficiente'}
+        
+        if not self.credit_card(to_card_id, amount):
+            # Compensar el cobro si el abono no pudo aplicarse
+            self.credit_card(from_card_id, amount)
+            return {'success': False, 'message': 'La transferencia excedería el límite de la tarjeta destino'}
         
         return {'success': True, 'message': 'Transferencia realizada exitosamente'}
     
@@ -202,9 +274,9 @@ class CardRepository(BaseRepository):
         
         return {'valid': True, 'message': 'Tarjeta válida para pago'}
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('card_number', ASCENDING)], unique=True),
@@ -213,7 +285,7 @@ class CardRepository(BaseRepository):
             IndexModel([('created_at', ASCENDING)])
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
     
     def _get_current_datetime(self):
         """
@@ -347,35 +419,9 @@ class CardRepository(BaseRepository):
         logger.info(f"🔍 [card_repository] Parámetros: nfc_uid={nfc_uid}, amount={amount}")
         
         try:
-            # Buscar tarjeta por UID NFC
-            logger.info(f"🔍 [card_repository] Buscando tarjeta con UID NFC: {nfc_uid}")
-            card = self.find_by_nfc_uid(nfc_uid)
-            
-            if not card:
-                logger.warning(f"⚠️ [card_repository] Tarjeta NFC no encontrada: {nfc_uid}")
-                return {
-                    'success': False,
-                    'message': 'Tarjeta NFC no encontrada'
-                }
-            
-            logger.info(f"✅ [card_repository] Tarjeta encontrada: {card.get('card_number')}")
-            
-            # Validar nuevamente antes de procesar
-            logger.info(f"🔍 [card_repository] Validando pago antes de procesar")
-            validation = self.validate_nfc_payment(nfc_uid, amount)
-            if not validation['valid']:
-                logger.warning(f"⚠️ [card_repository] Validación fallida: {validation['message']}")
-                return {
-                    'success': False,
-                    'message': validation['message']
-                }
-            
-            logger.info(f"✅ [card_repository] Validación exitosa, procediendo a descontar saldo")
-            
-            # Descontar saldo
-            card_id = str(card['_id'])
-            logger.info(f"💰 [card_repository] Descontando ${amount:.2f} de la tarjeta {card_id}")
-            updated_card = self.update_balance(card_id, amount, 'subtract')
+            # Cobro atómico: existencia, estado y saldo se verifican en la misma operación
+            logger.info(f"💰 [card_repository] Descontando ${amount:.2f} de la tarjeta NFC {nfc_uid}")
+            updated_card = self.charge_nfc_card(nfc_uid, amount)
             
             if updated_card:
                 logger.info(f"✅ [card_repository] Pago procesado exitosamente. Nuevo saldo: ${updated_card['balance']:.2f}")
@@ -389,16 +435,33 @@ class CardRepository(BaseRepository):
                         'nfc_uid': nfc_uid
                     }
                 }
-            else:
-                logger.error(f"❌ [card_repository] Error al actualizar saldo de la tarjeta")
+            
+            # El cobro no se aplicó: consultar la tarjeta solo para explicar el motivo
+            card = self.find_one({'nfc_uid': nfc_uid})
+            if not card:
+                logger.warning(f"⚠️ [card_repository] Tarjeta NFC no encontrada: {nfc_uid}")
                 return {
                     'success': False,
-                    'message': 'Error al procesar el pago'
+                    'message': 'Tarjeta NFC no encontrada'
                 }
+            
+            if not card.get('is_active', False):
+                logger.warning(f"⚠️ [card_repository] Tarjeta inactiva: {card.get('card_number')}")
+                return {
+                    'success': False,
+                    'message': 'Tarjeta inactiva'
+                }
+            
+            balance = float(card.get('balance', 0))
+            logger.warning(f"⚠️ [card_repository] Saldo insuficiente: ${balance:.2f} < ${amount:.2f}")
+            return {
+                'success': False,
+                'message': f'Saldo insuficiente. Disponible: ${balance:.2f}'
+            }
                 
         except Exception as e:
             logger.error(f"❌ [card_repository] Error procesando pago NFC: {e}")
             return {
                 'success': False,
                 'message': 'Error interno al procesar pago'
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,236 @@
+from typing import Dict, Any, Optional, List
+from app.repositories.base_repository import BaseRepository
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+from bson import ObjectId
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Estados de un comando: pendiente de envío, en envío, entregado, fallido
+# (sin más reintentos), reemplazado por uno más nuevo o vencido antes de enviarse
+COMMAND_STATUSES = ('pending', 'in_progress', 'delivered', 'failed', 'superseded', 'expired')
+
+# Días que se conservan los comandos terminados (índice TTL sobre finished_at)
+FINISHED_RETENTION_DAYS = 7
+
+class ESP32CommandRepository(BaseRepository):
+    """
+    Bandeja de salida (outbox) de comandos a los ESP32 (colección 'esp32_commands').
+    Las ventas y el monitor registran aquí los comandos y el despachador
+    (esp32_dispatcher) los entrega en segundo plano con reintentos.
+    """
+
+    def __init__(self):
+        super().__init__('esp32_commands')
+
+    def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Los comandos siempre se insertan (no hay filtro único de negocio)
+        """
+        return {}
+
+    def enqueue(self, command: str, esp32_id: str, machine_id: str, payload: Dict[str, Any],
+                sale_id: Optional[str] = None, service_index: Optional[int] = None,
+                expires_at: Optional[datetime] = None, store_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Registrar un comando y reemplazar los pendientes anteriores de la misma máquina
+        (solo importa el estado más reciente que se pidió para la máquina)
+
+        Args:
+            command: 'start' o 'stop'
+            esp32_id: ID del ESP32 de la máquina
+            machine_id: ID de la máquina
+            payload: Datos del comando (machine_data de ESP32Service)
+            sale_id: Venta asociada
+            service_index: Índice del servicio en la venta
+            expires_at: Momento a partir del cual el comando ya no tiene sentido
+            store_id: Tienda de la máquina
+
+        Returns:
+            Dict: Comando registrado
+        """
+        now = datetime.utcnow()
+        document = {
+            'command': command,
+            'esp32_id': str(esp32_id),
+            'machine_id': str(machine_id),
+            'payload': payload,
+            'sale_id': str(sale_id) if sale_id is not None else None,
+            'service_index': service_index,
+            'store_id': str(store_id) if store_id is not None else None,
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'expires_at': expires_at,
+            'last_error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        try:
+            document['_id'] = self.collection.insert_one(document).inserted_id
+            superseded = self.collection.update_many(
+                {'machine_id': str(machine_id), 'status': 'pending', '_id': {'$lt': document['_id']}},
+                {'$set': {'status': 'superseded', 'finished_at': now, 'updated_at': now}}
+            )
+            if superseded.modified_count:
+                logger.info(f"{superseded.modified_count} comandos pendientes reemplazados para máquina {machine_id}")
+            return document
+
+        except PyMongoError as e:
+            logger.error(f"Error al registrar comando ESP32 para máquina {machine_id}: {e}")
+            raise
+
+    def claim_due(self, limit: int, lease_seconds: float, exclude_machines: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Tomar (de forma atómica entre procesos) comandos listos para enviar.
+        También se retoman comandos 'in_progress' cuyo lease venció (proceso caído).
+
+        Args:
+            limit: Máximo de comandos a tomar
+            lease_seconds: Tiempo reservado para enviar cada comando
+            exclude_machines: Máquinas con un comando en envío en este proceso
+
+        Returns:
+            List: Comandos tomados (attempts ya incrementado)
+        """
+        claimed: List[Dict[str, Any]] = []
+        busy = set(exclude_machines or [])
+
+        try:
+            while len(claimed) < limit:
+                now = datetime.utcnow()
+                filter_criteria: Dict[str, Any] = {
+                    '$or': [
+                        {'status': 'pending', 'next_attempt_at': {'$lte': now}},
+                        {'status': 'in_progress', 'lease_until': {'$lt': now}}
+                    ]
+                }
+                if busy:
+                    filter_criteria['machine_id'] = {'$nin': list(busy)}
+
+                command = self.collection.find_one_and_update(
+                    filter_criteria,
+                    {
+                        '$set': {
+                            'status': 'in_progress',
+                            'lease_until': now + timedelta(seconds=lease_seconds),
+                            'updated_at': now
+                        },
+                        '$inc': {'attempts': 1}
+                    },
+                    sort=[('next_attempt_at', ASCENDING)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if not command:
+                    break
+
+                claimed.append(command)
+                busy.add(command['machine_id'])
+
+            return claimed
+
+        except PyMongoError as e:
+            logger.error(f"Error al tomar comandos ESP32: {e}")
+            raise
+
+    def mark_delivered(self, command_id: ObjectId, response: Optional[Dict[str, Any]] = None) -> None:
+        """Marcar un comando como entregado"""
+        self._finish(command_id, 'delivered', {'response': response})
+
+    def mark_failed(self, command_id: ObjectId, error: str) -> None:
+        """Marcar un comando como fallido (sin más reintentos)"""
+        self._finish(command_id, 'failed', {'last_error': error})
+
+    def mark_expired(self, command_id: ObjectId) -> None:
+        """Marcar un comando como vencido antes de enviarse"""
+        self._finish(command_id, 'expired', {})
+
+    def mark_superseded(self, command_id: ObjectId) -> None:
+        """Marcar un comando como reemplazado por uno más nuevo de la misma máquina"""
+        self._finish(command_id, 'superseded', {})
+
+    def has_newer_command(self, command: Dict[str, Any]) -> bool:
+        """
+        Verificar si se registró un comando más nuevo para la misma máquina
+
+        Args:
+            command: Comando en envío
+
+        Returns:
+            bool: True si el comando quedó obsoleto
+        """
+        return self.collection.find_one(
+            {'machine_id': command['machine_id'], '_id': {'$gt': command['_id']}},
+            {'_id': 1}
+        ) is not None
+
+    def schedule_retry(self, command_id: ObjectId, error: str, next_attempt_at: datetime) -> None:
+        """
+        Devolver un comando a la cola para reintentarlo más tarde
+
+        Args:
+            command_id: ID del comando
+            error: Error del último intento
+            next_attempt_at: Momento del siguiente intento
+        """
+        try:
+            self.collection.update_one(
+                {'_id': command_id, 'status': 'in_progress'},
+                {
+                    '$set': {
+                        'status': 'pending',
+                        'last_error': error,
+                        'next_attempt_at': next_attempt_at,
+                        'updated_at': datetime.utcnow()
+                    },
+                    '$unset': {'lease_until': ''}
+                }
+            )
+        except PyMongoError as e:
+            logger.error(f"Error al reprogramar comando ESP32 {command_id}: {e}")
+            raise
+
+    def count_by_status(self) -> Dict[str, int]:
+        """
+        Contar comandos por estado
+
+        Returns:
+            Dict: Número de comandos por estado
+        """
+        return {
+            row['_id']: row['count']
+            for row in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+        }
+
+    def _finish(self, command_id: ObjectId, status: str, fields: Dict[str, Any]) -> None:
+        """Cerrar un comando en envío con su estado final"""
+        now = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {'_id': command_id, 'status': 'in_progress'},
+                {
+                    '$set': {'status': status, 'finished_at': now, 'updated_at': now, **fields},
+                    '$unset': {'lease_until': ''}
+                }
+            )
+        except PyMongoError as e:
+            logger.error(f"Error al cerrar comando ESP32 {command_id} como {status}: {e}")
+            raise
+
+    def get_indexes(self) -> List[IndexModel]:
+        """
+        Índices de la bandeja de comandos
+
+        Returns:
+            List: Modelos de índice de la colección
+        """
+        return [
+            IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)]),
+            IndexModel([("machine_id", ASCENDING), ("status", ASCENDING)]),
+            # Los comandos terminados se eliminan tras FINISHED_RETENTION_DAYS
+            IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=FINISHED_RETENTION_DAYS * 86400)
+        ]
@@ -0,0 +1,114 @@
+from typing import Any, Dict, Optional
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Colección con la URL de cada ESP32: { esp32_id: "100", esp32_url: "http://...", is_active: true }
+ESP32_CONFIG_COLLECTION = 'esp32_config'
+
+class ESP32Directory:
+    """
+    Directorio en memoria que asocia cada esp32_id con su URL. Se carga con
+    una sola consulta a 'esp32_config' y se recarga cuando vence su vigencia
+    (ttl_seconds) o cuando se pide un esp32_id desconocido, de modo que enviar
+    un comando a una máquina no consulta la base de datos.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, miss_reload_seconds: float = 5):
+        self.ttl_seconds = ttl_seconds
+        self.miss_reload_seconds = miss_reload_seconds
+        self._entries: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def configure(self, ttl_seconds: float) -> None:
+        """
+        Ajustar la vigencia del directorio
+
+        Args:
+            ttl_seconds: Segundos antes de recargar el directorio completo
+        """
+        self.ttl_seconds = ttl_seconds
+
+    def resolve(self, db, esp32_id: Any) -> Optional[str]:
+        """
+        Obtener la URL de un ESP32
+
+        Args:
+            db: Base de datos para cargar el directorio si hace falta
+            esp32_id: ID del ESP32 (campo esp32_id de la máquina)
+
+        Returns:
+            str: URL del ESP32 o None si no está configurado
+        """
+        age = time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        if age is None or age >= self.ttl_seconds:
+            self._reload(db)
+            return self.lookup(esp32_id)
+
+        url = self.lookup(esp32_id)
+        if url is None and age >= self.miss_reload_seconds:
+            # ESP32 configurado después de la última carga: recargar (como mucho cada miss_reload_seconds)
+            self._reload(db)
+            url = self.lookup(esp32_id)
+        return url
+
+    def lookup(self, esp32_id: Any) -> Optional[str]:
+        """Obtener la URL de un ESP32 sin consultar la base de datos"""
+        return self._entries.get(str(esp32_id))
+
+    def load(self, db) -> int:
+        """
+        Cargar el directorio completo con una sola consulta.
+        Si un esp32_id tiene varios documentos se prefiere el activo.
+
+        Args:
+            db: Base de datos
+
+        Returns:
+            int: Número de ESP32 cargados
+        """
+        entries: Dict[str, str] = {}
+        active_ids = set()
+        for doc in db[ESP32_CONFIG_COLLECTION].find({}, {'esp32_id': 1, 'esp32_url': 1, 'url': 1, 'is_active': 1}):
+            esp32_id = str(doc.get('esp32_id'))
+            url = doc.get('esp32_url') or doc.get('url')
+            if not url or esp32_id in active_ids:
+                continue
+            is_active = bool(doc.get('is_active'))
+            if is_active or esp32_id not in entries:
+                entries[esp32_id] = url
+            if is_active:
+                active_ids.add(esp32_id)
+
+        with self._lock:
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Directorio de ESP32 cargado: {len(entries)} dispositivos")
+        return len(entries)
+
+    def clear(self) -> None:
+        """Vaciar el directorio (se recargará en el siguiente uso)"""
+        with self._lock:
+            self._entries = {}
+            self._loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _reload(self, db) -> None:
+        """Recargar el directorio conservando el anterior si la consulta falla"""
+        try:
+            self.load(db)
+        except Exception as e:
+            logger.error(f"Error al cargar el directorio de ESP32: {e}")
+            # Reintentar tras miss_reload_seconds en lugar de en cada comando
+            with self._lock:
+                self._loaded_at = time.monotonic() - max(self.ttl_seconds - self.miss_reload_seconds, 0)
+
+# Instancia global del directorio de ESP32
+esp32_directory = ESP32Directory()
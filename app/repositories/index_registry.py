@@ -0,0 +1,138 @@
+from typing import Dict, Any, List, Type
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+from app.repositories.base_repository import BaseRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IndexRegistry:
+    """
+    Registro central de los índices declarados por los repositorios.
+    Los índices se aplican una sola vez (al iniciar la aplicación o con
+    ensure_indexes.py) en lugar de en cada construcción de un repositorio.
+    """
+
+    def __init__(self):
+        self._repository_classes: List[Type[BaseRepository]] = []
+        self._defaults_registered = False
+
+    def register(self, repository_class: Type[BaseRepository]) -> Type[BaseRepository]:
+        """
+        Registrar un repositorio cuyos índices deben aplicarse
+
+        Args:
+            repository_class: Clase del repositorio
+
+        Returns:
+            La misma clase (permite usarlo como decorador)
+        """
+        if repository_class not in self._repository_classes:
+            self._repository_classes.append(repository_class)
+        return repository_class
+
+    def collect(self) -> Dict[str, List[IndexModel]]:
+        """
+        Reunir los índices declarados por colección
+
+        Returns:
+            Dict: Modelos de índice por nombre de colección
+        """
+        if not self._defaults_registered:
+            self._register_defaults()
+
+        declared: Dict[str, List[IndexModel]] = {}
+        for repository_class in self._repository_classes:
+            repository = repository_class()
+            declared.setdefault(repository.collection_name, []).extend(repository.get_indexes())
+        return declared
+
+    def ensure_indexes(self) -> Dict[str, List[str]]:
+        """
+        Aplicar todos los índices declarados
+
+        Returns:
+            Dict: Nombres de índices aplicados por colección
+        """
+        from app import get_db
+        db = get_db()
+
+        applied: Dict[str, List[str]] = {}
+        for collection_name, indexes in self.collect().items():
+            if not indexes:
+                continue
+            try:
+                applied[collection_name] = db[collection_name].create_indexes(indexes)
+            except PyMongoError as e:
+                # Un índice en conflicto no debe impedir aplicar los demás; queda en el reporte de diferencias
+                logger.error(f"Error al crear índices de '{collection_name}': {e}")
+
+        logger.info(f"Índices aplicados en {len(applied)} colecciones")
+        return applied
+
+    def drift_report(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Comparar los índices declarados con los existentes en MongoDB
+
+        Returns:
+            Dict: Por colección, índices faltantes ('missing'), con definición
+                  distinta ('changed') y no declarados ('unexpected')
+        """
+        from app import get_db
+        db = get_db()
+
+        report: Dict[str, Dict[str, List[str]]] = {}
+        for collection_name, indexes in self.collect().items():
+            existing = db[collection_name].index_information()
+            existing.pop('_id_', None)
+
+            declared = {index.document['name']: index.document for index in indexes}
+            missing = [name for name in declared if name not in existing]
+            changed = [
+                name for name, spec in declared.items()
+                if name in existing and not self._same_definition(spec, existing[name])
+            ]
+            unexpected = [name for name in existing if name not in declared]
+
+            if missing or changed or unexpected:
+                report[collection_name] = {
+                    'missing': missing,
+                    'changed': changed,
+                    'unexpected': unexpected
+                }
+
+        return report
+
+    def _same_definition(self, declared: Dict[str, Any], existing: Dict[str, Any]) -> bool:
+        """
+        Verificar si un índice existente coincide con su declaración (claves y unicidad)
+        """
+        declared_keys = [(field, direction) for field, direction in declared['key'].items()]
+        existing_keys = [(field, direction) for field, direction in existing['key']]
+        return (
+            declared_keys == existing_keys
+            and bool(declared.get('unique', False)) == bool(existing.get('unique', False))
+        )
+
+    def _register_defaults(self) -> None:
+        """
+        Registrar todos los repositorios de la aplicación
+        """
+        from app.repositories import (
+            UserClientRepository, UserEmployeeRepository, ProductRepository,
+            WasherRepository, DryerRepository, StoreRepository, CardRepository,
+            ServiceCycleRepository, SaleRepository, ActiveServiceRepository,
+            RevokedTokenRepository, ESP32CommandRepository, LeaseRepository
+        )
+
+        for repository_class in (
+            UserClientRepository, UserEmployeeRepository, ProductRepository,
+            WasherRepository, DryerRepository, StoreRepository, CardRepository,
+            ServiceCycleRepository, SaleRepository, ActiveServiceRepository,
+            RevokedTokenRepository, ESP32CommandRepository, LeaseRepository
+        ):
+            self.register(repository_class)
+        self._defaults_registered = True
+
+# Instancia global del registro de índices
+index_registry = IndexRegistry()
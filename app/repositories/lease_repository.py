@@ -0,0 +1,108 @@
+from typing import Dict, Any, Optional, List
+from app.repositories.base_repository import BaseRepository
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaseRepository(BaseRepository):
+    """
+    Leases con vencimiento (colección 'leases'), uno por nombre (_id).
+    Permiten que una sola instancia de la aplicación sea líder de una tarea
+    (ej. el monitor de máquinas): el líder renueva el lease periódicamente y,
+    si deja de hacerlo, otra instancia lo toma al vencer.
+    """
+
+    def __init__(self):
+        super().__init__('leases')
+
+    def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Los leases se identifican por su nombre (_id)
+        """
+        return {'_id': data['_id']} if '_id' in data else {}
+
+    def try_acquire(self, name: str, holder: str, lease_seconds: float, acquiring: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Tomar o renovar un lease de forma atómica. Solo tiene éxito si el lease
+        no existe, está vencido o ya pertenece a holder.
+
+        Args:
+            name: Nombre del lease
+            holder: Identificador de la instancia que lo pide
+            lease_seconds: Vigencia del lease desde ahora
+            acquiring: True si holder no era líder (registra acquired_at)
+
+        Returns:
+            Dict: Lease vigente de holder, o None si lo tiene otra instancia
+        """
+        now = datetime.utcnow()
+        fields: Dict[str, Any] = {
+            'holder': holder,
+            'expires_at': now + timedelta(seconds=lease_seconds),
+            'renewed_at': now
+        }
+        if acquiring:
+            fields['acquired_at'] = now
+
+        try:
+            return self.collection.find_one_and_update(
+                {
+                    '_id': name,
+                    '$or': [{'holder': holder}, {'expires_at': {'$lt': now}}]
+                },
+                {'$set': fields},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+
+        except DuplicateKeyError:
+            # El lease existe, está vigente y es de otra instancia
+            return None
+        except PyMongoError as e:
+            logger.error(f"Error al renovar lease '{name}': {e}")
+            raise
+
+    def release(self, name: str, holder: str) -> bool:
+        """
+        Liberar un lease propio para que otra instancia lo tome de inmediato
+
+        Args:
+            name: Nombre del lease
+            holder: Identificador de la instancia dueña
+
+        Returns:
+            bool: True si se liberó
+        """
+        try:
+            return self.collection.delete_one({'_id': name, 'holder': holder}).deleted_count > 0
+
+        except PyMongoError as e:
+            logger.error(f"Error al liberar lease '{name}': {e}")
+            raise
+
+    def get_lease(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtener el lease actual (vigente o no)
+
+        Args:
+            name: Nombre del lease
+
+        Returns:
+            Dict: Lease o None si no existe
+        """
+        return self.collection.find_one({'_id': name})
+
+    def get_indexes(self) -> List[IndexModel]:
+        """
+        Índices de la colección de leases
+
+        Returns:
+            List: Modelos de índice de la colección
+        """
+        return [
+            # Limpieza de leases abandonados; la toma de un lease vencido no depende de este índice
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=3600)
+        ]
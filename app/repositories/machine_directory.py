@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Colecciones de máquinas y el tipo de máquina que contiene cada una
+MACHINE_COLLECTIONS = {
+    'washers': 'lavadora',
+    'dryers': 'secadora'
+}
+
+class MachineDirectory:
+    """
+    Directorio en memoria que asocia cada machine_id con su colección
+    ('washers' o 'dryers'). Se carga con una sola consulta y se mantiene
+    al día con las escrituras de WasherRepository y DryerRepository.
+    """
+
+    def __init__(self, miss_reload_seconds: float = 5):
+        self.miss_reload_seconds = miss_reload_seconds
+        self._entries: Dict[str, str] = {}
+        self._loaded = False
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def resolve(self, db, machine_id: Any) -> Optional[str]:
+        """
+        Obtener la colección de una máquina
+
+        Args:
+            db: Base de datos para cargar el directorio si hace falta
+            machine_id: ID de la máquina
+
+        Returns:
+            str: Nombre de la colección o None si la máquina no existe
+        """
+        collection_name = self.lookup(machine_id)
+        if collection_name:
+            return collection_name
+
+        if not ObjectId.is_valid(str(machine_id)):
+            return None
+
+        # Primer uso, o máquina creada por otro proceso: recargar una vez
+        if self.reload_on_miss(db):
+            return self.lookup(machine_id)
+        # Recarga reciente: buscar solo esta máquina
+        return self.find_missing(db, [machine_id]).get(str(machine_id))
+
+    def find_missing(self, db, machine_ids: List[Any]) -> Dict[str, str]:
+        """
+        Buscar directamente en las colecciones las máquinas que no están en el directorio
+        (creadas por otro proceso después de la última recarga) y registrarlas
+
+        Args:
+            db: Base de datos
+            machine_ids: IDs de las máquinas
+
+        Returns:
+            Dict: Colección de cada máquina encontrada, indexada por su ID en texto
+        """
+        object_ids = [ObjectId(str(machine_id)) for machine_id in machine_ids if ObjectId.is_valid(str(machine_id))]
+        found: Dict[str, str] = {}
+        for collection_name in MACHINE_COLLECTIONS:
+            if len(found) == len(object_ids):
+                break
+            pending = [object_id for object_id in object_ids if str(object_id) not in found]
+            for doc in db[collection_name].find({'_id': {'$in': pending}}, {'_id': 1}):
+                found[str(doc['_id'])] = collection_name
+
+        with self._lock:
+            self._entries.update(found)
+        return found
+
+    def reload_on_miss(self, db) -> bool:
+        """
+        Recargar el directorio porque falta una máquina, como mucho cada miss_reload_seconds
+        (un ID inexistente no provoca una recarga completa en cada petición)
+
+        Args:
+            db: Base de datos
+
+        Returns:
+            bool: True si se recargó
+        """
+        with self._lock:
+            if self._loaded and time.monotonic() - self._loaded_at < self.miss_reload_seconds:
+                return False
+            # Reservar la recarga para que las peticiones concurrentes no la repitan
+            self._loaded_at = time.monotonic()
+
+        self.load(db)
+        return True
+
+    def lookup(self, machine_id: Any) -> Optional[str]:
+        """Obtener la colección de una máquina sin consultar la base de datos"""
+        return self._entries.get(str(machine_id))
+
+    def load(self, db) -> int:
+        """
+        Cargar el directorio completo con una sola consulta ($unionWith)
+
+        Args:
+            db: Base de datos
+
+        Returns:
+            int: Número de máquinas cargadas
+        """
+        collection_names = list(MACHINE_COLLECTIONS.keys())
+        first, others = collection_names[0], collection_names[1:]
+
+        pipeline = [{'$project': {'_id': 1}}, {'$addFields': {'collection': first}}]
+        for collection_name in others:
+            pipeline.append({'$unionWith': {
+                'coll': collection_name,
+                'pipeline': [{'$project': {'_id': 1}}, {'$addFields': {'collection': collection_name}}]
+            }})
+
+        entries = {str(doc['_id']): doc['collection'] for doc in db[first].aggregate(pipeline)}
+
+        with self._lock:
+            self._entries = entries
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Directorio de máquinas cargado: {len(entries)} máquinas")
+        return len(entries)
+
+    def register(self, machine_id: Any, collection_name: str) -> None:
+        """Registrar (o actualizar) la colección de una máquina"""
+        with self._lock:
+            self._entries[str(machine_id)] = collection_name
+
+    def forget(self, machine_id: Any) -> None:
+        """Eliminar una máquina del directorio"""
+        with self._lock:
+            self._entries.pop(str(machine_id), None)
+
+    def clear(self) -> None:
+        """Vaciar el directorio (se recargará en el siguiente uso)"""
+        with self._lock:
+            self._entries = {}
+            self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+# Instancia global del directorio de máquinas
+machine_directory = MachineDirectory()
@@ -0,0 +1,138 @@
+from typing import Dict, Any, Optional, List, Union
+from app.repositories.base_repository import BaseRepository
+from app.repositories.washer_repository import WasherRepository
+from app.repositories.dryer_repository import DryerRepository
+from app.repositories.machine_directory import machine_directory, MACHINE_COLLECTIONS
+from app import get_db
+from bson import ObjectId
+from pymongo import UpdateOne
+
+class MachineRepository:
+    """
+    Fachada única para lavadoras y secadoras. Usa el directorio de máquinas
+    para ir directo a la colección correcta, de modo que cada acceso a una
+    máquina cuesta como máximo una consulta.
+    """
+
+    def __init__(self):
+        self.db = get_db()
+        self.repositories: Dict[str, BaseRepository] = {
+            'washers': WasherRepository(),
+            'dryers': DryerRepository()
+        }
+
+    def get(self, machine_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        """
+        Obtener máquina por ID (lavadora o secadora)
+
+        Args:
+            machine_id: ID de la máquina
+
+        Returns:
+            Dict: Máquina encontrada o None
+        """
+        repository = self._repository_for(machine_id)
+        if not repository:
+            return None
+
+        machine = repository.find_by_id(machine_id)
+        if not machine:
+            machine_directory.forget(machine_id)
+        return machine
+
+    def get_many(self, machine_ids: List[Union[str, ObjectId]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtener varias máquinas con una consulta $in por colección
+
+        Args:
+            machine_ids: IDs de las máquinas
+
+        Returns:
+            Dict: Máquinas encontradas indexadas por su ID en texto
+        """
+        # Recargar el directorio como máximo una vez si alguna máquina no está registrada;
+        # si se recargó hace poco, buscar directamente solo las que faltan
+        missing = [machine_id for machine_id in machine_ids if not machine_directory.lookup(machine_id)]
+        if missing and not machine_directory.reload_on_miss(self.db):
+            machine_directory.find_missing(self.db, missing)
+
+        ids_by_collection: Dict[str, List[Union[str, ObjectId]]] = {}
+        for machine_id in machine_ids:
+            collection_name = machine_directory.lookup(machine_id)
+            if collection_name:
+                ids_by_collection.setdefault(collection_name, []).append(machine_id)
+
+        machines: Dict[str, Dict[str, Any]] = {}
+        for collection_name, ids in ids_by_collection.items():
+            machines.update(self.repositories[collection_name].find_by_ids(ids))
+        return machines
+
+    def update(self, machine_id: Union[str, ObjectId], update_operators: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Actualizar una máquina con operadores de MongoDB
+
+        Args:
+            machine_id: ID de la máquina
+            update_operators: Operadores de actualización (ej. {'$set': {...}})
+
+        Returns:
+            Dict: Máquina actualizada o None
+        """
+        repository = self._repository_for(machine_id)
+        if not repository:
+            return None
+
+        machine = repository.update_document_by_id(machine_id, update_operators)
+        if not machine:
+            machine_directory.forget(machine_id)
+        return machine
+
+    def release_machines(self, machine_ids: List[Union[str, ObjectId]]) -> int:
+        """
+        Dejar varias máquinas disponibles (estado 'disponible' y sin current_service)
+        con un bulk_write por colección
+
+        Args:
+            machine_ids: IDs de las máquinas
+
+        Returns:
+            int: Número de máquinas encontradas y actualizadas
+        """
+        ids_by_collection: Dict[str, List[Union[str, ObjectId]]] = {}
+        for machine_id in machine_ids:
+            collection_name = machine_directory.resolve(self.db, machine_id)
+            if collection_name:
+                ids_by_collection.setdefault(collection_name, []).append(machine_id)
+
+        released = 0
+        for collection_name, ids in ids_by_collection.items():
+            repository = self.repositories[collection_name]
+            result = repository.collection.bulk_write([
+                UpdateOne(
+                    {'_id': ObjectId(machine_id) if isinstance(machine_id, str) else machine_id},
+                    {'$set': {'estado': 'disponible'}, '$unset': {'current_service': ''}}
+                )
+                for machine_id in ids
+            ], ordered=False)
+            released += result.matched_count
+            for machine_id in ids:
+                repository._forget(machine_id)
+        return released
+
+    def get_machine_type(self, machine_id: Union[str, ObjectId]) -> Optional[str]:
+        """
+        Obtener el tipo de máquina ('lavadora' o 'secadora') sin consultar la máquina
+
+        Args:
+            machine_id: ID de la máquina
+
+        Returns:
+            str: Tipo de máquina o None si no existe
+        """
+        collection_name = machine_directory.resolve(self.db, machine_id)
+        return MACHINE_COLLECTIONS.get(collection_name) if collection_name else None
+
+    def _repository_for(self, machine_id: Union[str, ObjectId]) -> Optional[BaseRepository]:
+        """Obtener el repositorio de la colección donde vive la máquina"""
+        collection_name = machine_directory.resolve(self.db, machine_id)
+        return self.repositories.get(collection_name) if collection_name else None
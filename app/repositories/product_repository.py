@@ -1,6 +1,15 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.base_repository import BaseRepository
-from pymongo import IndexModel, ASCENDING
+from pymongo import IndexModel, ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from bson import ObjectId
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Código de MongoDB para clave duplicada
+DUPLICATE_KEY_ERROR = 11000
 
 class ProductRepository(BaseRepository):
     """
@@ -9,7 +18,6 @@ class ProductRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('products')
-        self.create_indexes()
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -40,7 +48,7 @@ class ProductRepository(BaseRepository):
         """
         return self.find_one({'nombre': nombre, 'is_active': True})
     
-    def find_by_tipo(self, tipo: str, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def find_by_tipo(self, tipo: str, page: int = 1, per_page: int = 10, after: Optional[str] = None, count: str = 'exact', projection: Optional[List[str]] = None, raw: bool = False) -> Dict[str, Any]:
         """
         Encontrar productos por tipo
         
@@ -48,6 +56,10 @@ class ProductRepository(BaseRepository):
             tipo: Tipo de producto
             page: Página actual
             per_page: Elementos por página
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            projection: Campos a leer (None = documentos completos)
+            raw: Devolver los documentos sin formatear (ver BaseRepository.find_many)
             
         Returns:
             Dict: Productos encontrados con información de paginación
@@ -55,16 +67,24 @@ class ProductRepository(BaseRepository):
         return self.find_many(
             filter_criteria={'tipo': tipo, 'is_active': True},
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            after=after,
+            count=count,
+            projection=projection,
+            raw=raw
         )
     
-    def find_active_products(self, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def find_active_products(self, page: int = 1, per_page: int = 10, after: Optional[str] = None, count: str = 'exact', projection: Optional[List[str]] = None, raw: bool = False) -> Dict[str, Any]:
         """
         Encontrar todos los productos activos
         
         Args:
             page: Página actual
             per_page: Elementos por página
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            projection: Campos a leer (None = documentos completos)
+            raw: Devolver los documentos sin formatear (ver BaseRepository.find_many)
             
         Returns:
             Dict: Productos encontrados con información de paginación
@@ -72,7 +92,11 @@ class ProductRepository(BaseRepository):
         return self.find_many(
             filter_criteria={'is_active': True},
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            after=after,
+            count=count,
+            projection=projection,
+            raw=raw
         )
     
     def find_low_stock(self, threshold: int = 10, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
@@ -130,7 +154,124 @@ class ProductRepository(BaseRepository):
         
         return self.upsert(updated_data)
     
-    def search_products(self, query: str, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def reserve_stock(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Descontar el stock de todas las líneas de un carrito en un solo bulk_write.
+        Cada línea es un $inc condicional (stock >= cantidad); si alguna no puede
+        aplicarse, se revierten las que sí se aplicaron (todo o nada).
+        
+        Cada línea se envía como upsert: si el producto no tiene stock suficiente,
+        el upsert choca con el _id existente (E11000) y el error indica qué línea
+        no se aplicó, sin guardar nada de la reserva en los productos.
+        
+        Args:
+            items: Líneas del carrito con product_id y quantity
+            
+        Returns:
+            Dict: Resultado con success y reservation_id para poder liberar la reserva
+        """
+        quantities = self._group_quantities(items)
+        if not quantities:
+            return {'success': True, 'reservation_id': None, 'message': 'Sin productos que reservar'}
+        
+        reservation_id = str(ObjectId())
+        product_ids = list(quantities)
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'_id': ObjectId(product_id), 'stock': {'$gte': quantities[product_id]}},
+                {'$inc': {'stock': -quantities[product_id]}, '$set': {'updated_at': now}},
+                upsert=True
+            )
+            for product_id in product_ids
+        ]
+        
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        except PyMongoError as e:
+            # Sin resultado por línea no se sabe qué se descontó: no se compensa a ciegas
+            logger.error(f"Error al reservar stock en {self.collection_name}: {e}")
+            raise
+        finally:
+            for product_id in product_ids:
+                self._forget(product_id)
+        
+        write_errors = details.get('writeErrors', [])
+        # Productos que ya no existen: el upsert los creó con el mismo _id, se eliminan
+        inserted = [entry['_id'] for entry in details.get('upserted', [])]
+        failed = {product_ids[error['index']] for error in write_errors} | {str(_id) for _id in inserted}
+        if not failed:
+            logger.info(f"Stock reservado para {len(operations)} productos (reserva {reservation_id})")
+            return {'success': True, 'reservation_id': reservation_id, 'message': 'Stock reservado exitosamente'}
+        
+        # Compensar exactamente las líneas que sí se descontaron
+        applied = [
+            {'product_id': product_id, 'quantity': quantities[product_id]}
+            for product_id in product_ids if product_id not in failed
+        ]
+        self.release_stock(applied, reservation_id)
+        if inserted:
+            self.collection.delete_many({'_id': {'$in': inserted}})
+        
+        unexpected = [error for error in write_errors if error.get('code') != DUPLICATE_KEY_ERROR]
+        if unexpected:
+            logger.error(f"Error al reservar stock en {self.collection_name}: {unexpected[0].get('errmsg')}")
+            raise BulkWriteError(details)
+        
+        logger.warning(f"Stock insuficiente en reserva {reservation_id}; reserva revertida")
+        return {'success': False, 'reservation_id': None, 'message': 'Stock insuficiente para uno o más productos'}
+    
+    def release_stock(self, items: List[Dict[str, Any]], reservation_id: Optional[str]) -> int:
+        """
+        Devolver al stock las líneas descontadas por una reserva ($inc incondicional).
+        Solo debe llamarse una vez por reserva y con las líneas que se descontaron.
+        
+        Args:
+            items: Líneas del carrito con product_id y quantity
+            reservation_id: ID devuelto por reserve_stock
+            
+        Returns:
+            int: Número de productos restituidos
+        """
+        quantities = self._group_quantities(items)
+        if not reservation_id or not quantities:
+            return 0
+        
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'_id': ObjectId(product_id)},
+                {'$inc': {'stock': quantity}, '$set': {'updated_at': now}}
+            )
+            for product_id, quantity in quantities.items()
+        ]
+        
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            for product_id in quantities:
+                self._forget(product_id)
+            if result.matched_count < len(operations):
+                logger.warning(f"Reserva {reservation_id}: {len(operations) - result.matched_count} productos ya no existen")
+            return result.modified_count
+            
+        except PyMongoError as e:
+            logger.error(f"Error al liberar reserva de stock {reservation_id}: {e}")
+            raise
+    
+    def _group_quantities(self, items: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Agrupar cantidades por producto (un carrito puede repetir el mismo producto)
+        """
+        quantities: Dict[str, int] = {}
+        for item in items:
+            product_id = str(item['product_id'])
+            quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+        return quantities
+    
+    def search_products(self, query: str, page: int = 1, per_page: int = 10, after: Optional[str] = None, count: str = 'exact', projection: Optional[List[str]] = None, raw: bool = False) -> Dict[str, Any]:
         """
         Buscar productos por nombre o descripción
         
@@ -138,6 +279,10 @@ class ProductRepository(BaseRepository):
             query: Texto a buscar
             page: Página actual
             per_page: Elementos por página
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            projection: Campos a leer (None = documentos completos)
+            raw: Devolver los documentos sin formatear (ver BaseRepository.find_many)
             
         Returns:
             Dict: Productos encontrados
@@ -151,12 +296,16 @@ class ProductRepository(BaseRepository):
                 'is_active': True
             },
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            after=after,
+            count=count,
+            projection=projection,
+            raw=raw
         )
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('nombre', ASCENDING)], unique=True),
@@ -164,7 +313,7 @@ class ProductRepository(BaseRepository):
             IndexModel([('stock', ASCENDING)]),
             IndexModel([('precio', ASCENDING)]),
             IndexModel([('is_active', ASCENDING)]),
-            IndexModel([('created_at', ASCENDING)])
+            IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)]) # Orden y paginación por cursor
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
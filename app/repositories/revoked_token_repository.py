@@ -0,0 +1,134 @@
+from typing import Dict, Any, Optional, List
+from app.repositories.base_repository import BaseRepository
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import PyMongoError
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RevokedTokenRepository(BaseRepository):
+    """
+    Tokens JWT revocados (colección 'revoked_tokens'), identificados por su jti.
+    Cada fila vence junto con el token (índice TTL sobre expires_at), por lo que
+    la colección solo contiene revocaciones que todavía importan.
+    """
+
+    def __init__(self):
+        super().__init__('revoked_tokens')
+
+    def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Obtener filtro basado en campos únicos para tokens revocados
+
+        Args:
+            data: Datos del token revocado
+
+        Returns:
+            Dict: Filtro basado en jti
+        """
+        filter_criteria = {}
+
+        if 'jti' in data:
+            filter_criteria['jti'] = data['jti']
+
+        return filter_criteria
+
+    def revoke(self, jti: str, user_id: Optional[str], expires_at: datetime) -> datetime:
+        """
+        Registrar la revocación de un token (idempotente)
+
+        Args:
+            jti: Identificador único del token
+            user_id: ID del usuario dueño del token
+            expires_at: Vencimiento del token (UTC)
+
+        Returns:
+            datetime: Momento de la revocación
+        """
+        revoked_at = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {'jti': jti},
+                {'$setOnInsert': {
+                    'jti': jti,
+                    'user_id': str(user_id) if user_id is not None else None,
+                    'expires_at': expires_at,
+                    'revoked_at': revoked_at
+                }},
+                upsert=True
+            )
+            return revoked_at
+
+        except PyMongoError as e:
+            logger.error(f"Error al revocar token {jti}: {e}")
+            raise
+
+    def revoke_user(self, user_id: str, expires_at: datetime) -> datetime:
+        """
+        Revocar todos los tokens de un usuario emitidos hasta ahora (cambio de rol,
+        tienda o desactivación). Una fila por usuario; una nueva revocación la actualiza.
+
+        Args:
+            user_id: ID del usuario
+            expires_at: Vencimiento del último token que pudo emitirse antes de ahora (UTC)
+
+        Returns:
+            datetime: Momento de la revocación
+        """
+        # Segundos enteros, como el claim iat de los tokens
+        revoked_at = datetime.utcnow().replace(microsecond=0)
+        try:
+            self.collection.update_one(
+                {'jti': f'user:{user_id}'},
+                {'$set': {
+                    'scope': 'user',
+                    'user_id': str(user_id),
+                    'expires_at': expires_at,
+                    'revoked_at': revoked_at
+                }},
+                upsert=True
+            )
+            return revoked_at
+
+        except PyMongoError as e:
+            logger.error(f"Error al revocar los tokens del usuario {user_id}: {e}")
+            raise
+
+    def find_revoked_since(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Obtener las revocaciones vigentes registradas desde un momento dado
+
+        Args:
+            since: Momento a partir del cual buscar (None = todas)
+
+        Returns:
+            List: Filas con jti, expires_at y revoked_at (y scope/user_id en las revocaciones por usuario)
+        """
+        try:
+            filter_criteria: Dict[str, Any] = {'expires_at': {'$gt': datetime.utcnow()}}
+            if since is not None:
+                filter_criteria['revoked_at'] = {'$gte': since}
+
+            return list(self.collection.find(
+                filter_criteria,
+                {'_id': 0, 'jti': 1, 'expires_at': 1, 'revoked_at': 1, 'scope': 1, 'user_id': 1}
+            ))
+
+        except PyMongoError as e:
+            logger.error(f"Error al obtener tokens revocados: {e}")
+            raise
+
+    def get_indexes(self) -> List[IndexModel]:
+        """
+        Índices de la colección de tokens revocados
+
+        Returns:
+            List: Modelos de índice de la colección
+        """
+        return [
+            IndexModel([("jti", ASCENDING)], unique=True),
+            # MongoDB elimina cada fila cuando vence el token
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+            IndexModel([("revoked_at", ASCENDING)])
+        ]
@@ -1,8 +1,12 @@
 from typing import Dict, Any, Optional, List
 from app.repositories.base_repository import BaseRepository
-from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo import IndexModel, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
 from bson import ObjectId
 from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
 
 class SaleRepository(BaseRepository):
     """
@@ -11,7 +15,6 @@ class SaleRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('sales')
-        self.create_indexes()
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -207,9 +210,10 @@ class SaleRepository(BaseRepository):
         
         return self.upsert(update_data)
     
-    def update_service_status(self, sale_id: str, service_index: int, new_status: str, started_at: Optional[datetime] = None, estimated_end_at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    def update_service_status(self, sale_id: str, service_index: int, new_status: str, started_at: Optional[datetime] = None, estimated_end_at: Optional[datetime] = None, expected_status: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Actualizar estado de un servicio específico en una venta, incluyendo tiempos de inicio y fin.
+        Usa un $set posicional sobre items.services.<índice>, sin leer ni reescribir la venta completa.
         
         Args:
             sale_id: ID de la venta
@@ -217,62 +221,214 @@ class SaleRepository(BaseRepository):
             new_status: Nuevo estado del servicio
             started_at: Hora de inicio del servicio (opcional)
             estimated_end_at: Hora estimada de finalización del servicio (opcional)
+            expected_status: Estado que debe tener el servicio para aplicar el cambio (opcional)
             
         Returns:
-            Dict: Venta actualizada o None
+            Dict: Venta actualizada o None si no existe el servicio o no cumple expected_status
         """
         try:
-            # Obtener la venta actual
-            sale = self.find_by_id(sale_id)
+            service_path = f'items.services.{int(service_index)}'
+            current_time = datetime.utcnow()
+            
+            set_fields = {
+                f'{service_path}.status': new_status,
+                'updated_at': current_time
+            }
+            
+            # Agregar timestamps según el estado
+            if new_status == 'active':
+                set_fields[f'{service_path}.started_at'] = started_at if started_at else current_time
+                set_fields[f'{service_path}.estimated_end_at'] = estimated_end_at
+            elif new_status == 'completed':
+                set_fields[f'{service_path}.completed_at'] = current_time
+            
+            filter_criteria: Dict[str, Any] = {
+                '_id': ObjectId(sale_id) if isinstance(sale_id, str) else sale_id,
+                service_path: {'$exists': True}
+            }
+            if expected_status:
+                filter_criteria[f'{service_path}.status'] = expected_status
+            
+            sale = self.collection.find_one_and_update(
+                filter_criteria,
+                {'$set': set_fields},
+                return_document=ReturnDocument.AFTER
+            )
+            
             if not sale:
                 return None
             
-            # Actualizar el estado del servicio
-            services = sale.get('items', {}).get('services', [])
-            if service_index < len(services):
-                # Crear una nueva lista de servicios
-                updated_services = []
-                for i, svc in enumerate(services):
-                    if i == service_index:
-                        # Crear servicio actualizado
-                        updated_service = dict(svc)
-                        updated_service['status'] = new_status
-                        
-                        # Agregar timestamps según el estado
-                        current_time = datetime.utcnow()
-                        if new_status == 'active':
-                            updated_service['started_at'] = started_at if started_at else current_time
-                            updated_service['estimated_end_at'] = estimated_end_at # Asegura que estimated_end_at se guarde
-                        elif new_status == 'completed':
-                            updated_service['completed_at'] = current_time
-                        
-                        updated_services.append(updated_service)
-                    else:
-                        updated_services.append(dict(svc))
-                
-                # Usar la lista actualizada
-                services = updated_services
-                
-                # Actualizar la venta
-                update_data = {
-                    '_id': sale_id,
-                    'items': {
-                        'products': sale.get('items', {}).get('products', []),
-                        'services': services
-                    }
-                }
-                
-                return self.upsert(update_data)
+            formatted_sale = self._format_document(sale)
+            self._remember(formatted_sale)
+            return formatted_sale
+            
+        except Exception as e:
+            logger.error(f"Error al actualizar estado del servicio {service_index} de la venta {sale_id}: {e}")
+            return None
+    
+    def activate_services(self, sale_id: str, activations: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Marcar varios servicios de una venta como activos en una sola escritura.
+        Solo se aplica si todos siguen en 'pending'.
+        
+        Args:
+            sale_id: ID de la venta
+            activations: Servicios activados con service_index, started_at y estimated_end_at
+            
+        Returns:
+            Dict: Venta actualizada o None si algún servicio ya no estaba pendiente
+        """
+        if not activations:
+            return None
+        
+        try:
+            current_time = datetime.utcnow()
+            set_fields: Dict[str, Any] = {'updated_at': current_time}
+            filter_criteria: Dict[str, Any] = {
+                '_id': ObjectId(sale_id) if isinstance(sale_id, str) else sale_id
+            }
+            
+            for activation in activations:
+                service_path = f"items.services.{int(activation['service_index'])}"
+                set_fields[f'{service_path}.status'] = 'active'
+                set_fields[f'{service_path}.started_at'] = activation.get('started_at') or current_time
+                set_fields[f'{service_path}.estimated_end_at'] = activation.get('estimated_end_at')
+                filter_criteria[f'{service_path}.status'] = 'pending'
+            
+            sale = self.collection.find_one_and_update(
+                filter_criteria,
+                {'$set': set_fields},
+                return_document=ReturnDocument.AFTER
+            )
+            
+            if not sale:
+                return None
             
+            formatted_sale = self._format_document(sale)
+            self._remember(formatted_sale)
+            return formatted_sale
+            
+        except Exception as e:
+            logger.error(f"Error al activar servicios de la venta {sale_id}: {e}")
             return None
+    
+    def fail_service_activation(self, sale_id: str, service_index: int, error: str) -> Optional[Dict[str, Any]]:
+        """
+        Devolver a 'pending' un servicio cuya máquina no arrancó (comando ESP32 fallido)
+        y reabrir la venta para reintentar su activación. Solo se aplica si el servicio
+        sigue en 'active'.
+        
+        Args:
+            sale_id: ID de la venta
+            service_index: Índice del servicio en la lista
+            error: Motivo del fallo (queda en activation_error del servicio)
+            
+        Returns:
+            Dict: Venta actualizada o None si el servicio ya no estaba activo
+        """
+        try:
+            service_path = f'items.services.{int(service_index)}'
+            current_time = datetime.utcnow()
+            
+            sale = self.collection.find_one_and_update(
+                {
+                    '_id': ObjectId(sale_id) if isinstance(sale_id, str) else sale_id,
+                    f'{service_path}.status': 'active'
+                },
+                {
+                    '$set': {
+                        f'{service_path}.status': 'pending',
+                        f'{service_path}.activation_error': error,
+                        'status': 'pending',
+                        'updated_at': current_time
+                    },
+                    '$unset': {
+                        f'{service_path}.started_at': '',
+                        f'{service_path}.estimated_end_at': ''
+                    }
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            
+            if not sale:
+                return None
+            
+            formatted_sale = self._format_document(sale)
+            self._remember(formatted_sale)
+            return formatted_sale
             
         except Exception as e:
-            print(f"Error updating service status: {e}")
+            logger.error(f"Error al revertir el servicio {service_index} de la venta {sale_id}: {e}")
             return None
     
+    def complete_services(self, services: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Marcar como completados varios servicios (de una o más ventas) con un solo bulk_write.
+        Cada servicio solo cambia si sigue en 'active'.
+        
+        Args:
+            services: Servicios con sale_id y service_index
+            
+        Returns:
+            List: Servicios que esta llamada completó (los demás ya no estaban en 'active')
+        """
+        if not services:
+            return []
+        
+        current_time = datetime.utcnow()
+        # Marca de esta llamada, para reconocer después qué servicios completó
+        completion_id = str(ObjectId())
+        operations = []
+        for service in services:
+            service_path = f"items.services.{int(service['service_index'])}"
+            sale_id = service['sale_id']
+            operations.append(UpdateOne(
+                {
+                    '_id': ObjectId(sale_id) if isinstance(sale_id, str) else sale_id,
+                    f'{service_path}.status': 'active'
+                },
+                {'$set': {
+                    f'{service_path}.status': 'completed',
+                    f'{service_path}.completed_at': current_time,
+                    f'{service_path}.completion_id': completion_id,
+                    'updated_at': current_time
+                }}
+            ))
+        
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            sale_ids = {str(service['sale_id']) for service in services}
+            for sale_id in sale_ids:
+                self._forget(sale_id)
+            if result.modified_count == len(operations):
+                return list(services)
+            
+            # Algunos ya no estaban activos (otra verificación o una cancelación):
+            # solo cuentan los que llevan la marca de esta llamada
+            sales = {
+                str(sale['_id']): sale.get('items', {}).get('services', [])
+                for sale in self.collection.find(
+                    {'_id': {'$in': [ObjectId(sale_id) for sale_id in sale_ids]}},
+                    {'items.services.completion_id': 1}
+                )
+            }
+            completed = []
+            for service in services:
+                sale_services = sales.get(str(service['sale_id']), [])
+                index = int(service['service_index'])
+                if index < len(sale_services) and sale_services[index].get('completion_id') == completion_id:
+                    completed.append(service)
+            return completed
+            
+        except PyMongoError as e:
+            logger.error(f"Error al completar {len(services)} servicios: {e}")
+            raise
+    
     def get_active_services(self) -> List[Dict[str, Any]]:
         """
-        Obtener todos los servicios activos
+        Obtener todos los servicios activos recorriendo la colección de ventas.
+        Es costoso (crece con el historial); el monitor usa el índice
+        'active_services' y esta consulta solo se usa para regenerarlo.
         
         Returns:
             List: Lista de servicios activos con información de venta
@@ -300,6 +456,7 @@ class SaleRepository(BaseRepository):
                     'sale_id': '$_id',
                     'client_id': '$client_id',
                     'employee_id': '$employee_id',
+                    'store_id': '$store_id',
                     'service': '$items.services',
                     'service_index': '$service_index', # Incluir el service_index
                     'created_at': '$created_at'
@@ -344,22 +501,22 @@ class SaleRepository(BaseRepository):
         
         return list(self.collection.aggregate(pipeline))
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('employee_id', ASCENDING)]),
             IndexModel([('client_id', ASCENDING)]),
             IndexModel([('status', ASCENDING)]),
-            IndexModel([('created_at', DESCENDING)]),
+            IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)]), # Orden y paginación por cursor
             IndexModel([('completed_at', DESCENDING)]),
             IndexModel([('items.services.status', ASCENDING)]),
             IndexModel([('items.services.machine_id', ASCENDING)]),
             IndexModel([('finalized_at', DESCENDING)]) # Nuevo índice
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
 
     def get_sale_services_status(self, sale_id: str) -> Dict[str, Any]:
         """
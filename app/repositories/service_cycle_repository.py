@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.base_repository import BaseRepository
 from pymongo import IndexModel, ASCENDING
 from bson import ObjectId
@@ -10,7 +10,6 @@ class ServiceCycleRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('service_cycles')
-        self.create_indexes()
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -164,6 +163,20 @@ class ServiceCycleRepository(BaseRepository):
             Dict: Resultado de la validación
         """
         cycle = self.find_by_id(cycle_id)
+        return self.check_cycle_for_machine(cycle, machine_id, machine_type)
+    
+    def check_cycle_for_machine(self, cycle: Optional[Dict[str, Any]], machine_id: str, machine_type: str) -> Dict[str, Any]:
+        """
+        Validar compatibilidad sobre un ciclo ya cargado (sin consultar la base de datos).
+        
+        Args:
+            cycle: Documento del ciclo de servicio
+            machine_id: ID de la máquina
+            machine_type: Tipo de la máquina (lavadora, secadora)
+            
+        Returns:
+            Dict: Resultado de la validación
+        """
         if not cycle:
             return {'valid': False, 'message': 'Ciclo de servicio no encontrado'}
 
@@ -179,9 +192,9 @@ class ServiceCycleRepository(BaseRepository):
         
         return {'valid': True, 'message': 'Compatibilidad validada'}
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('name', ASCENDING)], unique=True),
@@ -190,4 +203,4 @@ class ServiceCycleRepository(BaseRepository):
             IndexModel([('created_at', ASCENDING)])
         ]
         
-        self.collection.create_indexes(indexes) 
\ No newline at end of file
+        return indexes 
\ No newline at end of file
@@ -1,6 +1,7 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.base_repository import BaseRepository
 from pymongo import IndexModel, ASCENDING
+from app.repositories.esp32_directory import esp32_directory
 import logging
 
 class StoreRepository(BaseRepository):
@@ -10,7 +11,6 @@ class StoreRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('stores')
-        self.create_indexes()
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -58,9 +58,9 @@ class StoreRepository(BaseRepository):
             per_page=per_page
         )
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('nombre', ASCENDING)], unique=True),
@@ -68,24 +68,14 @@ class StoreRepository(BaseRepository):
             IndexModel([('created_at', ASCENDING)])
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
 
     # --- ESP32 CONFIG ---
     def get_esp32_url_by_id(self, esp32_id: str) -> Optional[str]:
         """
-        Obtener la URL del ESP32 desde la colección 'esp32_config'.
+        Obtener la URL del ESP32 desde el directorio en memoria de 'esp32_config'
+        (ver esp32_directory; se recarga por vigencia o ante un esp32_id desconocido).
         Estructura esperada del documento:
           { esp32_id: "100", esp32_url: "http://192.168.1.100/laundry-update", is_active: true }
         """
-        try:
-            cfg_collection = self.db['esp32_config']
-            doc = (
-                cfg_collection.find_one({'esp32_id': str(esp32_id), 'is_active': True})
-                or cfg_collection.find_one({'esp32_id': str(esp32_id)})
-            )
-            if not doc:
-                return None
-            return doc.get('esp32_url') or doc.get('url')
-        except Exception as e:
-            logging.getLogger(__name__).error(f"Error obteniendo esp32_url para esp32_id={esp32_id}: {e}")
-            return None
+        return esp32_directory.resolve(self.db, esp32_id)
@@ -1,6 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.base_repository import BaseRepository
-from pymongo import IndexModel, ASCENDING
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from bson import ObjectId
 import logging
 
@@ -13,7 +13,6 @@ class UserClientRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('user_clients')
-        self.create_indexes()
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -164,28 +163,32 @@ class UserClientRepository(BaseRepository):
         
         return self.find_one(filter_criteria) is not None
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('email', ASCENDING)], unique=True),
             IndexModel([('telefono', ASCENDING)], unique=True),
             IndexModel([('nombre', ASCENDING)]),
             IndexModel([('is_active', ASCENDING)]),
-            IndexModel([('created_at', ASCENDING)])
+            IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)]) # Orden y paginación por cursor
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
 
-    def find_clients_with_card_balance(self, search: Optional[str] = None, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def find_clients_with_card_balance(self, search: Optional[str] = None, page: int = 1, per_page: int = 10, after: Optional[str] = None, count: str = 'exact', projection: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Obtener lista de clientes con el saldo calculado de las tarjetas asociadas.
+        La página se recorta antes del $lookup, así solo se unen las tarjetas de los clientes devueltos.
 
         Args:
             search: Término de búsqueda por nombre.
             page: Página actual.
             per_page: Elementos por página.
+            after: Cursor de la página anterior (paginación por cursor sobre created_at).
+            count: Modo de conteo del total ('exact', 'estimated' o 'none').
+            projection: Campos a devolver (None = todos). Sin saldo ni tarjetas se omite el $lookup.
 
         Returns:
             Dict: Clientes encontrados con el saldo de tarjeta calculado y paginación.
@@ -198,97 +201,120 @@ class UserClientRepository(BaseRepository):
             match_criteria['nombre'] = {'$regex': search, '$options': 'i'}
         pipeline.append({'$match': match_criteria})
 
-        # 2. Lookup para unir con la colección de tarjetas
-        #    'localField' es el _id del cliente (ObjectId)
-        #    'foreignField' es client_id en la colección de tarjetas (String)
-        pipeline.append({
-            '$lookup': {
-                'from': 'cards',
-                'let': { 'clientId': { '$toString': '$_id' } }, # Convertir _id del cliente a String
-                'pipeline': [
-                    {
-                        '$match': {
-                            '$expr': {
-                                '$and': [
-                                    {'$eq': ['$client_id', '$$clientId']},
-                                    {'$eq': ['$is_active', True]} # Considerar solo tarjetas activas
-                                ]
+        # 2. Recortar la página antes de unir tarjetas
+        if after is not None:
+            pipeline[0] = {'$match': self._keyset_filter(match_criteria, 'created_at', -1, after)}
+            pipeline.append({'$sort': {'created_at': -1, '_id': -1}})
+            pipeline.append({'$limit': per_page + 1})
+        else:
+            pipeline.append({'$skip': (page - 1) * per_page})
+            pipeline.append({'$limit': per_page})
+
+        # 3. Unir tarjetas solo si se pidió el saldo o el detalle de tarjetas
+        needs_cards = not projection or any(
+            field.split('.')[0] in ('client_cards', 'saldo_tarjeta_recargable') for field in projection
+        )
+        if needs_cards:
+            # Lookup para unir con la colección de tarjetas
+            #    'localField' es el _id del cliente (ObjectId)
+            #    'foreignField' es client_id en la colección de tarjetas (String)
+            pipeline.append({
+                '$lookup': {
+                    'from': 'cards',
+                    'let': { 'clientId': { '$toString': '$_id' } }, # Convertir _id del cliente a String
+                    'pipeline': [
+                        {
+                            '$match': {
+                                '$expr': {
+                                    '$and': [
+                                        {'$eq': ['$client_id', '$$clientId']},
+                                        {'$eq': ['$is_active', True]} # Considerar solo tarjetas activas
+                                    ]
+                                }
+                            }
+                        },
+                        {
+                            '$project': {
+                                '_id': 1,
+                                'card_number': 1,
+                                'balance': 1,
+                                'client_id': 1,
+                                'created_at': 1,
+                                'is_active': 1,
+                                'updated_at': 1,
+                                'last_used': 1,
+                                'is_nfc_enabled': {'$ifNull': ['$is_nfc_enabled', False]},
+                                'nfc_uid': {'$ifNull': ['$nfc_uid', '']}
                             }
                         }
-                    },
-                    {
-                        '$project': {
-                            '_id': 1,
-                            'card_number': 1,
-                            'balance': 1,
-                            'client_id': 1,
-                            'created_at': 1,
-                            'is_active': 1,
-                            'updated_at': 1,
-                            'last_used': 1,
-                            'is_nfc_enabled': {'$ifNull': ['$is_nfc_enabled', False]},
-                            'nfc_uid': {'$ifNull': ['$nfc_uid', '']}
-                        }
-                    }
-                ],
-                'as': 'client_cards'
-            }
-        })
-
-        logger.debug(f"Aggregation pipeline: {pipeline}")
+                    ],
+                    'as': 'client_cards'
+                }
+            })
 
-        # 3. Sumar el balance de las tarjetas activas
-        pipeline.append({
-            '$addFields': {
-                'saldo_tarjeta_recargable': {
-                    '$sum': {
-                        '$map': {
-                            'input': {
-                                '$filter': {
-                                    'input': '$client_cards',
-                                    'as': 'card',
-                                    'cond': {'$eq': ['$$card.is_active', True]}
-                                }
-                            },
-                            'as': 'active_card',
-                            'in': '$$active_card.balance'
+            # Sumar el balance de las tarjetas activas
+            pipeline.append({
+                '$addFields': {
+                    'saldo_tarjeta_recargable': {
+                        '$sum': {
+                            '$map': {
+                                'input': {
+                                    '$filter': {
+                                        'input': '$client_cards',
+                                        'as': 'card',
+                                        'cond': {'$eq': ['$$card.is_active', True]}
+                                    }
+                                },
+                                'as': 'active_card',
+                                'in': '$$active_card.balance'
+                            }
                         }
                     }
                 }
-            }
-        })
+            })
 
         # 4. Proyectar campos deseados (todos los del cliente, el saldo calculado y el detalle de las tarjetas)
-        pipeline.append({
-            '$project': {
-                '_id': 1,
-                'nombre': 1,
-                'telefono': 1,
-                'email': 1,
-                'direccion': 1,
-                'is_active': 1,
-                'created_at': 1,
-                'updated_at': 1,
-                'saldo_tarjeta_recargable': {'$toDouble': {'$ifNull': ['$saldo_tarjeta_recargable', 0]}}, # Asegurar que sea float
-                'client_cards': 1 # Incluir el array de tarjetas
-            }
-        })
-
-        # 5. Contar el total de documentos para la paginación
-        count_pipeline = pipeline + [{'$count': 'total'}]
-        total_result = list(self.collection.aggregate(count_pipeline))
-        total_documents = total_result[0]['total'] if total_result else 0
+        client_fields: Dict[str, Any] = {
+            '_id': 1,
+            'nombre': 1,
+            'telefono': 1,
+            'email': 1,
+            'direccion': 1,
+            'is_active': 1,
+            'created_at': 1,
+            'updated_at': 1,
+            'saldo_tarjeta_recargable': {'$toDouble': {'$ifNull': ['$saldo_tarjeta_recargable', 0]}}, # Asegurar que sea float
+            'client_cards': 1 # Incluir el array de tarjetas
+        }
+        if projection:
+            requested = {field.split('.')[0] for field in projection} | {'_id'}
+            if after is not None:
+                requested.add('created_at') # Necesario para generar next_cursor
+            client_fields = {field: value for field, value in client_fields.items() if field in requested}
+        pipeline.append({'$project': client_fields})
 
-        # 6. Aplicar paginación (skip y limit)
-        pipeline.append({'$skip': (page - 1) * per_page})
-        pipeline.append({'$limit': per_page})
+        logger.debug(f"Aggregation pipeline: {pipeline}")
 
         clients = list(self.collection.aggregate(pipeline))
 
+        # 5. Contar el total (el $lookup no filtra, basta con el $match inicial)
+        total_documents = self._count(match_criteria, count)
+
+        if after is not None:
+            has_more = len(clients) > per_page
+            clients = clients[:per_page]
+            return {
+                'documents': clients,
+                'per_page': per_page,
+                'next_cursor': self._next_cursor(clients[-1], 'created_at') if has_more else None,
+                'has_more': has_more,
+                'total': total_documents
+            }
+
         return {
             'documents': clients,
             'page': page,
             'per_page': per_page,
             'total': total_documents,
-            'total_pages': (total_documents + per_page - 1) // per_page
+            'total_pages': (total_documents + per_page - 1) // per_page if total_documents is not None else None
         }
@@ -1,5 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Union
 from app.repositories.base_repository import BaseRepository
+from app.utils.cache_utils import user_info_cache
 from pymongo import IndexModel, ASCENDING
 from bson import ObjectId
 
@@ -10,7 +11,39 @@ class UserEmployeeRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('user_employees')
-        self.create_indexes()
+    
+    def upsert(self, data: Dict[str, Any], filter_criteria: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        UPSERT de empleado que además invalida su perfil en la caché de usuarios
+        """
+        employee = super().upsert(data, filter_criteria)
+        if employee:
+            user_info_cache.invalidate(str(employee['_id']))
+        return employee
+    
+    def update_document_by_id(self, document_id: Union[str, ObjectId], update_operators: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Actualizar empleado e invalidar su perfil en la caché de usuarios
+        """
+        employee = super().update_document_by_id(document_id, update_operators)
+        user_info_cache.invalidate(str(document_id))
+        return employee
+    
+    def soft_delete(self, document_id: Union[str, ObjectId]) -> bool:
+        """
+        Desactivar empleado e invalidar su perfil en la caché de usuarios
+        """
+        deleted = super().soft_delete(document_id)
+        user_info_cache.invalidate(str(document_id))
+        return deleted
+    
+    def delete_by_id(self, document_id: Union[str, ObjectId]) -> bool:
+        """
+        Eliminar empleado e invalidar su perfil en la caché de usuarios
+        """
+        deleted = super().delete_by_id(document_id)
+        user_info_cache.invalidate(str(document_id))
+        return deleted
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -161,9 +194,9 @@ class UserEmployeeRepository(BaseRepository):
         
         return self.find_one(filter_criteria) is not None
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('username', ASCENDING)], unique=True),
@@ -174,4 +207,4 @@ class UserEmployeeRepository(BaseRepository):
             IndexModel([('created_at', ASCENDING)])
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
@@ -1,6 +1,8 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union, List
 from app.repositories.base_repository import BaseRepository
+from app.repositories.machine_directory import machine_directory
 from pymongo import IndexModel, ASCENDING
+from bson import ObjectId
 
 class WasherRepository(BaseRepository):
     """
@@ -9,7 +11,24 @@ class WasherRepository(BaseRepository):
     
     def __init__(self):
         super().__init__('washers')
-        self.create_indexes()
+    
+    def upsert(self, data: Dict[str, Any], filter_criteria: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        UPSERT de lavadora que además mantiene actualizado el directorio de máquinas
+        """
+        washer = super().upsert(data, filter_criteria)
+        if washer:
+            machine_directory.register(washer['_id'], self.collection_name)
+        return washer
+    
+    def delete_by_id(self, document_id: Union[str, ObjectId]) -> bool:
+        """
+        Eliminar lavadora y quitarla del directorio de máquinas
+        """
+        deleted = super().delete_by_id(document_id)
+        if deleted:
+            machine_directory.forget(document_id)
+        return deleted
     
     def _get_unique_filter(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -48,7 +67,7 @@ class WasherRepository(BaseRepository):
             'is_active': True
         })
     
-    def find_by_store(self, store_id: str, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def find_by_store(self, store_id: str, page: int = 1, per_page: int = 10, after: Optional[str] = None, count: str = 'exact', projection: Optional[List[str]] = None, raw: bool = False) -> Dict[str, Any]:
         """
         Encontrar lavadoras por tienda
         
@@ -56,6 +75,10 @@ class WasherRepository(BaseRepository):
             store_id: ID de la tienda
             page: Página actual
             per_page: Elementos por página
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            projection: Campos a leer (None = documentos completos)
+            raw: Devolver los documentos sin formatear (ver BaseRepository.find_many)
             
         Returns:
             Dict: Lavadoras encontradas con información de paginación
@@ -63,7 +86,11 @@ class WasherRepository(BaseRepository):
         return self.find_many(
             filter_criteria={'store_id': store_id, 'is_active': True},
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            after=after,
+            count=count,
+            projection=projection,
+            raw=raw
         )
     
     def find_by_estado(self, estado: str, store_id: Optional[str] = None, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
@@ -188,9 +215,9 @@ class WasherRepository(BaseRepository):
         
         return stats
     
-    def create_indexes(self):
+    def get_indexes(self) -> List[IndexModel]:
         """
-        Crear índices para optimizar consultas
+        Índices de la colección (se aplican una sola vez al iniciar, ver index_registry)
         """
         indexes = [
             IndexModel([('numero', ASCENDING), ('store_id', ASCENDING)], unique=True),
@@ -200,4 +227,4 @@ class WasherRepository(BaseRepository):
             IndexModel([('created_at', ASCENDING)])
         ]
         
-        self.collection.create_indexes(indexes)
+        return indexes
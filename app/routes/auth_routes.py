@@ -1,8 +1,8 @@
 from flask import Blueprint, request
-from flask_jwt_extended import get_jwt_identity
+from flask_jwt_extended import get_jwt_identity, get_jwt
 from app.services.auth_service import AuthService
-from app.utils.response_utils import success_response, error_response, validation_error_response
-from app.utils.auth_utils import employee_required
+from app.utils.response_utils import success_response, error_response, validation_error_response, busy_response
+from app.utils.auth_utils import employee_required, get_current_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,6 +40,8 @@ def login():
                 data=result['data'],
                 message=result['message']
             )
+        elif result.get('busy'):
+            return busy_response(result['message'])
         else:
             status_code = 401 if 'Credenciales' in result['message'] else 400
             return error_response(
@@ -68,8 +70,8 @@ def logout(current_user):
         # Obtener ID del usuario actual
         user_id = get_jwt_identity()
         
-        # Procesar logout
-        result = auth_service.logout(user_id)
+        # Procesar logout (revoca el token actual)
+        result = auth_service.logout(user_id, get_jwt())
         
         if result['success']:
             return success_response(message=result['message'])
@@ -152,6 +154,8 @@ def change_password(current_user):
         
         if result['success']:
             return success_response(message=result['message'])
+        elif result.get('busy'):
+            return busy_response(result['message'])
         else:
             return error_response(
                 message=result['message'],
@@ -176,8 +180,13 @@ def get_profile(current_user):
         JSON con datos del usuario
     """
     try:
+        # Perfil completo desde la caché de usuarios
+        user_info = get_current_user()
+        if not user_info:
+            return error_response('Usuario no encontrado', 404)
+        
         return success_response(
-            data=current_user,
+            data=user_info,
             message='Perfil obtenido exitosamente'
         )
         
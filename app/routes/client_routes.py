@@ -2,6 +2,9 @@ from flask import Blueprint, request
 from app.services.client_service import ClientService
 from app.utils.response_utils import success_response, error_response, paginated_response
 from app.utils.auth_utils import employee_required
+from app.utils.pagination_utils import get_cursor_params, InvalidCursorError
+from app.utils.projection_utils import parse_fields, InvalidFieldsError
+from app.schemas.user_client_schema import UserClientResponseSchema
 import logging
 
 logger = logging.getLogger(__name__)
@@ -72,6 +75,9 @@ def get_clients(current_user):
         page: int - Página actual (default: 1)
         per_page: int - Elementos por página (default: 10)
         search: str - Término de búsqueda por nombre
+        after: str - Cursor de la página anterior; activa la paginación por cursor (vacío = primera página)
+        count: str - Total: exact, estimated o none (default: exact por página, none por cursor)
+        fields: str - Campos a devolver separados por coma (p. ej. _id,nombre)
         
     Returns:
         JSON con lista paginada de clientes
@@ -81,12 +87,17 @@ def get_clients(current_user):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search')
+        after, count = get_cursor_params(request.args)
+        fields = parse_fields(request.args, UserClientResponseSchema._declared_fields)
         
         # Procesar consulta
         result = client_service.get_clients_list(
             page=page,
             per_page=per_page,
-            search=search
+            search=search,
+            after=after,
+            count=count,
+            fields=fields
         )
         
         if result['success']:
@@ -100,6 +111,8 @@ def get_clients(current_user):
         else:
             return error_response(result['message'], 400)
             
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return error_response(str(e), 400)
     except Exception as e:
         logger.error(f"Error en get clients endpoint: {e}")
         return error_response('Error interno del servidor', 500)
@@ -2,6 +2,9 @@ from flask import Blueprint, request
 from app.services.dryer_service import DryerService
 from app.utils.response_utils import success_response, error_response
 from app.utils.auth_utils import employee_required
+from app.utils.pagination_utils import get_cursor_params, InvalidCursorError
+from app.utils.projection_utils import parse_fields, InvalidFieldsError
+from app.schemas.dryer_schema import DryerResponseSchema
 import logging
 
 logger = logging.getLogger(__name__)
@@ -71,6 +74,9 @@ def get_dryers(current_user):
         page: int - Página actual (default: 1)
         per_page: int - Elementos por página (default: 10)
         store_id: str - Filtrar por tienda
+        after: str - Cursor de la página anterior; activa la paginación por cursor (vacío = primera página)
+        count: str - Total: exact, estimated o none (default: exact por página, none por cursor)
+        fields: str - Campos a devolver separados por coma (p. ej. _id,numero,estado)
         
     Returns:
         JSON con lista paginada de secadoras
@@ -80,13 +86,18 @@ def get_dryers(current_user):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         store_id = request.args.get('store_id')
+        after, count = get_cursor_params(request.args)
+        fields = parse_fields(request.args, DryerResponseSchema._declared_fields)
         
         if store_id:
             # Procesar consulta por tienda
             result = dryer_service.get_dryers_by_store(
                 store_id=store_id,
                 page=page,
-                per_page=per_page
+                per_page=per_page,
+                after=after,
+                count=count,
+                fields=fields
             )
         else:
             return error_response('store_id es requerido', 400)
@@ -102,6 +113,8 @@ def get_dryers(current_user):
         else:
             return error_response(result['message'], 400)
             
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return error_response(str(e), 400)
     except Exception as e:
         logger.error(f"Error en get dryers endpoint: {e}")
         return error_response('Error interno del servidor', 500)
@@ -2,7 +2,7 @@ from flask import Blueprint, request
 from flask_jwt_extended import get_jwt_identity
 from app.services.employee_service import EmployeeService
 from app.utils.response_utils import success_response, error_response, paginated_response
-from app.utils.auth_utils import admin_required, employee_required
+from app.utils.auth_utils import admin_required, employee_required, get_current_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -285,8 +285,13 @@ def get_current_employee(current_user):
         JSON con datos del empleado actual
     """
     try:
+        # Perfil completo desde la caché de usuarios
+        user_info = get_current_user()
+        if not user_info:
+            return error_response('Usuario no encontrado', 404)
+        
         return success_response(
-            data=current_user,
+            data=user_info,
             message='Empleado actual obtenido exitosamente'
         )
         
@@ -2,6 +2,9 @@ from flask import Blueprint, request
 from app.services.product_service import ProductService
 from app.utils.response_utils import success_response, error_response
 from app.utils.auth_utils import employee_required
+from app.utils.pagination_utils import get_cursor_params, InvalidCursorError
+from app.utils.projection_utils import parse_fields, InvalidFieldsError
+from app.schemas.product_schema import ProductResponseSchema
 import logging
 
 logger = logging.getLogger(__name__)
@@ -72,6 +75,9 @@ def get_products(current_user):
         per_page: int - Elementos por página (default: 10)
         tipo: str - Filtrar por tipo
         search: str - Término de búsqueda
+        after: str - Cursor de la página anterior; activa la paginación por cursor (vacío = primera página)
+        count: str - Total: exact, estimated o none (default: exact por página, none por cursor)
+        fields: str - Campos a devolver separados por coma (p. ej. _id,nombre)
         
     Returns:
         JSON con lista paginada de productos
@@ -82,13 +88,18 @@ def get_products(current_user):
         per_page = request.args.get('per_page', 10, type=int)
         tipo = request.args.get('tipo')
         search = request.args.get('search')
+        after, count = get_cursor_params(request.args)
+        fields = parse_fields(request.args, ProductResponseSchema._declared_fields)
         
         # Procesar consulta
         result = product_service.get_products_list(
             page=page,
             per_page=per_page,
             tipo=tipo,
-            search=search
+            search=search,
+            after=after,
+            count=count,
+            fields=fields
         )
         
         if result['success']:
@@ -102,6 +113,8 @@ def get_products(current_user):
         else:
             return error_response(result['message'], 400)
             
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return error_response(str(e), 400)
     except Exception as e:
         logger.error(f"Error en get products endpoint: {e}")
         return error_response('Error interno del servidor', 500)
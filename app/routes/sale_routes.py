@@ -3,8 +3,12 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.sale_service import SaleService
 from app.services.nfc_payment_service import NFCPaymentService
 from app.utils.auth_utils import employee_required, admin_required
-from app.utils.response_utils import success_response, error_response, paginated_response
-from app import socketio # Importar la instancia de socketio
+from app.utils.response_utils import success_response, error_response, paginated_response, cursor_paginated_response
+from app.utils.pagination_utils import get_cursor_params, InvalidCursorError
+from app.utils.projection_utils import parse_fields, InvalidFieldsError
+from app.schemas.sale_schema import SaleResponseSchema
+from app.utils.identity_map_utils import with_identity_map
+from app.utils.socket_utils import emit_event
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,8 +18,12 @@ sale_bp = Blueprint('sales', __name__)
 sale_service = SaleService()
 nfc_payment_service = NFCPaymentService()
 
+# Campos que se pueden pedir con fields= en el listado de ventas
+SALE_LIST_FIELDS = set(SaleResponseSchema._declared_fields) | {'updated_at'}
+
 @sale_bp.route('/sales', methods=['POST'])
 @employee_required
+@with_identity_map
 def create_sale(current_user):
     """
     Crear nueva venta
@@ -38,7 +46,7 @@ def create_sale(current_user):
         
         if result['success']:
             # Emitir evento WebSocket para notificar nueva venta
-            socketio.emit('new_sale', result['data'])
+            emit_event('new_sale', result['data'], store_id=result['data'].get('store_id'))
             return success_response(
                 data=result['data'],
                 message=result['message'],
@@ -60,6 +68,10 @@ def get_sales(current_user):
     """
     Obtener lista de ventas con filtros
     GET /api/sales
+    
+    Paginación por página (page, per_page) o por cursor (after, per_page);
+    count=exact|estimated|none controla el cálculo del total y
+    fields=_id,status,total_amount limita los campos devueltos.
     """
     try:
 
@@ -71,6 +83,8 @@ def get_sales(current_user):
         client_id = request.args.get('client_id', type=str)
         today = request.args.get('today', False, type=bool)
         exclude_finalized = request.args.get('exclude_finalized', False, type=bool) # Nuevo parámetro
+        after, count = get_cursor_params(request.args)
+        fields = parse_fields(request.args, SALE_LIST_FIELDS)
         
         # Preparar filtros
         filters = {}
@@ -84,20 +98,28 @@ def get_sales(current_user):
             filters['today'] = True
         
         # Obtener ventas
-        result = sale_service.get_sales_list(page, per_page, exclude_finalized, **filters) # Pasar exclude_finalized
+        result = sale_service.get_sales_list(page, per_page, exclude_finalized, after=after, count=count, fields=fields, **filters) # Pasar exclude_finalized
         
-        if result['success']:
+        if result['success'] and after is not None:
+            return cursor_paginated_response(
+                data=result['data'],
+                pagination=result['pagination'],
+                message=result['message']
+            )
+        elif result['success']:
             pagination = result.get('pagination', {})
             return paginated_response(
                 data=result['data'],
                 page=pagination.get('page', page),
                 per_page=pagination.get('per_page', per_page),
-                total=pagination.get('total', 0),
+                total=pagination.get('total') or 0,
                 message=result['message']
             )
         else:
             return error_response(result['message'], 500)
             
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response('Error interno del servidor', 500)
 
@@ -162,6 +184,7 @@ def update_sale_status(current_user, sale_id):
 
 @sale_bp.route('/sales/<sale_id>/complete', methods=['POST'])
 @employee_required
+@with_identity_map
 def complete_sale(current_user, sale_id):
     """
     Completar venta y activar servicios
@@ -171,9 +194,8 @@ def complete_sale(current_user, sale_id):
         result = sale_service.complete_sale(sale_id)
 
         if result.get('success'):
-            # Emitir evento WebSocket para notificar venta completada y estado de máquinas
-            socketio.emit('sale_updated', result['data'])
-            socketio.emit('machine_status_updated')
+            # Emitir evento WebSocket para notificar venta completada (las máquinas llegan en 'machines_changed')
+            emit_event('sale_updated', result['data'], store_id=result['data'].get('store_id'))
             return success_response(
                 data=result['data'],
                 message=result['message']
@@ -184,7 +206,7 @@ def complete_sale(current_user, sale_id):
             errors = None
             if result.get('error_type') == 'esp32_activation_failed':
                 status_code = 503
-                errors = {'error_type': 'esp32_activation_failed'}
+                errors = {'error_type': 'esp32_activation_failed', 'activation': result.get('activation')}
             return error_response(result.get('message', 'Error al completar la venta'), status_code, errors=errors)
             
     except Exception as e:
@@ -193,6 +215,7 @@ def complete_sale(current_user, sale_id):
 
 @sale_bp.route('/sales/<sale_id>/finalize', methods=['POST'])
 @employee_required
+@with_identity_map
 def finalize_sale(current_user, sale_id):
     """
     Finalizar una venta
@@ -203,7 +226,7 @@ def finalize_sale(current_user, sale_id):
         
         if result['success']:
             # Emitir evento WebSocket para notificar venta finalizada
-            socketio.emit('sale_finalized', result['data'])
+            emit_event('sale_finalized', result['data'], store_id=result['data'].get('store_id'))
             return success_response(
                 data=result['data'],
                 message=result['message']
@@ -252,9 +275,9 @@ def deactivate_machines(current_user):
         result = sale_service.check_and_deactivate_machines()
         
         if result['success']:
-            # Emitir evento WebSocket para notificar cambios en el estado de las máquinas
-            socketio.emit('machine_status_updated')
+            # Las máquinas liberadas se notifican en 'machines_changed'
             return success_response(
+                data={key: value for key, value in result.items() if key not in ('success', 'message')},
                 message=result['message']
             )
         else:
@@ -295,7 +318,7 @@ def check_services_now(current_user):
         
         if result['success']:
             return success_response(
-                data={'updated_count': result.get('updated_count', 0)},
+                data={'updated_count': result.get('updated_count', 0), 'timings_ms': result.get('timings_ms')},
                 message=result['message']
             )
         else:
@@ -0,0 +1,131 @@
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_socketio import ConnectionRefusedError, join_room, leave_room
+from typing import Any, Dict, List, Optional
+from app.utils.auth_utils import user_from_claims
+from app.utils.socket_utils import TOPICS, rooms_for_connection
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Conexiones de este proceso: sid -> tienda y temas suscritos
+_connections: Dict[str, Dict[str, Any]] = {}
+_connections_lock = threading.Lock()
+
+def register_socket_handlers(socketio, require_auth: bool = True) -> None:
+    """
+    Registrar los handlers de conexión y suscripción de Socket.IO
+
+    Args:
+        socketio: Instancia de Flask-SocketIO
+        require_auth: Rechazar conexiones sin un access token válido
+    """
+
+    @socketio.on('connect')
+    def handle_connect(auth=None):
+        """
+        Autenticar la conexión con el JWT (auth={'token': ...} o ?token=) y unirla
+        a las salas de su tienda. auth={'topics': [...]} limita los temas iniciales.
+        """
+        auth = auth if isinstance(auth, dict) else {}
+        user = _authenticate(auth.get('token') or request.args.get('token'))
+        if user is None:
+            if require_auth:
+                raise ConnectionRefusedError('Token de autorización requerido')
+            # Sin autenticación obligatoria: la conexión recibe los eventos de todas las tiendas
+            user = {'_id': None, 'role': None, 'store_id': None}
+
+        # Los administradores reciben los eventos de todas las tiendas
+        store_id = None if user.get('role') == 'admin' else user.get('store_id')
+        if require_auth and user.get('role') != 'admin' and not store_id:
+            raise ConnectionRefusedError('Usuario sin tienda asignada')
+
+        topics = _parse_topics(auth.get('topics')) or list(TOPICS)
+        with _connections_lock:
+            _connections[request.sid] = {
+                'user_id': user.get('_id'),
+                'store_id': str(store_id) if store_id else None,
+                'topics': set(topics)
+            }
+        for room in rooms_for_connection(topics, str(store_id) if store_id else None):
+            join_room(room)
+        logger.debug(f"Socket {request.sid} conectado (tienda {store_id or 'todas'}, temas {topics})")
+
+    @socketio.on('subscribe')
+    def handle_subscribe(data=None):
+        """Suscribirse a más temas: {'topics': ['sales', 'machines', 'esp32']}"""
+        return _update_subscription(data, subscribe=True)
+
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data=None):
+        """Dejar de recibir temas: {'topics': [...]}"""
+        return _update_subscription(data, subscribe=False)
+
+    @socketio.on('disconnect')
+    def handle_disconnect(*args):
+        with _connections_lock:
+            _connections.pop(request.sid, None)
+
+def get_connection_stats() -> Dict[str, Any]:
+    """
+    Obtener conexiones de este proceso por tienda
+
+    Returns:
+        Dict: Total de conexiones y conexiones por tienda
+    """
+    with _connections_lock:
+        connections = list(_connections.values())
+
+    by_store: Dict[str, int] = {}
+    for connection in connections:
+        key = connection['store_id'] or '*'
+        by_store[key] = by_store.get(key, 0) + 1
+    return {'connections': len(connections), 'by_store': by_store}
+
+def _authenticate(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Validar un access token y devolver la identidad de sus claims (None si no es válido)"""
+    if not token:
+        return None
+
+    try:
+        decoded = decode_token(token)
+    except Exception as e:
+        logger.info(f"Conexión Socket.IO con token inválido: {e}")
+        return None
+
+    if decoded.get('type') != 'access':
+        return None
+
+    from app.services.token_blocklist import token_blocklist
+    if token_blocklist.is_revoked(decoded.get('jti'), decoded.get('sub'), decoded.get('iat')):
+        return None
+
+    return user_from_claims(decoded.get('sub'), decoded)
+
+def _parse_topics(topics: Any) -> List[str]:
+    """Filtrar la lista de temas pedida por el cliente"""
+    if isinstance(topics, str):
+        topics = [topics]
+    if not isinstance(topics, (list, tuple)):
+        return []
+    return [topic for topic in topics if topic in TOPICS]
+
+def _update_subscription(data: Any, subscribe: bool) -> Dict[str, Any]:
+    """Entrar o salir de las salas de los temas pedidos"""
+    topics = _parse_topics(data.get('topics') if isinstance(data, dict) else data)
+    with _connections_lock:
+        connection = _connections.get(request.sid)
+        if connection is None:
+            return {'success': False, 'message': 'Conexión no registrada'}
+        changed = [topic for topic in topics if (topic in connection['topics']) != subscribe]
+        if subscribe:
+            connection['topics'].update(changed)
+        else:
+            connection['topics'].difference_update(changed)
+        current = sorted(connection['topics'])
+        store_id = connection['store_id']
+
+    for room in rooms_for_connection(changed, store_id):
+        (join_room if subscribe else leave_room)(room)
+    return {'success': True, 'topics': current}
@@ -1,12 +1,17 @@
 from typing import Dict, Any, Optional
 from app.repositories.user_employee_repository import UserEmployeeRepository
-from app.utils.auth_utils import hash_password, verify_password, generate_token
+from app.utils.auth_utils import hash_password, verify_password, password_needs_rehash, generate_token, build_user_claims
+from app.utils.password_hasher import PasswordHasherBusyError
+from app.utils.cache_utils import user_info_cache
+from app.services.token_blocklist import token_blocklist
 from app.utils.validation_utils import validate_email, validate_password_strength
 from app.schemas.user_employee_schema import (
     user_employee_login_schema,
     user_employee_response_schema
 )
 from marshmallow import ValidationError
+from flask import current_app
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,14 +63,12 @@ class AuthService:
                     'message': 'Usuario inactivo'
                 }
             
-            # Generar token JWT
-            token_claims = {
-                'role': user['role'],
-                'store_id': user['store_id'],
-                'username': user['username']
-            }
+            # Regenerar el hash si cambió el costo configurado (BCRYPT_ROUNDS)
+            if password_needs_rehash(user['password_hash']):
+                self._rehash_password(user['_id'], validated_data['password'])
             
-            token = generate_token(user['_id'], token_claims)
+            # Generar token JWT (rol y tienda viajan firmados en el token)
+            token = generate_token(user['_id'], build_user_claims(user))
             
             # Preparar respuesta
             user_data = user_employee_response_schema.dump(user)
@@ -87,6 +90,13 @@ class AuthService:
                 'message': 'Datos de entrada inválidos',
                 'errors': e.messages
             }
+        except PasswordHasherBusyError as e:
+            logger.warning(f"Login rechazado: {e}")
+            return {
+                'success': False,
+                'message': 'Servidor ocupado, intente nuevamente',
+                'busy': True
+            }
         except Exception as e:
             logger.error(f"Error en login: {e}")
             return {
@@ -94,18 +104,45 @@ class AuthService:
                 'message': 'Error interno del servidor'
             }
     
+    def _rehash_password(self, user_id: str, password: str) -> None:
+        """
+        Guardar un hash nuevo de la contraseña con el costo configurado.
+        Si falla, el login continúa y se reintenta en el siguiente.
+        
+        Args:
+            user_id: ID del usuario
+            password: Contraseña ya verificada
+        """
+        try:
+            self.user_repository.update_document_by_id(
+                user_id,
+                {'$set': {'password_hash': hash_password(password)}}
+            )
+            logger.info(f"Hash de contraseña actualizado al costo configurado para usuario {user_id}")
+        except Exception as e:
+            logger.warning(f"No se pudo regenerar el hash de contraseña del usuario {user_id}: {e}")
+    
     def get_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
-        Obtener información del usuario por ID
+        Obtener información del usuario por ID.
+        Usa la caché de usuarios (TTL/LRU), que se invalida al actualizar o
+        desactivar al empleado; el hash de la contraseña no se guarda en caché.
         
         Args:
             user_id: ID del usuario
             
         Returns:
-            Dict: Información del usuario o None
+            Dict: Información del usuario (sin password_hash) o None
         """
         try:
-            return self.user_repository.find_by_id(user_id)
+            user_info = user_info_cache.get(str(user_id))
+            if user_info is None:
+                user = self.user_repository.find_by_id(user_id)
+                if not user:
+                    return None
+                user_info = {key: value for key, value in user.items() if key != 'password_hash'}
+                user_info_cache.set(str(user_id), user_info)
+            return dict(user_info)
         except Exception as e:
             logger.error(f"Error al obtener información del usuario: {e}")
             return None
@@ -207,6 +244,13 @@ class AuthService:
                     'message': 'Error al actualizar la contraseña'
                 }
                 
+        except PasswordHasherBusyError as e:
+            logger.warning(f"Cambio de contraseña rechazado: {e}")
+            return {
+                'success': False,
+                'message': 'Servidor ocupado, intente nuevamente',
+                'busy': True
+            }
         except Exception as e:
             logger.error(f"Error al cambiar contraseña: {e}")
             return {
@@ -214,19 +258,26 @@ class AuthService:
                 'message': 'Error interno del servidor'
             }
     
-    def logout(self, user_id: str) -> Dict[str, Any]:
+    def logout(self, user_id: str, token_claims: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Cerrar sesión del usuario
+        Cerrar sesión del usuario revocando el token actual
         
         Args:
             user_id: ID del usuario
+            token_claims: Claims del token a revocar (jti, exp)
             
         Returns:
             Dict: Resultado del logout
         """
         try:
-            # En una implementación más completa, aquí se podría
-            # agregar el token a una lista de tokens revocados
+            if token_claims and token_claims.get('jti'):
+                # La revocación vence junto con el token
+                if token_claims.get('exp'):
+                    expires_at = datetime.utcfromtimestamp(token_claims['exp'])
+                else:
+                    expires_at = datetime.utcnow() + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+                
+                token_blocklist.revoke(token_claims['jti'], user_id, expires_at)
             
             return {
                 'success': True,
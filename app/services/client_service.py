@@ -1,12 +1,15 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.user_client_repository import UserClientRepository
 from app.schemas.user_client_schema import (
     user_client_schema,
     user_client_update_schema,
     user_client_balance_schema,
     user_client_response_schema,
-    users_client_response_schema
+    users_client_response_schema,
+    UserClientResponseSchema
 )
+from app.utils.pagination_utils import build_pagination
+from app.utils.projection_utils import dump_fields
 from marshmallow import ValidationError
 import logging
 
@@ -152,7 +155,7 @@ class ClientService:
                 'message': 'Error interno del servidor'
             }
     
-    def get_clients_list(self, page: int = 1, per_page: int = 10, search: Optional[str] = None) -> Dict[str, Any]:
+    def get_clients_list(self, page: int = 1, per_page: int = 10, search: Optional[str] = None, after: Optional[str] = None, count: str = 'exact', fields: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Obtener lista de clientes con paginación
         
@@ -160,25 +163,23 @@ class ClientService:
             page: Página actual
             per_page: Elementos por página
             search: Término de búsqueda por nombre
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            fields: Campos a devolver (None = todos)
             
         Returns:
             Dict: Lista de clientes
         """
         try:
-            result = self.client_repository.find_clients_with_card_balance(search, page, per_page)
+            result = self.client_repository.find_clients_with_card_balance(search, page, per_page, after, count, fields)
             
-            clients_response = users_client_response_schema.dump(result['documents'])
+            clients_response = dump_fields(UserClientResponseSchema, result['documents'], fields)
             
             return {
                 'success': True,
                 'message': 'Clientes obtenidos exitosamente',
                 'data': clients_response,
-                'pagination': {
-                    'page': result['page'],
-                    'per_page': result['per_page'],
-                    'total': result['total'],
-                    'total_pages': result['total_pages']
-                }
+                'pagination': build_pagination(result)
             }
             
         except Exception as e:
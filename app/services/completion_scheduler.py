@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CompletionScheduler:
+    """
+    Planificador por fecha límite: mantiene un min-heap con el estimated_end_at
+    de cada servicio activo y dispara la verificación de servicios completados
+    justo cuando vence el más próximo, en lugar de consultar periódicamente.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, Optional[str]]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._callback: Optional[Callable[[], Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._generation = 0
+        self.last_fired: Optional[datetime] = None
+
+    def start(self, callback: Callable[[], Any]) -> None:
+        """
+        Iniciar el hilo del planificador
+
+        Args:
+            callback: Función a ejecutar cuando vence una fecha límite
+        """
+        with self._condition:
+            self._callback = callback
+            if self._running:
+                return
+            self._running = True
+            # Un hilo de una ejecución anterior (stop + start) termina al ver otra generación
+            self._generation += 1
+            generation = self._generation
+
+        self._thread = threading.Thread(target=self._run, args=(generation,), name='completion-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("Planificador de finalización de servicios iniciado")
+
+    def stop(self) -> None:
+        """Detener el hilo del planificador y descartar las fechas pendientes"""
+        with self._condition:
+            self._running = False
+            self._heap.clear()
+            self._condition.notify_all()
+
+    def schedule(self, deadline: Optional[datetime], key: Optional[str] = None) -> None:
+        """
+        Registrar una fecha límite de finalización (se ignora si el planificador
+        está detenido, ej. en una instancia que no es líder del monitor)
+
+        Args:
+            deadline: Hora estimada de finalización (UTC)
+            key: Identificador del servicio, solo para trazas
+        """
+        if deadline is None:
+            return
+
+        with self._condition:
+            if not self._running:
+                return
+            heapq.heappush(self._heap, (deadline, next(self._counter), key))
+            # Despertar al hilo solo si la nueva fecha es la más próxima
+            if self._heap[0][0] == deadline:
+                self._condition.notify()
+
+    def seed(self, services: Iterable[Dict[str, Any]]) -> int:
+        """
+        Cargar las fechas límite de los servicios activos existentes
+
+        Args:
+            services: Filas del índice de servicios activos
+
+        Returns:
+            int: Número de fechas límite cargadas
+        """
+        count = 0
+        for service in services:
+            deadline = service.get('estimated_end_at')
+            if deadline:
+                self.schedule(deadline, f"{service.get('sale_id')}:{service.get('service_index')}")
+                count += 1
+        return count
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtener estado del planificador
+
+        Returns:
+            Dict: Fechas pendientes y próxima fecha límite
+        """
+        with self._condition:
+            next_deadline = self._heap[0][0] if self._heap else None
+            pending = len(self._heap)
+
+        return {
+            'running': self._running,
+            'pending_deadlines': pending,
+            'next_deadline': next_deadline.isoformat() if next_deadline else None,
+            'last_fired': self.last_fired.isoformat() if self.last_fired else None
+        }
+
+    def _run(self, generation: int) -> None:
+        """Bucle del hilo: esperar hasta la próxima fecha límite y disparar"""
+        while True:
+            with self._condition:
+                while self._running and generation == self._generation:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+
+                    wait_seconds = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                    if wait_seconds <= 0:
+                        break
+                    self._condition.wait(timeout=wait_seconds)
+
+                if not self._running or generation != self._generation:
+                    return
+
+                # Consumir todas las fechas vencidas: una sola verificación las atiende
+                now = datetime.utcnow()
+                while self._heap and self._heap[0][0] <= now:
+                    heapq.heappop(self._heap)
+                callback = self._callback
+
+            self.last_fired = datetime.utcnow()
+            try:
+                if callback:
+                    callback()
+            except Exception as e:
+                logger.error(f"Error ejecutando verificación programada de servicios: {e}")
+
+# Instancia global del planificador
+completion_scheduler = CompletionScheduler()
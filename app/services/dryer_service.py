@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, cast
+from typing import Dict, Any, Optional, List, cast
 from app.repositories.dryer_repository import DryerRepository
 from app.repositories.service_cycle_repository import ServiceCycleRepository
 from app.schemas.dryer_schema import (
@@ -6,13 +6,16 @@ from app.schemas.dryer_schema import (
     dryer_update_schema,
     dryer_status_schema,
     dryer_response_schema,
-    dryers_response_schema
+    dryers_response_schema,
+    DryerResponseSchema
 )
 from app.utils.machine_utils import (
     get_machine_type_from_data,
     validate_cycle_machine_compatibility,
     get_compatible_cycles_for_machine
 )
+from app.utils.pagination_utils import build_pagination
+from app.utils.projection_utils import dump_fields
 from marshmallow import ValidationError
 import logging
 
@@ -127,7 +130,7 @@ class DryerService:
                 'message': 'Error interno del servidor'
             }
     
-    def get_dryers_by_store(self, store_id: str, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def get_dryers_by_store(self, store_id: str, page: int = 1, per_page: int = 10, after: Optional[str] = None, count: str = 'exact', fields: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Obtener secadoras por tienda
         
@@ -135,25 +138,23 @@ class DryerService:
             store_id: ID de la tienda
             page: Página actual
             per_page: Elementos por página
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            fields: Campos a devolver (None = todos)
             
         Returns:
             Dict: Lista de secadoras de la tienda
         """
         try:
-            result = self.dryer_repository.find_by_store(store_id, page, per_page)
+            result = self.dryer_repository.find_by_store(store_id, page, per_page, after, count, fields, raw=True)
             
-            dryers_response = dryers_response_schema.dump(result['documents'])
+            dryers_response = dump_fields(DryerResponseSchema, result['documents'], fields)
             
             return {
                 'success': True,
                 'message': 'Secadoras obtenidas exitosamente',
                 'data': dryers_response,
-                'pagination': {
-                    'page': result['page'],
-                    'per_page': result['per_page'],
-                    'total': result['total'],
-                    'total_pages': result['total_pages']
-                }
+                'pagination': build_pagination(result)
             }
             
         except Exception as e:
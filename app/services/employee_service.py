@@ -1,6 +1,8 @@
 from typing import Dict, Any, Optional
 from app.repositories.user_employee_repository import UserEmployeeRepository
-from app.utils.auth_utils import hash_password
+from app.utils.auth_utils import hash_password, build_user_claims
+from app.services.token_blocklist import token_blocklist
+from flask import current_app
 from app.schemas.user_employee_schema import (
     user_employee_schema,
     user_employee_update_schema,
@@ -31,6 +33,8 @@ class EmployeeService:
             Dict: Resultado de la operación
         """
         try:
+            existing_employee = None
+            
             # Validar datos según si es creación o actualización
             if '_id' in employee_data:
                 # Actualización
@@ -89,6 +93,13 @@ class EmployeeService:
             # Realizar upsert
             employee = self.employee_repository.upsert(validated_data)
             
+            # Cambió el rol, la tienda o el usuario, o se desactivó: los tokens emitidos dejan de valer
+            if employee and existing_employee and (
+                build_user_claims(employee) != build_user_claims(existing_employee)
+                or not employee.get('is_active', True)
+            ):
+                self._revoke_tokens(employee_id)
+            
             if employee:
                 employee_response = user_employee_response_schema.dump(employee)
                 return {
@@ -214,6 +225,7 @@ class EmployeeService:
             deleted = self.employee_repository.soft_delete(employee_id)
             
             if deleted:
+                self._revoke_tokens(employee_id)
                 return {
                     'success': True,
                     'message': 'Empleado eliminado exitosamente'
@@ -244,3 +256,15 @@ class EmployeeService:
             Dict: Lista de empleados de la tienda
         """
         return self.get_employees_list(page, per_page, store_id=store_id)
+    
+    def _revoke_tokens(self, employee_id: str) -> None:
+        """
+        Revocar los tokens del empleado en todos los workers (el rol y la tienda viajan en el token)
+        
+        Args:
+            employee_id: ID del empleado
+        """
+        try:
+            token_blocklist.revoke_user(str(employee_id), current_app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+        except Exception as e:
+            logger.error(f"Error al revocar los tokens del empleado {employee_id}: {e}")
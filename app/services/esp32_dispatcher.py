@@ -0,0 +1,267 @@
+import random
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ESP32CommandDispatcher:
+    """
+    Despachador en segundo plano de la bandeja de comandos ESP32 ('esp32_commands').
+    Envía los comandos con concurrencia acotada (un comando a la vez por máquina),
+    reintenta con backoff exponencial, descarta los comandos reemplazados o
+    vencidos e informa el resultado por Socket.IO ('esp32_command_result').
+    Así la latencia de una placa no bloquea el request ni el monitor.
+    """
+
+    def __init__(self):
+        # Si está deshabilitado, las ventas y el monitor envían los comandos en línea
+        self.enabled = True
+        self.max_concurrency = 4
+        self.max_attempts = 5
+        self.backoff_seconds = 2.0
+        self.max_backoff_seconds = 60.0
+        self.poll_seconds = 2.0
+        self.lease_seconds = 30.0
+        self._in_flight: Dict[str, Any] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._delivered = 0
+        self._failed = 0
+        self._retried = 0
+        self.last_error: Optional[str] = None
+
+    def configure(self, enabled: bool, max_concurrency: int, max_attempts: int, backoff_seconds: float,
+                  max_backoff_seconds: float, poll_seconds: float) -> None:
+        """
+        Ajustar concurrencia, reintentos y frecuencia de sondeo
+
+        Args:
+            enabled: Usar la bandeja de comandos (False = envío en línea)
+            max_concurrency: Comandos enviados en paralelo por proceso
+            max_attempts: Intentos antes de marcar un comando como fallido
+            backoff_seconds: Espera base entre reintentos (se duplica en cada intento)
+            max_backoff_seconds: Espera máxima entre reintentos
+            poll_seconds: Sondeo de la bandeja (comandos de otros procesos y reintentos)
+        """
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.poll_seconds = poll_seconds
+
+    def start(self) -> None:
+        """Iniciar el hilo del despachador"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='esp32-dispatch')
+
+        self._thread = threading.Thread(target=self._run, name='esp32-dispatcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Despachador de comandos ESP32 iniciado ({self.max_concurrency} envíos concurrentes)")
+
+    def stop(self) -> None:
+        """Detener el despachador (los comandos en envío terminan; los pendientes quedan en la bandeja)"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def enqueue(self, command: str, esp32_id: str, machine_id: str, payload: Dict[str, Any],
+                sale_id: Optional[str] = None, service_index: Optional[int] = None,
+                expires_at: Optional[datetime] = None, store_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Registrar un comando en la bandeja y despertar al despachador
+
+        Args:
+            command: 'start' o 'stop'
+            esp32_id: ID del ESP32 de la máquina
+            machine_id: ID de la máquina
+            payload: Datos del comando
+            sale_id: Venta asociada
+            service_index: Índice del servicio en la venta
+            expires_at: Momento a partir del cual el comando ya no se envía
+            store_id: Tienda de la máquina (sala del evento esp32_command_result)
+
+        Returns:
+            Dict: Comando registrado
+        """
+        from app.repositories.esp32_command_repository import ESP32CommandRepository
+
+        document = ESP32CommandRepository().enqueue(
+            command, esp32_id, machine_id, payload, sale_id, service_index, expires_at, store_id
+        )
+        with self._condition:
+            self._condition.notify()
+        return document
+
+    def dispatch_due(self) -> int:
+        """
+        Tomar los comandos listos y enviarlos en el pool
+
+        Returns:
+            int: Número de comandos tomados
+        """
+        from app.repositories.esp32_command_repository import ESP32CommandRepository
+
+        with self._condition:
+            free = self.max_concurrency - len(self._in_flight)
+            busy_machines = list(self._in_flight.keys())
+        if free <= 0:
+            return 0
+
+        commands = ESP32CommandRepository().claim_due(free, self.lease_seconds, busy_machines)
+        for command in commands:
+            with self._condition:
+                self._in_flight[command['machine_id']] = command['_id']
+            self._executor.submit(self._deliver, command)
+        return len(commands)
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtener estado del despachador
+
+        Returns:
+            Dict: Comandos por estado en la bandeja, envíos en curso y contadores del proceso
+        """
+        from app.repositories.esp32_command_repository import ESP32CommandRepository
+
+        try:
+            outbox = ESP32CommandRepository().count_by_status()
+        except Exception as e:
+            outbox = {'error': str(e)}
+
+        return {
+            'enabled': self.enabled,
+            'running': self._running,
+            'outbox': outbox,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': len(self._in_flight),
+            'delivered': self._delivered,
+            'retried': self._retried,
+            'failed': self._failed,
+            'last_error': self.last_error
+        }
+
+    def _run(self) -> None:
+        """Bucle del hilo: despachar y esperar un nuevo comando, un lugar libre o el sondeo"""
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+
+            try:
+                self.dispatch_due()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error al despachar comandos ESP32: {e}")
+
+            with self._condition:
+                if self._running:
+                    self._condition.wait(timeout=self.poll_seconds)
+
+    def _deliver(self, command: Dict[str, Any]) -> None:
+        """Enviar un comando y registrar su resultado"""
+        from app.repositories.esp32_command_repository import ESP32CommandRepository
+
+        repository = ESP32CommandRepository()
+        try:
+            expires_at = command.get('expires_at')
+            if expires_at and expires_at <= datetime.utcnow():
+                repository.mark_expired(command['_id'])
+                logger.info(f"Comando {command['command']} para máquina {command['machine_id']} vencido; no se envía")
+                return
+
+            if repository.has_newer_command(command):
+                repository.mark_superseded(command['_id'])
+                logger.info(f"Comando {command['command']} para máquina {command['machine_id']} reemplazado; no se envía")
+                return
+
+            result = self._send(command)
+            if result.get('success'):
+                repository.mark_delivered(command['_id'], result.get('esp32_response'))
+                self._delivered += 1
+                self._report(command, 'delivered', result.get('message'))
+                return
+
+            error = result.get('message') or 'Error desconocido'
+            if repository.has_newer_command(command):
+                # Un reintento no debe pisar un comando posterior para la misma máquina
+                repository.mark_superseded(command['_id'])
+            elif command['attempts'] >= self.max_attempts:
+                repository.mark_failed(command['_id'], error)
+                self._failed += 1
+                self.last_error = error
+                logger.error(f"Comando {command['command']} para máquina {command['machine_id']} fallido tras {command['attempts']} intentos: {error}")
+                self._report(command, 'failed', error)
+                if command['command'] == 'start' and command.get('sale_id') is not None:
+                    self._revert_start(command, error)
+            else:
+                repository.schedule_retry(command['_id'], error, datetime.utcnow() + self._backoff(command['attempts']))
+                self._retried += 1
+                logger.warning(f"Reintento {command['attempts']} de comando {command['command']} para máquina {command['machine_id']}: {error}")
+
+        except Exception as e:
+            # El lease vence y otro ciclo retoma el comando
+            self.last_error = str(e)
+            logger.error(f"Error al entregar comando ESP32 {command.get('_id')}: {e}")
+        finally:
+            with self._condition:
+                self._in_flight.pop(command['machine_id'], None)
+                # Hay un lugar libre: despachar lo siguiente sin esperar el sondeo
+                self._condition.notify()
+
+    def _revert_start(self, command: Dict[str, Any], error: str) -> None:
+        """La máquina nunca arrancó: devolver el servicio a 'pending' y liberar la máquina"""
+        try:
+            from app.services.sale_service import SaleService
+            SaleService().handle_start_command_failed(
+                command['sale_id'], command['service_index'], command['machine_id'], error
+            )
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error al revertir el servicio de la venta {command['sale_id']}: {e}")
+
+    def _send(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecutar el comando con ESP32Service"""
+        from app.services.esp32_service import ESP32Service
+
+        esp32_service = ESP32Service()
+        if command['command'] == 'start':
+            return esp32_service.start_machine(command['esp32_id'], command['payload'])
+        return esp32_service.stop_machine(command['esp32_id'], command['payload'])
+
+    def _backoff(self, attempts: int) -> timedelta:
+        """Espera exponencial con jitter antes del siguiente intento"""
+        delay = min(self.backoff_seconds * (2 ** (attempts - 1)), self.max_backoff_seconds)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def _report(self, command: Dict[str, Any], status: str, message: Optional[str]) -> None:
+        """Emitir el resultado del comando por Socket.IO a la tienda de la máquina"""
+        try:
+            from app.utils.socket_utils import emit_event
+            emit_event('esp32_command_result', {
+                'command_id': str(command['_id']),
+                'command': command['command'],
+                'machine_id': command['machine_id'],
+                'esp32_id': command['esp32_id'],
+                'sale_id': command.get('sale_id'),
+                'service_index': command.get('service_index'),
+                'status': status,
+                'attempts': command['attempts'],
+                'message': message,
+                'timestamp': datetime.utcnow().isoformat()
+            }, store_id=command.get('store_id'))
+        except Exception as e:
+            logger.error(f"Error emitiendo resultado de comando ESP32: {e}")
+
+# Instancia global del despachador de comandos ESP32
+esp32_dispatcher = ESP32CommandDispatcher()
@@ -1,8 +1,8 @@
-import requests
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
 from app.repositories.store_repository import StoreRepository
+from app.utils.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +13,19 @@ class ESP32Service:
     """
     
     def __init__(self):
-        # URL del microservicio ESP32 que actúa como intermediario
-        self.base_url = "http://localhost:5002"
-        self.timeout = 10
+        # Cliente keep-alive del microservicio ESP32 que actúa como intermediario (ESP32_SERVICE_URL)
+        self.http = http_clients.get('esp32')
         self.store_repository = StoreRepository()
     
+    def has_device(self, esp32_id: str) -> bool:
+        """
+        Verificar si el ESP32 tiene URL configurada (directorio en memoria, sin consultar la BD)
+        
+        Args:
+            esp32_id: El ID del ESP32
+        """
+        return self.store_repository.get_esp32_url_by_id(esp32_id) is not None
+    
     def start_machine(self, esp32_id: str, machine_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Envía comando para iniciar una máquina física
@@ -27,8 +35,8 @@ class ESP32Service:
             machine_data: Información sobre qué hacer (hora inicio, fin, etc.)
         """
         try:
-            # Obtener URL del ESP32 desde DB (colección esp32_config)
-            esp32_url = self.store_repository.get_esp32_url_by_id("100")
+            # URL del ESP32 de esta máquina (directorio en memoria de esp32_config)
+            esp32_url = self.store_repository.get_esp32_url_by_id(esp32_id)
             if not esp32_url:
                 return {
                     'success': False,
@@ -48,12 +56,8 @@ class ESP32Service:
             
             logger.info(f"Enviando comando de inicio a ESP32 {esp32_id}")
             
-            # Enviar la petición al microservicio ESP32 (puerto 5002)
-            response = requests.post(
-                f"{self.base_url}/send-to-esp32",
-                json=payload,
-                timeout=self.timeout
-            )
+            # Enviar la petición al microservicio ESP32 (conexión reutilizada del pool)
+            response = self.http.post("/send-to-esp32", json=payload)
             
             if response.status_code == 200:
                 return {
@@ -79,7 +83,7 @@ class ESP32Service:
         Envía comando para detener una máquina física
         """
         try:
-            esp32_url = self.store_repository.get_esp32_url_by_id("100")
+            esp32_url = self.store_repository.get_esp32_url_by_id(esp32_id)
             if not esp32_url:
                 return {
                     'success': False,
@@ -94,11 +98,7 @@ class ESP32Service:
                 }
             }
             
-            response = requests.post(
-                f"{self.base_url}/send-to-esp32",
-                json=payload,
-                timeout=self.timeout
-            )
+            response = self.http.post("/send-to-esp32", json=payload)
             
             if response.status_code == 200:
                 return {
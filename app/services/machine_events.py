@@ -0,0 +1,201 @@
+"""
+Eventos de máquinas agrupados y con solo los campos cambiados
+
+En lugar de un 'machine_updated' con el documento completo por cada
+transición, los cambios de máquinas se acumulan durante una ventana corta
+(100 ms por defecto) y se emiten en un único 'machines_changed' por tienda:
+
+    {
+        "source": "3f9a1c2e",          # proceso que emite
+        "version": 42,                 # consecutivo por tienda y proceso
+        "store_id": "...",
+        "machines": [{"machine_id": "...", "operation": "activated",
+                      "changes": {"estado": "ocupada", "current_service": {...}}}],
+        "timestamp": "..."
+    }
+
+Un campo eliminado viaja como null. 'estado' y 'current_service' viajan
+siempre: con varios workers, el proceso que ocupa una máquina no es el que la
+libera, y su copia local puede no reflejar lo que ya vieron los clientes. Si
+el cliente ve un salto en version para un mismo source, perdió un mensaje y
+debe recargar las máquinas.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+import threading
+import uuid
+import logging
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Campos que viajan en cada cambio aunque no difieran de la copia local
+ALWAYS_SENT_FIELDS = ('estado', 'current_service')
+
+def _jsonable(value: Any) -> Any:
+    """Convertir fechas y ObjectId para que el documento se pueda emitir por Socket.IO"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+def _diff(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos de primer nivel que cambiaron (los eliminados valen None)"""
+    if previous is None:
+        return dict(current)
+
+    changes = {key: value for key, value in current.items() if previous.get(key) != value}
+    for key in previous:
+        if key not in current:
+            changes[key] = None
+    for key in ALWAYS_SENT_FIELDS:
+        changes[key] = current.get(key)
+    return changes
+
+class MachineEventCoalescer:
+    """
+    Acumula los cambios de máquinas y los emite agrupados por tienda
+    """
+
+    def __init__(self, window_seconds: float = 0.1):
+        # Si está deshabilitado se emite 'machine_updated' con el documento completo (comportamiento anterior)
+        self.enabled = True
+        self.window_seconds = window_seconds
+        # Emitir también 'machine_updated' (clientes que aún no escuchan 'machines_changed')
+        self.legacy_events = False
+        self.source = uuid.uuid4().hex[:8]
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[Optional[str], Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[Optional[str], int] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._published = 0
+        self._emitted = 0
+
+    def configure(self, enabled: bool, window_seconds: float, legacy_events: bool) -> None:
+        """
+        Ajustar la agrupación de eventos
+
+        Args:
+            enabled: Emitir 'machines_changed' agrupados (False = un 'machine_updated' por cambio)
+            window_seconds: Ventana durante la que se acumulan los cambios
+            legacy_events: Emitir además 'machine_updated' con el documento completo
+        """
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.legacy_events = legacy_events
+
+    def publish(self, machine_id: str, machine_data: Dict[str, Any], operation: str,
+                previous: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Registrar el nuevo estado de una máquina
+
+        Args:
+            machine_id: ID de la máquina
+            machine_data: Documento actualizado de la máquina
+            operation: Operación que produjo el cambio ('activated', 'available', ...)
+            previous: Documento anterior, si se conoce; tiene prioridad sobre la copia local,
+                      que puede estar desactualizada si otro proceso cambió la máquina
+        """
+        machine_id = str(machine_id)
+        current = _jsonable({key: value for key, value in (machine_data or {}).items() if key != '_id'})
+        store_id = current.get('store_id')
+
+        if not self.enabled or self.legacy_events:
+            self._emit_legacy(machine_id, current, operation, store_id)
+
+        with self._lock:
+            if previous is not None:
+                baseline = _jsonable({key: value for key, value in previous.items() if key != '_id'})
+            else:
+                baseline = self._snapshots.get(machine_id)
+            self._snapshots[machine_id] = current
+            self._published += 1
+            if not self.enabled:
+                return
+
+            changes = _diff(baseline, current)
+            entry = self._pending.setdefault(store_id, {}).setdefault(machine_id, {'changes': {}})
+            entry['changes'].update(changes)
+            entry['operation'] = operation
+
+            if self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> int:
+        """
+        Emitir los cambios acumulados (un 'machines_changed' por tienda)
+
+        Returns:
+            int: Número de eventos emitidos
+        """
+        from app.utils.socket_utils import emit_event
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+            messages = []
+            for store_id, machines in pending.items():
+                version = self._versions.get(store_id, 0) + 1
+                self._versions[store_id] = version
+                messages.append((store_id, {
+                    'source': self.source,
+                    'version': version,
+                    'store_id': store_id,
+                    'machines': [
+                        {'machine_id': machine_id, 'operation': entry['operation'], 'changes': entry['changes']}
+                        for machine_id, entry in machines.items()
+                    ],
+                    'timestamp': datetime.utcnow().isoformat()
+                }))
+
+        for store_id, message in messages:
+            try:
+                emit_event('machines_changed', message, store_id=store_id)
+                self._emitted += 1
+            except Exception as e:
+                logger.error(f"Error emitiendo cambios de máquinas de la tienda {store_id}: {e}")
+        return len(messages)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener contadores de la agrupación
+
+        Returns:
+            Dict: Cambios publicados, eventos emitidos y versiones por tienda
+        """
+        return {
+            'enabled': self.enabled,
+            'window_ms': round(self.window_seconds * 1000),
+            'source': self.source,
+            'published': self._published,
+            'emitted': self._emitted,
+            'versions': {str(store_id): version for store_id, version in self._versions.items()}
+        }
+
+    def _emit_legacy(self, machine_id: str, machine_data: Dict[str, Any], operation: str,
+                     store_id: Optional[str]) -> None:
+        """Emitir 'machine_updated' con el documento completo"""
+        from app.utils.socket_utils import emit_event
+
+        try:
+            emit_event('machine_updated', {
+                'machine_id': machine_id,
+                'machine_data': {'_id': machine_id, **machine_data},
+                'operation': operation,
+                'timestamp': datetime.utcnow().isoformat()
+            }, store_id=store_id)
+        except Exception as e:
+            logger.error(f"Error emitiendo evento de máquina: {e}")
+
+# Instancia global de eventos de máquinas
+machine_events = MachineEventCoalescer()
@@ -1,11 +1,19 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional
 from app.services.sale_service import SaleService
-from app import socketio
+from app.services.completion_scheduler import completion_scheduler
+from app.utils.http_client import http_clients
+from app.services.esp32_dispatcher import esp32_dispatcher
+from app.services.monitor_leader import monitor_leader
+from app.services.machine_events import machine_events
 
 logger = logging.getLogger(__name__)
 
+# Margen al traer fechas límite nuevas, para tolerar diferencias de reloj entre workers
+DEADLINE_SYNC_OVERLAP = timedelta(seconds=30)
+
 class MachineMonitorService:
     """
     Servicio para monitorear automáticamente el estado de las máquinas
@@ -15,14 +23,26 @@ class MachineMonitorService:
     def __init__(self):
         self.sale_service = SaleService()
         self.last_check = datetime.utcnow()
+        self._deadlines_synced_at: Optional[datetime] = None
+        # El planificador de fechas límite y la reconciliación periódica comparten la verificación
+        self._check_lock = threading.Lock()
     
     def check_and_notify_completed_services(self) -> Dict[str, Any]:
         """
-        Verificar servicios completados y emitir notificaciones WebSocket
+        Verificar servicios completados y emitir notificaciones WebSocket.
+        Si ya hay una verificación en curso en este proceso, se omite.
         
         Returns:
             Dict: Resultado de la verificación
         """
+        if not self._check_lock.acquire(blocking=False):
+            logger.debug("Verificación de servicios ya en curso; se omite")
+            return {
+                'success': True,
+                'updated_count': 0,
+                'skipped': True,
+                'message': 'Verificación ya en curso.'
+            }
         try:
             logger.info("🔍 Verificando servicios completados...")
             
@@ -30,33 +50,11 @@ class MachineMonitorService:
             result = self.sale_service.check_and_deactivate_machines()
             
             if result['success']:
-                # Extraer el número de máquinas actualizadas del mensaje
-                message = result['message']
-                updated_count = 0
-                if message:
-                    try:
-                        # Extraer número del mensaje ej: "5 máquinas y servicios actualizados."
-                        updated_count = int(message.split(' ')[0])
-                    except:
-                        updated_count = 0
+                updated_count = result.get('completed_count', 0)
                 
                 if updated_count > 0:
-                    logger.info(f"✅ {updated_count} servicios completados detectados")
-                    
-                    # Emitir eventos WebSocket para notificar cambios
-                    socketio.emit('services_completed', {
-                        'count': updated_count,
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'message': f'{updated_count} servicios han sido completados'
-                    })
-                    
-                    # También emitir el evento estándar de actualización de máquinas
-                    socketio.emit('machine_status_updated', {
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'reason': 'services_completed'
-                    })
-                    
-                    logger.info(f"📡 Eventos WebSocket emitidos para {updated_count} servicios completados")
+                    # SaleService ya emitió un único evento 'services_completed' con todo el lote
+                    logger.info(f"✅ {updated_count} servicios completados detectados ({result.get('timings_ms', {}).get('total')} ms)")
                 else:
                     logger.debug("ℹ️ No se detectaron servicios completados")
                 
@@ -65,6 +63,7 @@ class MachineMonitorService:
                 return {
                     'success': True,
                     'updated_count': updated_count,
+                    'timings_ms': result.get('timings_ms'),
                     'message': f'Verificación completada. {updated_count} servicios actualizados.'
                 }
             else:
@@ -80,18 +79,66 @@ class MachineMonitorService:
                 'success': False,
                 'message': f'Error interno en monitoreo: {str(e)}'
             }
+        finally:
+            self._check_lock.release()
+    
+    def seed_deadlines(self) -> int:
+        """
+        Cargar en el planificador todas las fechas límite de los servicios activos
+        (al pasar a ser líder)
+        
+        Returns:
+            int: Número de fechas límite cargadas
+        """
+        from app.repositories.active_service_repository import ActiveServiceRepository
+        
+        self._deadlines_synced_at = datetime.utcnow()
+        return completion_scheduler.seed(ActiveServiceRepository().find_all_active())
+    
+    def sync_deadlines(self) -> int:
+        """
+        Traer las fechas límite de los servicios activados desde la última sincronización,
+        incluidos los de ventas completadas en otros workers (latido del líder)
+        
+        Returns:
+            int: Número de fechas límite cargadas
+        """
+        from app.repositories.active_service_repository import ActiveServiceRepository
+        
+        now = datetime.utcnow()
+        since = (self._deadlines_synced_at or now) - DEADLINE_SYNC_OVERLAP
+        self._deadlines_synced_at = now
+        return completion_scheduler.seed(ActiveServiceRepository().find_updated_since(since))
     
     def get_status(self) -> Dict[str, Any]:
         """
         Obtener estado del monitor
         
         Returns:
-            Dict: Estado actual del monitor
+            Dict: Estado actual del monitor, líder, métricas de los microservicios (ESP32, NFC) y bandeja de comandos
         """
         return {
             'last_check': self.last_check.isoformat() if self.last_check else None,
             'status': 'active',
-            'service': 'machine_monitor'
+            'service': 'machine_monitor',
+            'leader': monitor_leader.get_status(),
+            'scheduler': completion_scheduler.get_status(),
+            'upstreams': http_clients.get_stats(),
+            'esp32_dispatcher': esp32_dispatcher.get_status(),
+            'socketio': self._get_socketio_status()
+        }
+    
+    def _get_socketio_status(self) -> Dict[str, Any]:
+        """Backend de Socket.IO: en proceso o con cola de mensajes entre workers"""
+        from app import socketio
+        from app.routes.socket_routes import get_connection_stats
+        
+        manager = getattr(getattr(socketio, 'server', None), 'manager', None)
+        return {
+            'manager': getattr(manager, 'name', None) or type(manager).__name__ if manager else None,
+            'channel': getattr(manager, 'channel', None),
+            'machine_events': machine_events.get_stats(),
+            **get_connection_stats()
         }
 
 # Instancia global del monitor
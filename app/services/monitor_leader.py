@@ -0,0 +1,214 @@
+"""
+Elección de líder del monitor de máquinas
+
+Cada proceso que llama a create_app (workers de gunicorn/eventlet, varios
+nodos) compite por el lease 'machine_monitor' en MongoDB. Solo el que lo
+tiene ejecuta el planificador de finalización y el barrido de
+reconciliación; los demás renuevan su intento en cada latido y toman el
+relevo cuando el lease vence (caída) o se libera (apagado ordenado).
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import os
+import socket
+import threading
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'machine_monitor'
+
+class MonitorLeader:
+    """
+    Lease con latido que decide qué instancia ejecuta el monitor de máquinas
+    """
+
+    def __init__(self, lease_seconds: float = 15, heartbeat_seconds: float = 5):
+        # Si está deshabilitado, esta instancia es líder siempre (despliegue de un solo proceso)
+        self.enabled = True
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._is_leader = False
+        self._lease_expires_at: Optional[datetime] = None
+        self._acquired_at: Optional[datetime] = None
+        self._on_elected: Optional[Callable[[], Any]] = None
+        self._on_demoted: Optional[Callable[[], Any]] = None
+        self._on_heartbeat: Optional[Callable[[], Any]] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._elections = 0
+        self.last_heartbeat: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def configure(self, enabled: bool, lease_seconds: float, heartbeat_seconds: float) -> None:
+        """
+        Ajustar la elección de líder
+
+        Args:
+            enabled: Competir por el lease (False = esta instancia siempre es líder)
+            lease_seconds: Vigencia del lease; tiempo máximo de relevo si el líder cae
+            heartbeat_seconds: Intervalo de renovación del lease (menor que lease_seconds)
+        """
+        self.enabled = enabled
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = min(heartbeat_seconds, lease_seconds / 2)
+
+    def start(self, on_elected: Callable[[], Any], on_demoted: Callable[[], Any],
+              on_heartbeat: Optional[Callable[[], Any]] = None) -> None:
+        """
+        Empezar a competir por el liderazgo
+
+        Args:
+            on_elected: Se ejecuta al obtener el lease (iniciar el monitor)
+            on_demoted: Se ejecuta al perderlo (detener el monitor)
+            on_heartbeat: Se ejecuta en cada latido mientras se es líder
+        """
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._on_heartbeat = on_heartbeat
+        self._stop.clear()
+
+        if not self.enabled:
+            self._promote(None)
+            return
+
+        self._thread = threading.Thread(target=self._run, name='monitor-leader', daemon=True)
+        self._thread.start()
+        logger.info(f"Elección de líder del monitor iniciada ({self.holder})")
+
+    def stop(self) -> None:
+        """Dejar de competir y liberar el lease para que otra instancia lo tome de inmediato"""
+        self._stop.set()
+        if not self._is_leader:
+            return
+
+        self._demote('apagado')
+        if self.enabled:
+            try:
+                from app.repositories.lease_repository import LeaseRepository
+                LeaseRepository().release(LEASE_NAME, self.holder)
+            except Exception as e:
+                logger.error(f"Error al liberar el lease del monitor: {e}")
+
+    def heartbeat(self) -> bool:
+        """
+        Tomar o renovar el lease y aplicar el cambio de rol si lo hubo
+
+        Returns:
+            bool: True si esta instancia es líder tras el latido
+        """
+        from app.repositories.lease_repository import LeaseRepository
+
+        try:
+            lease = LeaseRepository().try_acquire(
+                LEASE_NAME, self.holder, self.lease_seconds, acquiring=not self._is_leader
+            )
+            self.last_heartbeat = datetime.utcnow()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error al renovar el lease del monitor: {e}")
+            # Sin MongoDB no se puede garantizar exclusividad una vez vencido el lease propio
+            if self._is_leader and self._lease_expires_at and datetime.utcnow() >= self._lease_expires_at:
+                self._demote('lease vencido sin poder renovarlo')
+            return self._is_leader
+
+        if lease is None:
+            if self._is_leader:
+                self._demote('lease tomado por otra instancia')
+            return False
+
+        self._lease_expires_at = lease['expires_at']
+        if not self._is_leader:
+            self._promote(lease.get('acquired_at'))
+        elif self._on_heartbeat:
+            try:
+                self._on_heartbeat()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error en el latido del líder del monitor: {e}")
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtener el estado de la elección
+
+        Returns:
+            Dict: Instancia local, si es líder y el líder actual según el lease
+        """
+        leader = self.holder if self._is_leader else None
+        lease_expires_at = self._lease_expires_at if self._is_leader else None
+        if self.enabled:
+            try:
+                from app.repositories.lease_repository import LeaseRepository
+                lease = LeaseRepository().get_lease(LEASE_NAME)
+                if lease and lease['expires_at'] > datetime.utcnow():
+                    leader = lease['holder']
+                    lease_expires_at = lease['expires_at']
+                else:
+                    leader = None
+            except Exception as e:
+                self.last_error = str(e)
+
+        return {
+            'enabled': self.enabled,
+            'instance': self.holder,
+            'is_leader': self._is_leader,
+            'leader': leader,
+            'lease_expires_at': lease_expires_at.isoformat() if lease_expires_at else None,
+            'acquired_at': self._acquired_at.isoformat() if self._acquired_at else None,
+            'lease_seconds': self.lease_seconds,
+            'heartbeat_seconds': self.heartbeat_seconds,
+            'elections': self._elections,
+            'last_heartbeat': self.last_heartbeat.isoformat() if self.last_heartbeat else None,
+            'last_error': self.last_error
+        }
+
+    def _run(self) -> None:
+        """Bucle del hilo: un latido cada heartbeat_seconds hasta stop()"""
+        while not self._stop.is_set():
+            self.heartbeat()
+            self._stop.wait(self.heartbeat_seconds)
+
+    def _promote(self, acquired_at: Optional[datetime]) -> None:
+        """Pasar a líder e iniciar el monitor"""
+        with self._lock:
+            if self._is_leader:
+                return
+            self._is_leader = True
+            self._acquired_at = acquired_at or datetime.utcnow()
+            self._elections += 1
+
+        logger.info(f"Instancia {self.holder} es líder del monitor de máquinas")
+        try:
+            if self._on_elected:
+                self._on_elected()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error al iniciar el monitor como líder: {e}")
+
+    def _demote(self, reason: str) -> None:
+        """Dejar de ser líder y detener el monitor"""
+        with self._lock:
+            if not self._is_leader:
+                return
+            self._is_leader = False
+            self._lease_expires_at = None
+
+        logger.warning(f"Instancia {self.holder} deja de ser líder del monitor: {reason}")
+        try:
+            if self._on_demoted:
+                self._on_demoted()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error al detener el monitor: {e}")
+
+# Instancia global de la elección de líder del monitor
+monitor_leader = MonitorLeader()
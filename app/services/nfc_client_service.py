@@ -1,40 +1,66 @@
- 
 import requests
 import logging
+import time
 from typing import Dict, Any, Optional
+from app.utils.http_client import http_clients, HttpClient
 
 logger = logging.getLogger(__name__)
 
+# Segundos que se reutiliza un estado "conectado" del lector antes de volver a consultarlo
+STATUS_CACHE_SECONDS = 5
+
+# Último estado conectado del lector: (estado, momento de la consulta)
+_status_cache: Dict[str, Any] = {}
+
 class NFCClientService:
     """Cliente para comunicarse con microservicio NFC"""
     
-    def __init__(self, nfc_base_url: str = "http://localhost:5001"):
-        self.nfc_base_url = nfc_base_url
+    def __init__(self, nfc_base_url: Optional[str] = None):
+        # Cliente keep-alive compartido (NFC_SERVICE_URL); una URL explícita usa un cliente propio
+        self.http = HttpClient('nfc', nfc_base_url) if nfc_base_url else http_clients.get('nfc')
+        self.nfc_base_url = self.http.base_url
         self.logger = logger
     
-    def get_status(self) -> Dict[str, Any]:
-        """Obtener estado del lector NFC"""
+    def get_status(self, max_age: float = 0) -> Dict[str, Any]:
+        """
+        Obtener estado del lector NFC
+        
+        Args:
+            max_age: Segundos que se acepta un estado "conectado" ya consultado (0 = consultar siempre)
+        """
+        cached = _status_cache.get(self.http.base_url)
+        if max_age and cached and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+        
         try:
-            response = requests.get(f"{self.nfc_base_url}/status", timeout=5)
+            response = self.http.get("/status")
             if response.status_code == 200:
-                return {
-                    "connected": response.json()["data"]["reader_status"]["connected"],
-                    "reader_info": response.json()["data"]["reader_info"],
+                data = response.json()["data"]
+                status = {
+                    "connected": data["reader_status"]["connected"],
+                    "reader_info": data["reader_info"],
                     "error": None
                 }
+                if status["connected"]:
+                    _status_cache[self.http.base_url] = (status, time.monotonic())
+                else:
+                    _status_cache.pop(self.http.base_url, None)
+                return status
             else:
+                _status_cache.pop(self.http.base_url, None)
                 return {"connected": False, "reader_info": None, "error": "Servicio NFC no disponible"}
         except Exception as e:
+            _status_cache.pop(self.http.base_url, None)
             self.logger.error(f"Error conectando con servicio NFC: {e}")
             return {"connected": False, "reader_info": None, "error": str(e)}
     
     def wait_for_card(self, timeout: int = 10) -> Dict[str, Any]:
         """Esperar tarjeta NFC con timeout"""
         try:
-            response = requests.post(
-                f"{self.nfc_base_url}/wait-for-card", 
-                json={"timeout": timeout}, 
-                timeout=timeout + 5
+            response = self.http.post(
+                "/wait-for-card",
+                json={"timeout": timeout},
+                read_timeout=timeout + 5
             )
             
             if response.status_code == 200:
@@ -55,6 +81,9 @@ class NFCClientService:
                     "logs": []
                 }
         except Exception as e:
+            if isinstance(e, requests.ConnectionError):
+                # El lector dejó de responder: no reutilizar el último estado conectado
+                _status_cache.pop(self.http.base_url, None)
             self.logger.error(f"Error leyendo tarjeta NFC: {e}")
             return {
                 "success": False,
@@ -1,7 +1,7 @@
 # CREAR NUEVO ARCHIVO: app/services/nfc_payment_service.py
 
 from typing import Dict, Any
-from app.services.nfc_client_service import NFCClientService
+from app.services.nfc_client_service import NFCClientService, STATUS_CACHE_SECONDS
 from app.repositories.card_repository import CardRepository
 import logging
 
@@ -28,8 +28,8 @@ class NFCPaymentService:
             Dict: Resultado de la validación
         """
         try:
-            # Verificar estado del lector NFC
-            status = self.nfc_client.get_status()
+            # Verificar estado del lector NFC (se reutiliza un estado conectado reciente)
+            status = self.nfc_client.get_status(max_age=STATUS_CACHE_SECONDS)
             if not status.get('connected', False):
                 return {
                     'success': False,
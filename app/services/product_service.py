@@ -1,11 +1,14 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from app.repositories.product_repository import ProductRepository
 from app.schemas.product_schema import (
     product_schema,
     product_update_schema,
     product_response_schema,
-    products_response_schema
+    products_response_schema,
+    ProductResponseSchema
 )
+from app.utils.pagination_utils import build_pagination
+from app.utils.projection_utils import dump_fields
 from marshmallow import ValidationError
 import logging
 
@@ -109,7 +112,7 @@ class ProductService:
                 'message': 'Error interno del servidor'
             }
     
-    def get_products_list(self, page: int = 1, per_page: int = 10, tipo: Optional[str] = None, search: Optional[str] = None) -> Dict[str, Any]:
+    def get_products_list(self, page: int = 1, per_page: int = 10, tipo: Optional[str] = None, search: Optional[str] = None, after: Optional[str] = None, count: str = 'exact', fields: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Obtener lista de productos con paginación y filtros
         
@@ -118,30 +121,28 @@ class ProductService:
             per_page: Elementos por página
             tipo: Filtrar por tipo de producto
             search: Término de búsqueda
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            fields: Campos a devolver (None = todos)
             
         Returns:
             Dict: Lista de productos
         """
         try:
             if search:
-                result = self.product_repository.search_products(search, page, per_page)
+                result = self.product_repository.search_products(search, page, per_page, after, count, fields, raw=True)
             elif tipo:
-                result = self.product_repository.find_by_tipo(tipo, page, per_page)
+                result = self.product_repository.find_by_tipo(tipo, page, per_page, after, count, fields, raw=True)
             else:
-                result = self.product_repository.find_active_products(page, per_page)
+                result = self.product_repository.find_active_products(page, per_page, after, count, fields, raw=True)
             
-            products_response = products_response_schema.dump(result['documents'])
+            products_response = dump_fields(ProductResponseSchema, result['documents'], fields)
             
             return {
                 'success': True,
                 'message': 'Productos obtenidos exitosamente',
                 'data': products_response,
-                'pagination': {
-                    'page': result['page'],
-                    'per_page': result['per_page'],
-                    'total': result['total'],
-                    'total_pages': result['total_pages']
-                }
+                'pagination': build_pagination(result)
             }
             
         except Exception as e:
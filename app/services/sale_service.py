@@ -1,10 +1,10 @@
 from typing import Dict, Any, Optional, List
 from app.repositories.sale_repository import SaleRepository
+from app.repositories.active_service_repository import ActiveServiceRepository
 from app.repositories.card_repository import CardRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.service_cycle_repository import ServiceCycleRepository
-from app.repositories.washer_repository import WasherRepository
-from app.repositories.dryer_repository import DryerRepository
+from app.repositories.machine_repository import MachineRepository
 from app.services.nfc_payment_service import NFCPaymentService
 from app.schemas.sale_schema import (
     sale_schema,
@@ -15,12 +15,36 @@ from app.schemas.sale_schema import (
 
 # Agregar esta importación al inicio del archivo
 from app.services.esp32_service import ESP32Service
+from app.services.completion_scheduler import completion_scheduler
+from app.services.esp32_dispatcher import esp32_dispatcher
+from app.services.machine_events import machine_events
+from app.utils.pagination_utils import build_pagination
+from app.utils.socket_utils import emit_event
 from marshmallow import ValidationError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import threading
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Activaciones de máquinas (llamadas a ESP32) en paralelo por proceso
+ACTIVATION_MAX_WORKERS = 8
+
+_activation_executor: Optional[ThreadPoolExecutor] = None
+_activation_executor_lock = threading.Lock()
+
+def _get_activation_executor() -> ThreadPoolExecutor:
+    """Pool compartido para activar los servicios de una venta en paralelo (se crea al primer uso)"""
+    global _activation_executor
+    with _activation_executor_lock:
+        if _activation_executor is None:
+            _activation_executor = ThreadPoolExecutor(
+                max_workers=ACTIVATION_MAX_WORKERS, thread_name_prefix='sale-activation'
+            )
+        return _activation_executor
+
 class SaleService:
     """
     Servicio para manejo de ventas con lógica de negocio compleja
@@ -28,14 +52,13 @@ class SaleService:
     
     def __init__(self):
         self.sale_repository = SaleRepository()
+        self.active_service_repository = ActiveServiceRepository()
         self.card_repository = CardRepository()
         self.product_repository = ProductRepository()
         self.service_cycle_repository = ServiceCycleRepository()
-        self.washer_repository = WasherRepository()
-        self.dryer_repository = DryerRepository()
+        self.machine_repository = MachineRepository()
         self.nfc_payment_service = NFCPaymentService()
         self.esp32_service = ESP32Service()  
-        self._esp32_last_error: Optional[str] = None
     
     def create_sale(self, sale_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -91,19 +114,20 @@ class SaleService:
             sale = self.sale_repository.upsert(sale_data_enriched)
             
             if sale:
+                # Reservar stock de productos (todo o nada) antes de cobrar
+                products_data = sale_data_enriched['items'].get('products', [])
+                product_update_result = self._update_product_stock(products_data)
+                if not product_update_result['success']:
+                    self.sale_repository.update_sale_status(sale['_id'], 'cancelled')
+                    return product_update_result
+                
                 # Procesar pagos (descontar saldos de tarjetas)
                 payment_result = self._process_payments(sale['_id'], sale_data_enriched['payment_methods'])
                 if not payment_result['success']:
-                    # Revertir venta si falla el pago
+                    # Revertir venta y devolver el stock reservado si falla el pago
+                    self.product_repository.release_stock(products_data, product_update_result.get('reservation_id'))
                     self.sale_repository.update_sale_status(sale['_id'], 'cancelled')
                     return payment_result
-                
-                # Actualizar stock de productos
-                product_update_result = self._update_product_stock(sale_data_enriched['items'].get('products', []))
-                if not product_update_result['success']:
-                    # Considerar revertir venta si falla el stock (ej: devolver saldo de tarjetas)
-                    self.sale_repository.update_sale_status(sale['_id'], 'cancelled')
-                    return product_update_result
 
                 sale_response = sale_response_schema.dump(sale)
 
@@ -150,22 +174,19 @@ class SaleService:
         cuando se crea una venta.
         """
         try:
-            machine = self._get_machine_by_id(machine_id)
-            if machine:
-                update_data = {
+            update_operators = {
+                '$set': {
                     'estado': 'ocupada',
                     'current_service': {
                         'sale_id': sale_id,
                         'service_index': service_index,
                         'service_cycle_id': service_cycle_id,
-                    }
+                    },
+                    'updated_at': datetime.utcnow()
                 }
-                if machine.get('tipo') == 'lavadora':
-                    self.washer_repository.upsert({'_id': machine_id, **update_data})
-                elif machine.get('tipo') == 'secadora':
-                    self.dryer_repository.upsert({'_id': machine_id, **update_data})
-                else:
-                    logger.warning(f"Tipo de máquina desconocido para {machine_id}. No se pudo actualizar el estado a ocupada.")
+            }
+            if not self.machine_repository.update(machine_id, update_operators):
+                logger.warning(f"Máquina {machine_id} no encontrada. No se pudo actualizar el estado a ocupada.")
         except Exception as e:
             logger.error(f"Error al marcar máquina {machine_id} como ocupada en creación de venta: {e}")
 
@@ -188,9 +209,14 @@ class SaleService:
             
             total_amount = 0
             
+            # Cargar por adelantado los documentos referenciados: una consulta $in por colección
+            products_by_id = self.product_repository.find_by_ids([item['product_id'] for item in products])
+            cycles_by_id = self.service_cycle_repository.find_by_ids([item['service_cycle_id'] for item in services])
+            machines_by_id = self._get_machines_by_ids([item['machine_id'] for item in services])
+            
             # Procesar productos
             for product_item in products:
-                product = self.product_repository.find_by_id(product_item['product_id'])
+                product = products_by_id.get(str(product_item['product_id']))
                 if not product:
                     return {
                         'success': False,
@@ -222,7 +248,7 @@ class SaleService:
             
             # Procesar servicios
             for service_item in services:
-                cycle = self.service_cycle_repository.find_by_id(service_item['service_cycle_id'])
+                cycle = cycles_by_id.get(str(service_item['service_cycle_id']))
                 if not cycle:
                     return {
                         'success': False,
@@ -230,7 +256,7 @@ class SaleService:
                     }
                 
                 # Verificar máquina
-                machine = self._get_machine_by_id(service_item['machine_id'])
+                machine = machines_by_id.get(str(service_item['machine_id']))
                 if not machine:
                     return {
                         'success': False,
@@ -243,10 +269,10 @@ class SaleService:
                         'message': f"Máquina {service_item['machine_id']} no está activa"
                     }
                 
-                # Verificar compatibilidad
-                machine_type = machine.get('tipo', '')
-                validation = self.service_cycle_repository.validate_cycle_for_machine(
-                    service_item['service_cycle_id'], 
+                # Verificar compatibilidad (el tipo sale del directorio de máquinas, sin consultar)
+                machine_type = self.machine_repository.get_machine_type(service_item['machine_id']) or machine.get('tipo', '')
+                validation = self.service_cycle_repository.check_cycle_for_machine(
+                    cycle,
                     service_item['machine_id'],
                     machine_type
                 )
@@ -332,65 +358,65 @@ class SaleService:
                     'message': 'La venta ya fue procesada'
                 }
             
-            # Activar servicios (cambiar estado de pending a active)
+            # Activar servicios (cambiar estado de pending a active) en paralelo:
+            # la latencia total es la de la placa más lenta, no la suma de todas
             services = sale.get('items', {}).get('services', [])
-            for i, service in enumerate(services):
-                if service.get('status') == 'pending':
-                    # Marcar máquina como ocupada y servicio como activo
-                    machine_id = service.get('machine_id')
-                    service_cycle_id = service.get('service_cycle_id')
-                    duration = service.get('duration') # Duración en minutos
-
-                    if machine_id and service_cycle_id and duration is not None:
-                        # Capturar los valores de started_at y estimated_end_at
-                        success, started_at_val, estimated_end_at_val = self._activate_machine_service(
-                            machine_id, sale_id, i, service_cycle_id, duration
+            pending = [
+                (i, service) for i, service in enumerate(services)
+                if service.get('status') == 'pending' and service.get('machine_id')
+                and service.get('service_cycle_id') and service.get('duration') is not None
+            ]
+            activation_report = self._activate_services(sale_id, pending)
+
+            activated = [
+                {
+                    'service_index': entry['service_index'],
+                    'service': services[entry['service_index']],
+                    'started_at': entry['started_at'],
+                    'estimated_end_at': entry['estimated_end_at']
+                }
+                for entry in activation_report
+                if entry['success']
+            ]
+            for entry in activation_report:
+                # Los tiempos quedan en la venta; el reporte solo lleva la latencia y el error
+                entry.pop('started_at')
+                entry.pop('estimated_end_at')
+            if activated:
+                # Una sola escritura para la venta y otra para el índice de servicios activos
+                if not self.sale_repository.activate_services(sale_id, activated):
+                    # Algún servicio ya no estaba pendiente (p. ej. otra petición lo activó):
+                    # solo se indexan los que esta petición pasó a 'active'
+                    activated = [
+                        activation for activation in activated
+                        if self.sale_repository.update_service_status(
+                            sale_id, activation['service_index'], 'active',
+                            started_at=activation['started_at'], estimated_end_at=activation['estimated_end_at'],
+                            expected_status='pending'
                         )
-                        if success:
-                            # Actualizar estado del servicio en la venta, pasando los nuevos tiempos
-                            self.sale_repository.update_service_status(
-                                sale_id, i, 'active', started_at=started_at_val, estimated_end_at=estimated_end_at_val
-                            )
-                        else:
-                            # Falla ESP32: revertir estado de la máquina y no continuar la operación
-                            error_message = getattr(self, '_esp32_last_error', None) or \
-                                f"ESP32: fallo de activación para máquina {machine_id}"
-                            logger.error(error_message)
-
-                            try:
-                                # Revertir máquina a disponible y limpiar current_service
-                                revert_ops = {
-                                    '$set': {'estado': 'disponible'},
-                                    '$unset': {'current_service': ''}
-                                }
-                                updated_machine = None
-                                machine = self._get_machine_by_id(machine_id)
-                                if machine:
-                                    if machine.get('tipo') == 'lavadora':
-                                        self.washer_repository.update_document_by_id(machine_id, revert_ops)
-                                        updated_machine = self.washer_repository.find_by_id(machine_id)
-                                    elif machine.get('tipo') == 'secadora' or 'capacidad' in machine:
-                                        self.dryer_repository.update_document_by_id(machine_id, revert_ops)
-                                        updated_machine = self.dryer_repository.find_by_id(machine_id)
-                                if updated_machine:
-                                    self._emit_machine_update(machine_id, updated_machine, 'available')
-                            except Exception as revert_err:
-                                logger.error(f"Error revirtiendo estado de máquina {machine_id} tras fallo ESP32: {revert_err}")
-
-                            return {
-                                'success': False,
-                                'message': error_message,
-                                'error_type': 'esp32_activation_failed'
-                            }
-                    
-                    # La actualización del estado se mueve dentro del if success
-                    # self.sale_repository.update_service_status(sale_id, i, 'active') 
+                    ]
+                if activated:
+                    self.active_service_repository.add_services(sale, activated)
+
+            failed = [entry for entry in activation_report if not entry['success']]
+            if failed:
+                # Falla ESP32: revertir las máquinas que fallaron y no completar la venta
+                for entry in failed:
+                    self._revert_machine_activation(entry['machine_id'])
+                return {
+                    'success': False,
+                    'message': failed[0]['message'] or f"ESP32: fallo de activación para máquina {failed[0]['machine_id']}",
+                    'error_type': 'esp32_activation_failed',
+                    'activation': activation_report
+                }
             
             # Completar la venta
             updated_sale = self.sale_repository.update_sale_status(sale_id, 'completed')
             
             if updated_sale:
                 sale_response = sale_response_schema.dump(updated_sale)
+                # Latencia de activación por máquina (para ver qué placa responde lento)
+                sale_response['activation'] = activation_report
                 return {
                     'success': True,
                     'message': 'Venta completada y servicios activados',
@@ -442,7 +468,7 @@ class SaleService:
                 'message': 'Error interno del servidor'
             }
     
-    def get_sales_list(self, page: int = 1, per_page: int = 10, exclude_finalized: bool = False, **filters) -> Dict[str, Any]:
+    def get_sales_list(self, page: int = 1, per_page: int = 10, exclude_finalized: bool = False, after: Optional[str] = None, count: str = 'exact', fields: Optional[List[str]] = None, **filters) -> Dict[str, Any]:
         """
         Obtener lista de ventas con filtros, incluyendo la opción de excluir ventas finalizadas.
         
@@ -450,6 +476,9 @@ class SaleService:
             page: Página actual
             per_page: Elementos por página
             exclude_finalized: Si es True, no incluir ventas con estado 'finalized'.
+            after: Cursor de la página anterior (activa la paginación por cursor)
+            count: Modo de conteo del total ('exact', 'estimated' o 'none')
+            fields: Campos a devolver (None = venta completa, incluidos los items)
             **filters: Filtros adicionales (status, employee_id, client_id, date_range)
             
         Returns:
@@ -474,18 +503,13 @@ class SaleService:
                 query_filters['created_at'] = {'$gte': today, '$lte': tomorrow}
             
             # Obtener ventas usando find_many con los filtros combinados
-            result = self.sale_repository.find_many(query_filters, page, per_page, 'created_at', -1)
+            result = self.sale_repository.find_many(query_filters, page, per_page, 'created_at', -1, after=after, count=count, projection=fields, raw=True)
             
             return {
                 'success': True,
                 'message': 'Ventas obtenidas exitosamente',
                 'data': result['documents'],
-                'pagination': {
-                    'page': result['page'],
-                    'per_page': result['per_page'],
-                    'total': result['total'],
-                    'total_pages': result['total_pages']
-                }
+                'pagination': build_pagination(result)
             }
             
         except Exception as e:
@@ -592,40 +616,138 @@ class SaleService:
     
     def _get_machine_by_id(self, machine_id: str) -> Optional[Dict[str, Any]]:
         """Obtener máquina por ID (puede ser lavadora o secadora)"""
-        # Primero intentar encontrar en lavadoras
-        machine = self.washer_repository.find_by_id(machine_id)
-        if machine:
-            return machine
-        
-        # Si no está, buscar en secadoras
-        return self.dryer_repository.find_by_id(machine_id)
+        return self.machine_repository.get(machine_id)
+
+    def _get_machines_by_ids(self, machine_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Obtener varias máquinas por ID (lavadoras y secadoras) con consultas $in"""
+        return self.machine_repository.get_many(machine_ids)
 
     def _update_product_stock(self, products_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Actualizar el stock de productos después de una venta.
+        Descontar el stock de productos de una venta en una sola operación atómica.
         
         Args:
             products_data: Lista de productos vendidos con quantity.
             
         Returns:
-            Dict: Resultado de la operación.
+            Dict: Resultado de la operación con reservation_id para compensación.
         """
         try:
-            for product_item in products_data:
-                product_id = product_item['product_id']
-                quantity = product_item['quantity']
-                
-                # Restar la cantidad del stock
-                result = self.product_repository.update_stock(product_id, quantity, 'reducir')
-                if not result:
-                    return {'success': False, 'message': f'Error al actualizar stock del producto {product_id}'}
+            result = self.product_repository.reserve_stock(products_data)
+            if not result['success']:
+                return {'success': False, 'message': result['message']}
             
-            return {'success': True, 'message': 'Stock de productos actualizado exitosamente'}
+            return {
+                'success': True,
+                'message': 'Stock de productos actualizado exitosamente',
+                'reservation_id': result['reservation_id']
+            }
         except Exception as e:
             logger.error(f"Error al actualizar stock de productos: {e}")
             return {'success': False, 'message': 'Error al actualizar stock de productos'}
 
-    def _activate_machine_service(self, machine_id: str, sale_id: str, service_index: int, service_cycle_id: str, duration_minutes: int) -> tuple[bool, Optional[datetime], Optional[datetime]]:
+    def _activate_services(self, sale_id: str, pending: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Activar los servicios pendientes de una venta en paralelo (una placa ESP32 por servicio)
+        
+        Args:
+            sale_id: ID de la venta
+            pending: Pares (índice, servicio) a activar
+            
+        Returns:
+            List: Resultado por servicio (service_index, machine_id, success, latency_ms, message,
+                  started_at, estimated_end_at), en el orden de la venta
+        """
+        if len(pending) <= 1:
+            return [self._timed_activation(sale_id, i, service) for i, service in pending]
+
+        futures = [
+            _get_activation_executor().submit(self._timed_activation, sale_id, i, service)
+            for i, service in pending
+        ]
+        return [future.result() for future in futures]
+
+    def _timed_activation(self, sale_id: str, service_index: int, service: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Activar un servicio y medir cuánto tardó su máquina
+        
+        Args:
+            sale_id: ID de la venta
+            service_index: Índice del servicio en la venta
+            service: Servicio a activar
+            
+        Returns:
+            Dict: Resultado de la activación con su latencia en milisegundos
+        """
+        machine_id = service.get('machine_id')
+        start = time.perf_counter()
+        success, started_at, estimated_end_at, error = self._activate_machine_service(
+            machine_id, sale_id, service_index, service.get('service_cycle_id'), service.get('duration')
+        )
+        return {
+            'service_index': service_index,
+            'machine_id': machine_id,
+            'success': success,
+            'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+            'message': error,
+            'started_at': started_at,
+            'estimated_end_at': estimated_end_at
+        }
+
+    def handle_start_command_failed(self, sale_id: str, service_index: int, machine_id: str, error: str) -> bool:
+        """
+        Revertir un servicio cuyo comando 'start' agotó sus reintentos en la bandeja ESP32.
+        Con la bandeja la venta se completa al encolar el comando; si la placa nunca
+        arranca, el servicio vuelve a 'pending' (con activation_error), la venta se reabre
+        para reintentar y la máquina queda disponible, igual que un fallo en línea.
+        
+        Args:
+            sale_id: ID de la venta
+            service_index: Índice del servicio en la venta
+            machine_id: ID de la máquina
+            error: Último error del comando
+            
+        Returns:
+            bool: True si se revirtió el servicio (False si ya no estaba activo)
+        """
+        sale = self.sale_repository.fail_service_activation(sale_id, service_index, error)
+        if not sale:
+            return False
+
+        self.active_service_repository.remove_services([{'sale_id': sale_id, 'service_index': service_index}])
+
+        # La máquina solo se libera si sigue ocupada por este servicio
+        current_service = (self._get_machine_by_id(machine_id) or {}).get('current_service') or {}
+        if str(current_service.get('sale_id')) == str(sale_id) and current_service.get('service_index') == service_index:
+            self._revert_machine_activation(machine_id)
+
+        logger.warning(f"Servicio {service_index} de la venta {sale_id} revertido: la máquina {machine_id} no arrancó ({error})")
+        try:
+            emit_event('sale_updated', sale_response_schema.dump(sale), store_id=sale.get('store_id'))
+        except Exception as e:
+            logger.error(f"Error emitiendo venta revertida: {e}")
+        return True
+
+    def _revert_machine_activation(self, machine_id: str) -> None:
+        """
+        Revertir una máquina a disponible tras un fallo de activación
+        
+        Args:
+            machine_id: ID de la máquina
+        """
+        try:
+            # Revertir máquina a disponible y limpiar current_service
+            revert_ops = {
+                '$set': {'estado': 'disponible'},
+                '$unset': {'current_service': ''}
+            }
+            updated_machine = self.machine_repository.update(machine_id, revert_ops)
+            if updated_machine:
+                self._emit_machine_update(machine_id, updated_machine, 'available')
+        except Exception as revert_err:
+            logger.error(f"Error revirtiendo estado de máquina {machine_id} tras fallo ESP32: {revert_err}")
+
+    def _activate_machine_service(self, machine_id: str, sale_id: str, service_index: int, service_cycle_id: str, duration_minutes: int) -> tuple[bool, Optional[datetime], Optional[datetime], Optional[str]]:
         """
         Activar servicio en máquina y calcular tiempo de finalización.
         (El estado 'ocupada' se establece al crear la venta)
@@ -638,42 +760,50 @@ class SaleService:
             duration_minutes: Duración del ciclo en minutos
             
         Returns:
-            tuple[bool, Optional[datetime], Optional[datetime]]: (éxito, started_at, estimated_end_at)
+            tuple[bool, Optional[datetime], Optional[datetime], Optional[str]]: (éxito, started_at, estimated_end_at, error)
         """
         try:
             current_time = datetime.utcnow()
             estimated_end_time = current_time + timedelta(minutes=duration_minutes)
 
-            # Determinar si es lavadora o secadora y actualizar el repositorio correspondiente
             machine = self._get_machine_by_id(machine_id)
             if not machine:
-                logger.error(f"Máquina {machine_id} no encontrada para activación.")
-                return False, None, None # Devuelve False y None para los tiempos
+                error = f"Máquina {machine_id} no encontrada para activación."
+                logger.error(error)
+                return False, None, None, error
 
             # NUEVO: Enviar comando al ESP32 físico. Si falla, cancelar la operación
-            try:
-                esp32_id = machine.get('esp32_id')
-                if not esp32_id:
-                    self._esp32_last_error = f"ESP32: máquina {machine_id} sin esp32_id configurado"
-                    logger.error(self._esp32_last_error)
-                    return False, None, None
-
-                machine_data = {
-                    'machine_id': machine_id,
-                    'start_time': current_time.strftime('%H:%M:%S'),
-                    'end_time': estimated_end_time.strftime('%H:%M:%S'),
-                    'service_cycle_id': service_cycle_id,
-                    'sale_id': sale_id
-                }
-                esp32_result = self.esp32_service.start_machine(esp32_id, machine_data)
-                if not esp32_result.get('success'):
-                    self._esp32_last_error = f"ESP32: fallo al activar máquina {machine_id} - {esp32_result.get('message')}"
-                    logger.error(self._esp32_last_error)
-                    return False, None, None
-            except Exception as e:
-                self._esp32_last_error = f"ESP32: error de comunicación para máquina {machine_id} - {e}"
-                logger.error(self._esp32_last_error)
-                return False, None, None
+            esp32_id = machine.get('esp32_id')
+            if not esp32_id:
+                error = f"ESP32: máquina {machine_id} sin esp32_id configurado"
+                logger.error(error)
+                return False, None, None, error
+
+            machine_data = {
+                'machine_id': machine_id,
+                'start_time': current_time.strftime('%H:%M:%S'),
+                'end_time': estimated_end_time.strftime('%H:%M:%S'),
+                'service_cycle_id': service_cycle_id,
+                'sale_id': sale_id
+            }
+
+            if esp32_dispatcher.enabled:
+                # Con la bandeja de comandos el envío es asíncrono: solo se valida que el ESP32 exista
+                if not self.esp32_service.has_device(esp32_id):
+                    error = f"ESP32: URL no configurada para esp32_id {esp32_id} (máquina {machine_id})"
+                    logger.error(error)
+                    return False, None, None, error
+            else:
+                try:
+                    esp32_result = self.esp32_service.start_machine(esp32_id, machine_data)
+                    if not esp32_result.get('success'):
+                        error = f"ESP32: fallo al activar máquina {machine_id} - {esp32_result.get('message')}"
+                        logger.error(error)
+                        return False, None, None, error
+                except Exception as e:
+                    error = f"ESP32: error de comunicación para máquina {machine_id} - {e}"
+                    logger.error(error)
+                    return False, None, None, error
 
             # Solo actualizar los timestamps dentro de current_service
             update_operators = {
@@ -683,99 +813,173 @@ class SaleService:
                 }
             }
             
-            updated_machine = None
-            if machine.get('tipo') == 'lavadora': # Asumiendo 'tipo' existe para lavadoras
-                self.washer_repository.update_document_by_id(machine_id, update_operators)
-                updated_machine = self.washer_repository.find_by_id(machine_id)
-            elif machine.get('tipo') == 'secadora' or 'capacidad' in machine: # Secadoras no siempre tienen 'tipo', pero tienen 'capacidad'
-                self.dryer_repository.update_document_by_id(machine_id, update_operators)
-                updated_machine = self.dryer_repository.find_by_id(machine_id)
-            else:
-                logger.warning(f"Tipo de máquina desconocido para {machine_id}. No se pudo actualizar el servicio actual de la máquina.")
-                return False, None, None # Devuelve False y None para los tiempos
+            updated_machine = self.machine_repository.update(machine_id, update_operators)
+            if not updated_machine:
+                error = f"Máquina {machine_id} no encontrada. No se pudo actualizar el servicio actual de la máquina."
+                logger.warning(error)
+                return False, None, None, error
             
+            if esp32_dispatcher.enabled:
+                # El despachador entrega el comando en segundo plano (vence al terminar el ciclo)
+                esp32_dispatcher.enqueue(
+                    'start', esp32_id, machine_id, machine_data,
+                    sale_id=sale_id, service_index=service_index, expires_at=estimated_end_time,
+                    store_id=machine.get('store_id')
+                )
+
             if updated_machine:
-                self._emit_machine_update(machine_id, updated_machine, 'activated')
+                # Los clientes la vieron disponible por última vez: la venta la ocupó sin emitir evento
+                self._emit_machine_update(machine_id, updated_machine, 'activated', previous=self._as_available(machine))
+
+            # Programar la finalización exacta del servicio
+            completion_scheduler.schedule(estimated_end_time, f"{sale_id}:{service_index}")
 
             logger.info(f"Servicio activado en máquina {machine_id} para venta {sale_id}, servicio {service_index}. Fin estimado: {estimated_end_time}")
-            return True, current_time, estimated_end_time # Devuelve True y los tiempos
+            return True, current_time, estimated_end_time, None
         except Exception as e:
-            logger.error(f"Error al activar servicio en máquina {machine_id}: {e}")
-            return False, None, None
+            error = f"Error al activar servicio en máquina {machine_id}: {e}"
+            logger.error(error)
+            return False, None, None, error
 
     def check_and_deactivate_machines(self) -> Dict[str, Any]:
         """
         Verifica los servicios activos y desactiva las máquinas si su ciclo ha terminado.
+        Procesa todos los servicios vencidos en lote: una lectura de máquinas, un bulk_write
+        de máquinas y otro de ventas, y un solo evento 'services_completed'.
         
         Returns:
-            Dict: Resultado de la operación.
+            Dict: Resultado de la operación con completed_count, conteos por fase y timings_ms.
         """
+        timings: Dict[str, float] = {}
+        pass_start = time.perf_counter()
+
+        def lap(phase: str, start: float) -> float:
+            now = time.perf_counter()
+            timings[phase] = round((now - start) * 1000, 1)
+            return now
+
         try:
-            active_services = self.sale_repository.get_active_services()
-            deactivated_count = 0
             current_time = datetime.utcnow()
+            # Solo se leen los servicios en curso cuyo fin estimado ya pasó
+            due_services = [
+                service_data for service_data in self.active_service_repository.find_due_services(current_time)
+                if service_data.get('estimated_end_at') and current_time >= service_data['estimated_end_at']
+            ]
+            phase_start = lap('find_due', pass_start)
 
-            for service_data in active_services:
-                service_info = service_data['service']
-                machine_id = service_info['machine_id']
-                sale_id = service_data['sale_id']
-                service_index = service_data['service_index'] # Acceder directamente al service_index
-                estimated_end_at = service_info['estimated_end_at']
+            if not due_services:
+                timings['total'] = timings['find_due']
+                return {
+                    'success': True,
+                    'message': '0 máquinas y servicios actualizados.',
+                    'completed_count': 0,
+                    'due_count': 0,
+                    'machines_released': 0,
+                    'services_completed': 0,
+                    'stop_commands': 0,
+                    'skipped': 0,
+                    'timings_ms': timings
+                }
 
-                if estimated_end_at and current_time >= estimated_end_at:
-                    # Intentar detener la máquina física vía ESP32 (no bloqueante)
-                    try:
-                        machine = self._get_machine_by_id(machine_id)
-                        if machine:
-                            esp32_id = machine.get('esp32_id')
-                            if esp32_id:
-                                stop_payload = {
-                                    'machine_id': machine_id,
-                                    'end_time': current_time.strftime('%H:%M:%S'),
-                                    'sale_id': sale_id,
-                                    'service_index': service_index
-                                }
-                                stop_result = self.esp32_service.stop_machine(esp32_id, stop_payload)
-                                if not stop_result.get('success'):
-                                    logger.error(f"Error al detener ESP32 {esp32_id} para máquina {machine_id}: {stop_result.get('message')}")
-                            else:
-                                logger.warning(f"Máquina {machine_id} no tiene esp32_id configurado para detener")
-                    except Exception as stop_err:
-                        logger.error(f"Error de comunicación al detener ESP32 para máquina {machine_id}: {stop_err}")
-
-                    # Desactivar máquina en BD
-                    machine = self._get_machine_by_id(machine_id)
-                    if machine:
-                        update_operators = {
-                            '$set': {'estado': 'disponible'},
-                            '$unset': {'current_service': ''} # Usar $unset directamente
-                        }
-                        updated_machine = None
-                        if machine.get('tipo') == 'lavadora': # Asumiendo 'tipo' existe para lavadoras
-                            self.washer_repository.update_document_by_id(machine_id, update_operators)
-                            updated_machine = self.washer_repository.find_by_id(machine_id)
-                        elif machine.get('tipo') == 'secadora' or 'capacidad' in machine: # Secadoras no siempre tienen 'tipo', pero tienen 'capacidad'
-                            self.dryer_repository.update_document_by_id(machine_id, update_operators)
-                            updated_machine = self.dryer_repository.find_by_id(machine_id)
-                        else:
-                            logger.warning(f"Tipo de máquina desconocido para {machine_id}. No se pudo actualizar el estado de la máquina.")
-                            continue # Salta a la siguiente iteración si no se puede actualizar la máquina
-                        
-                        if updated_machine:
-                            self._emit_machine_update(machine_id, updated_machine, 'available')
-
-                        logger.info(f"Máquina {machine_id} desactivada. Fin de servicio en venta {sale_id}.")
-                        
-                        # Actualizar estado del servicio en la venta a 'completed'
-                        self.sale_repository.update_service_status(sale_id, service_index, 'completed')
-                        deactivated_count += 1
-
-            return {'success': True, 'message': f'{deactivated_count} máquinas y servicios actualizados.'}
+            machines = self._get_machines_by_ids(list({s['machine_id'] for s in due_services}))
+            phase_start = lap('load_machines', phase_start)
+
+            # Servicios cuya máquina ya no existe: se dejan como estaban (igual que antes)
+            candidates = [s for s in due_services if s['machine_id'] in machines]
+            for service_data in due_services:
+                if service_data['machine_id'] not in machines:
+                    logger.warning(f"Máquina {service_data['machine_id']} no encontrada. No se pudo actualizar el estado de la máquina.")
+
+            # Primero se completan en la venta (solo si siguen en 'active'): si otra verificación
+            # se adelantó, sus servicios no se vuelven a detener ni a notificar
+            completed = self.sale_repository.complete_services(candidates)
+            services_completed = len(completed)
+            phase_start = lap('sales', phase_start)
+
+            # Detener las máquinas físicas vía ESP32 (un fallo no impide liberarlas en BD)
+            stop_commands = 0
+            for service_data in completed:
+                if self._stop_machine_board(machines[service_data['machine_id']], service_data, current_time):
+                    stop_commands += 1
+            phase_start = lap('esp32', phase_start)
+
+            machine_ids = list({s['machine_id'] for s in completed})
+            machines_released = self.machine_repository.release_machines(machine_ids)
+            phase_start = lap('machines', phase_start)
+
+            # Las entradas de los servicios que ya no estaban activos también sobran
+            self.active_service_repository.remove_services(candidates)
+            phase_start = lap('active_services', phase_start)
+
+            self._emit_services_completed(completed, machines)
+            for machine_id in machine_ids:
+                self._emit_machine_update(
+                    machine_id, self._as_available(machines[machine_id]), 'available', previous=machines[machine_id]
+                )
+            lap('emit', phase_start)
+            timings['total'] = round((time.perf_counter() - pass_start) * 1000, 1)
+
+            logger.info(f"{len(completed)} servicios completados y {machines_released} máquinas desactivadas en {timings['total']} ms")
+            return {
+                'success': True,
+                'message': f'{len(completed)} máquinas y servicios actualizados.',
+                'completed_count': len(completed),
+                'due_count': len(due_services),
+                'machines_released': machines_released,
+                'services_completed': services_completed,
+                'stop_commands': stop_commands,
+                'skipped': len(due_services) - len(completed),
+                'timings_ms': timings
+            }
 
         except Exception as e:
             logger.error(f"Error en check_and_deactivate_machines: {e}")
             return {'success': False, 'message': 'Error interno al desactivar máquinas.'} 
 
+    def _stop_machine_board(self, machine: Dict[str, Any], service_data: Dict[str, Any], current_time: datetime) -> bool:
+        """
+        Enviar (o encolar) el comando de parada al ESP32 de una máquina
+        
+        Args:
+            machine: Máquina cuyo servicio terminó
+            service_data: Servicio vencido (machine_id, sale_id, service_index)
+            current_time: Hora de la verificación
+            
+        Returns:
+            bool: True si el comando se envió o quedó en la bandeja
+        """
+        machine_id = service_data['machine_id']
+        sale_id = service_data['sale_id']
+        service_index = service_data['service_index']
+        esp32_id = machine.get('esp32_id')
+        if not esp32_id:
+            logger.warning(f"Máquina {machine_id} no tiene esp32_id configurado para detener")
+            return False
+
+        stop_payload = {
+            'machine_id': machine_id,
+            'end_time': current_time.strftime('%H:%M:%S'),
+            'sale_id': sale_id,
+            'service_index': service_index
+        }
+        try:
+            if esp32_dispatcher.enabled:
+                # Una placa lenta no detiene el monitor: el despachador lo entrega
+                esp32_dispatcher.enqueue(
+                    'stop', esp32_id, machine_id, stop_payload,
+                    sale_id=sale_id, service_index=service_index, store_id=machine.get('store_id')
+                )
+                return True
+
+            stop_result = self.esp32_service.stop_machine(esp32_id, stop_payload)
+            if not stop_result.get('success'):
+                logger.error(f"Error al detener ESP32 {esp32_id} para máquina {machine_id}: {stop_result.get('message')}")
+                return False
+            return True
+        except Exception as stop_err:
+            logger.error(f"Error de comunicación al detener ESP32 para máquina {machine_id}: {stop_err}")
+            return False
+
 # Modificaciones para el servicio de ventas para soportar el estado 'finalized'
 
     def finalize_sale(self, sale_id: str) -> Dict[str, Any]:
@@ -819,20 +1023,48 @@ class SaleService:
             logger.error(f"Error al finalizar venta {sale_id}: {e}")
             return {'success': False, 'message': 'Error interno del servidor al finalizar la venta'} 
 
-    def _emit_machine_update(self, machine_id, machine_data, operation):
-        """Emitir evento WebSocket cuando cambia estado de máquina"""
+    def _emit_machine_update(self, machine_id, machine_data, operation, previous=None):
+        """Publicar el cambio de estado de una máquina (se emite agrupado en 'machines_changed')"""
         try:
-            from app import socketio
-            socketio.emit('machine_updated', {
-                'machine_id': machine_id,
-                'machine_data': machine_data,
-                'operation': operation,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-            logger.info(f"Evento emitido: máquina {machine_id} - {operation}")
+            machine_events.publish(machine_id, machine_data, operation, previous=previous)
+            logger.info(f"Evento publicado: máquina {machine_id} - {operation}")
         except Exception as e:
             logger.error(f"Error emitiendo evento de máquina: {e}")
 
+    @staticmethod
+    def _as_available(machine: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia de la máquina en estado 'disponible' y sin current_service"""
+        available = {key: value for key, value in machine.items() if key != 'current_service'}
+        available['estado'] = 'disponible'
+        return available
+
+    def _emit_services_completed(self, services: List[Dict[str, Any]], machines: Dict[str, Dict[str, Any]]) -> None:
+        """Emitir un evento WebSocket por tienda con sus servicios completados y máquinas liberadas"""
+        try:
+            by_store: Dict[Optional[str], List[Dict[str, Any]]] = {}
+            for service in services:
+                by_store.setdefault(service.get('store_id'), []).append(service)
+
+            for store_id, store_services in by_store.items():
+                emit_event('services_completed', {
+                    'count': len(store_services),
+                    'services': [
+                        {
+                            'sale_id': service['sale_id'],
+                            'service_index': service['service_index'],
+                            'machine_id': service['machine_id'],
+                            'machine_numero': machines.get(service['machine_id'], {}).get('numero'),
+                            'store_id': store_id
+                        }
+                        for service in store_services
+                    ],
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'message': f'{len(store_services)} servicios han sido completados'
+                }, store_id=store_id)
+            logger.info(f"Evento emitido: {len(services)} servicios completados")
+        except Exception as e:
+            logger.error(f"Error emitiendo servicios completados: {e}")
+
     def create_sale_with_nfc_payment(self, sale_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Crear venta con validación y procesamiento NFC automático
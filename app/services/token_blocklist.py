@@ -0,0 +1,206 @@
+"""
+Lista de tokens revocados en memoria
+
+La verificación por request (check_if_token_revoked) se resuelve contra un
+conjunto en memoria de jti. La fuente de verdad es la colección
+'revoked_tokens'; cada proceso trae solo las revocaciones nuevas (deltas)
+como mucho cada sync_seconds, de modo que un logout en otro worker se aplica
+en segundos sin una consulta por request.
+
+Además de tokens individuales se pueden revocar todos los tokens de un
+usuario emitidos antes de un momento (cambio de rol o desactivación): los
+claims de rol y tienda del token dejan de valer en todos los workers tras la
+siguiente sincronización.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Margen al pedir deltas, para tolerar diferencias de reloj entre workers
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Tolerancia entre el reloj del worker que revoca y el que emite un token nuevo:
+# solo se rechazan los tokens emitidos claramente antes de la revocación por usuario
+USER_REVOCATION_SKEW_SECONDS = 2
+
+class TokenBlocklist:
+    """
+    Conjunto en memoria de jti revocados, sincronizado con la colección 'revoked_tokens'
+    """
+
+    def __init__(self, sync_seconds: float = 5):
+        self.sync_seconds = sync_seconds
+        self._entries: Dict[str, datetime] = {}
+        # user_id -> (revocado en, vencimiento de la revocación)
+        self._users: Dict[str, Tuple[datetime, datetime]] = {}
+        self._last_revoked_at: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._syncs = 0
+
+    def configure(self, sync_seconds: float) -> None:
+        """
+        Ajustar el intervalo de sincronización
+
+        Args:
+            sync_seconds: Segundos máximos entre sincronizaciones con MongoDB
+        """
+        self.sync_seconds = sync_seconds
+
+    def is_revoked(self, jti: Optional[str], user_id: Optional[str] = None, issued_at: Optional[float] = None) -> bool:
+        """
+        Verificar si un token está revocado (en memoria)
+
+        Args:
+            jti: Identificador único del token
+            user_id: Dueño del token (claim sub)
+            issued_at: Emisión del token (claim iat, segundos epoch)
+
+        Returns:
+            bool: True si se revocó el token o todos los tokens de su usuario
+        """
+        if not jti:
+            return False
+
+        self._maybe_sync()
+        if jti in self._entries:
+            return True
+
+        user_revocation = self._users.get(str(user_id)) if user_id is not None else None
+        if user_revocation is None:
+            return False
+        # Sin iat no se puede saber si el token es posterior a la revocación. iat va en
+        # segundos enteros: un token emitido en el mismo segundo de la revocación es válido
+        revoked_before = int(_epoch_seconds(user_revocation[0])) - USER_REVOCATION_SKEW_SECONDS
+        return issued_at is None or issued_at < revoked_before
+
+    def revoke(self, jti: str, user_id: Optional[str], expires_at: datetime) -> None:
+        """
+        Revocar un token: se persiste y se aplica de inmediato en este proceso
+
+        Args:
+            jti: Identificador único del token
+            user_id: ID del usuario dueño del token
+            expires_at: Vencimiento del token (UTC)
+        """
+        from app.repositories.revoked_token_repository import RevokedTokenRepository
+
+        RevokedTokenRepository().revoke(jti, user_id, expires_at)
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def revoke_user(self, user_id: str, token_lifetime: timedelta) -> None:
+        """
+        Revocar todos los tokens emitidos hasta ahora para un usuario
+
+        Args:
+            user_id: ID del usuario
+            token_lifetime: Vigencia de los tokens (JWT_ACCESS_TOKEN_EXPIRES); pasado ese
+                            tiempo ya no queda ningún token anterior a la revocación
+        """
+        from app.repositories.revoked_token_repository import RevokedTokenRepository
+
+        expires_at = datetime.utcnow() + token_lifetime
+        revoked_at = RevokedTokenRepository().revoke_user(user_id, expires_at)
+        with self._lock:
+            self._users[str(user_id)] = (revoked_at, expires_at)
+        logger.info(f"Tokens del usuario {user_id} revocados")
+
+    def sync(self) -> int:
+        """
+        Traer las revocaciones registradas desde la última sincronización
+        (todas las vigentes en la primera) y descartar las vencidas
+
+        Returns:
+            int: Número de revocaciones nuevas
+        """
+        from app.repositories.revoked_token_repository import RevokedTokenRepository
+
+        since = self._last_revoked_at - SYNC_OVERLAP if self._last_revoked_at else None
+        rows = RevokedTokenRepository().find_revoked_since(since)
+        now = datetime.utcnow()
+
+        with self._lock:
+            added = 0
+            for row in rows:
+                if row.get('scope') == 'user':
+                    current = self._users.get(row['user_id'])
+                    if current is None or row['revoked_at'] > current[0]:
+                        added += 1
+                        self._users[row['user_id']] = (row['revoked_at'], row['expires_at'])
+                else:
+                    if row['jti'] not in self._entries:
+                        added += 1
+                    self._entries[row['jti']] = row['expires_at']
+                if self._last_revoked_at is None or row['revoked_at'] > self._last_revoked_at:
+                    self._last_revoked_at = row['revoked_at']
+
+            # Los tokens vencidos ya no pasan la validación de JWT
+            self._entries = {jti: expires_at for jti, expires_at in self._entries.items() if expires_at > now}
+            self._users = {user_id: revocation for user_id, revocation in self._users.items() if revocation[1] > now}
+            self._loaded = True
+            self._syncs += 1
+
+        if added:
+            logger.info(f"Lista de tokens revocados sincronizada: {added} nuevos, {len(self._entries)} vigentes")
+        return added
+
+    def _maybe_sync(self) -> None:
+        """
+        Sincronizar si pasó el intervalo. Solo un hilo consulta MongoDB;
+        los demás siguen con el conjunto actual (salvo en la carga inicial)
+        """
+        if time.monotonic() < self._next_sync:
+            return
+
+        if not self._sync_lock.acquire(blocking=not self._loaded):
+            return
+
+        try:
+            if time.monotonic() < self._next_sync:
+                return
+            self.sync()
+        except Exception as e:
+            # Se conserva el conjunto actual; se reintenta en el siguiente intervalo
+            logger.error(f"Error al sincronizar tokens revocados: {e}")
+        finally:
+            self._next_sync = time.monotonic() + self.sync_seconds
+            self._sync_lock.release()
+
+    def clear(self) -> None:
+        """Vaciar el conjunto (se recargará completo en la siguiente verificación)"""
+        with self._lock:
+            self._entries = {}
+            self._users = {}
+            self._last_revoked_at = None
+            self._next_sync = 0.0
+            self._loaded = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener estadísticas de la lista
+
+        Returns:
+            Dict: Revocaciones vigentes, sincronizaciones y último delta
+        """
+        return {
+            'entries': len(self._entries),
+            'users': len(self._users),
+            'sync_seconds': self.sync_seconds,
+            'syncs': self._syncs,
+            'last_revoked_at': self._last_revoked_at.isoformat() if self._last_revoked_at else None
+        }
+
+def _epoch_seconds(moment: datetime) -> float:
+    """Segundos epoch de un datetime UTC sin zona (como el claim iat)"""
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+# Instancia global de la lista de tokens revocados
+token_blocklist = TokenBlocklist()
@@ -1,29 +1,44 @@
-import bcrypt
 from functools import wraps
 from flask import current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, create_access_token
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List
 from app.utils.response_utils import error_response
+from app.utils.password_hasher import password_hasher
 import logging
 
 logger = logging.getLogger(__name__)
 
 def hash_password(password: str) -> str:
     """
-    Generar hash de contraseña usando bcrypt
+    Generar hash de contraseña usando bcrypt (en el pool de contraseñas)
     
     Args:
         password: Contraseña en texto plano
         
     Returns:
         str: Hash de la contraseña
+        
+    Raises:
+        PasswordHasherBusyError: Si el pool está saturado
+    """
+    return password_hasher.hash(password)
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Generar varios hashes en paralelo, esperando turno en lugar de rechazar
+    
+    Args:
+        passwords: Contraseñas en texto plano
+        
+    Returns:
+        List: Hashes en el mismo orden
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash_many(passwords)
 
 def verify_password(password: str, password_hash: str) -> bool:
     """
-    Verificar contraseña contra su hash
+    Verificar contraseña contra su hash (en el pool de contraseñas)
     
     Args:
         password: Contraseña en texto plano
@@ -31,8 +46,23 @@ def verify_password(password: str, password_hash: str) -> bool:
         
     Returns:
         bool: True si la contraseña es correcta
+        
+    Raises:
+        PasswordHasherBusyError: Si el pool está saturado
+    """
+    return password_hasher.verify(password, password_hash)
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """
+    Verificar si el hash usa un costo distinto al configurado (BCRYPT_ROUNDS)
+    
+    Args:
+        password_hash: Hash de la contraseña almacenado
+        
+    Returns:
+        bool: True si el hash debe regenerarse
     """
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    return password_hasher.needs_rehash(password_hash)
 
 def generate_token(user_id: str, additional_claims: Optional[Dict[str, Any]] = None) -> str:
     """
@@ -50,9 +80,46 @@ def generate_token(user_id: str, additional_claims: Optional[Dict[str, Any]] = N
         additional_claims=additional_claims or {}
     )
 
+def build_user_claims(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construir los claims de identidad que viajan firmados en el token
+    
+    Args:
+        user: Documento del empleado
+        
+    Returns:
+        Dict: Claims de rol, tienda y nombre de usuario
+    """
+    return {
+        'role': user.get('role'),
+        'store_id': user.get('store_id'),
+        'username': user.get('username')
+    }
+
+def user_from_claims(user_id: str, claims: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construir el usuario actual a partir de los claims del token (sin consultar la base de datos)
+    
+    Args:
+        user_id: Identidad del token
+        claims: Claims del token
+        
+    Returns:
+        Dict: _id, role, store_id y username del usuario
+    """
+    return {
+        '_id': user_id,
+        'role': claims.get('role'),
+        'store_id': claims.get('store_id'),
+        'username': claims.get('username')
+    }
+
 def role_required(required_roles: list) -> Callable:
     """
-    Decorador para requerir roles específicos
+    Decorador para requerir roles específicos.
+    El rol se toma de los claims firmados del token, sin consultar la base de datos;
+    el handler recibe como current_user los datos de identidad del token. Para el
+    perfil completo usar get_current_user().
     
     Args:
         required_roles: Lista de roles requeridos
@@ -64,27 +131,29 @@ def role_required(required_roles: list) -> Callable:
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            from app.services.auth_service import AuthService
-            
             # Obtener información del usuario actual
             current_user_id = get_jwt_identity()
-            auth_service = AuthService()
             
             try:
-                user_info = auth_service.get_user_info(current_user_id)
+                claims = get_jwt()
                 
-                if not user_info:
-                    return error_response("Usuario no encontrado", 404)
+                if claims.get('role'):
+                    current_user = user_from_claims(current_user_id, claims)
+                else:
+                    # Tokens emitidos sin claims de rol: usar el perfil (en caché)
+                    current_user = get_current_user()
+                    if not current_user:
+                        return error_response("Usuario no encontrado", 404)
                 
-                user_role = user_info.get('role')
+                user_role = current_user.get('role')
                 
-                current_app.logger.info(f"Verificando rol para usuario {current_user_id}. Info: {user_info}. Rol de usuario: {user_role}. Roles requeridos: {required_roles}")
+                logger.debug(f"Verificando rol para usuario {current_user_id}. Rol de usuario: {user_role}. Roles requeridos: {required_roles}")
                 
                 if user_role not in required_roles:
                     return error_response("Acceso denegado: permisos insuficientes", 403)
                 
                 # Pasar información del usuario a la función decorada
-                return f(current_user=user_info, *args, **kwargs)
+                return f(current_user=current_user, *args, **kwargs)
                 
             except Exception as e:
                 current_app.logger.error(f"Error en verificación de rol: {e}")
@@ -122,7 +191,8 @@ def employee_required(f):
 
 def get_current_user() -> Optional[Dict[str, Any]]:
     """
-    Obtener información del usuario actual desde el token
+    Obtener el perfil completo del usuario actual (caché de usuarios; consulta
+    la base de datos solo si no está en caché)
     
     Returns:
         Dict con información del usuario o None si no está autenticado
@@ -154,8 +224,6 @@ def validate_token_claims(required_claims: Dict[str, Any]) -> Callable:
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            from flask_jwt_extended import get_jwt
-            
             claims = get_jwt()
             
             for claim_key, claim_value in required_claims.items():
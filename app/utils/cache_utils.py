@@ -0,0 +1,108 @@
+"""
+Caché en memoria con expiración (TTL) y desalojo LRU
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import threading
+import time
+
+class TTLCache:
+    """
+    Caché acotada: cada entrada vence a los ttl_seconds y, al superar
+    max_entries, se descarta la usada hace más tiempo.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def configure(self, max_entries: int, ttl_seconds: float) -> None:
+        """
+        Ajustar tamaño y vigencia (se vacía la caché)
+
+        Args:
+            max_entries: Número máximo de entradas
+            ttl_seconds: Vigencia de cada entrada en segundos
+        """
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtener un valor vigente
+
+        Args:
+            key: Clave
+
+        Returns:
+            Valor almacenado o None si no existe o venció
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Guardar un valor
+
+        Args:
+            key: Clave
+            value: Valor a almacenar
+        """
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Eliminar una entrada
+
+        Args:
+            key: Clave
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Vaciar la caché"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener estadísticas de uso
+
+        Returns:
+            Dict: Entradas, aciertos y fallos
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+# Perfiles de empleados autenticados (sin password_hash), por ID de usuario
+user_info_cache = TTLCache()
@@ -0,0 +1,238 @@
+"""
+Cliente HTTP compartido para los microservicios auxiliares (ESP32, NFC)
+
+Cada servicio remoto (upstream) tiene una requests.Session con un pool de
+conexiones keep-alive, timeouts de conexión y lectura propios y un histograma
+de latencias, en lugar de abrir una conexión TCP nueva por cada comando.
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los buckets del histograma de latencias
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class LatencyHistogram:
+    """
+    Histograma de latencias por buckets fijos (acumulativo desde el inicio del proceso)
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_ms: float) -> None:
+        """Registrar una latencia en milisegundos"""
+        with self._lock:
+            self._counts[bisect_left(self.buckets, elapsed_ms)] += 1
+            self._sum_ms += elapsed_ms
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Estimar un percentil (límite superior del bucket que lo contiene)
+
+        Args:
+            fraction: Percentil entre 0 y 1 (p. ej. 0.99)
+
+        Returns:
+            float: Latencia en ms, o None si no hay observaciones
+        """
+        with self._lock:
+            counts = list(self._counts)
+        total = sum(counts)
+        if not total:
+            return None
+
+        target = fraction * total
+        accumulated = 0
+        for index, count in enumerate(counts):
+            accumulated += count
+            if accumulated >= target:
+                return float(self.buckets[index]) if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Obtener el estado del histograma
+
+        Returns:
+            Dict: Conteo, promedio, p50/p99 y conteo por bucket ('le' en ms)
+        """
+        with self._lock:
+            counts = list(self._counts)
+            sum_ms = self._sum_ms
+        total = sum(counts)
+        labels = [str(bucket) for bucket in self.buckets] + ['+Inf']
+        return {
+            'count': total,
+            'avg_ms': round(sum_ms / total, 2) if total else None,
+            'p50_ms': self.percentile(0.5),
+            'p99_ms': self.percentile(0.99),
+            'buckets': dict(zip(labels, counts))
+        }
+
+class HttpClient:
+    """
+    Cliente de un upstream: sesión keep-alive con pool acotado y métricas
+    """
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 10,
+                 connect_timeout: float = 3, read_timeout: float = 10):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self._errors = 0
+        self._status_counts: Dict[int, int] = {}
+        self.configure(base_url, pool_size, connect_timeout, read_timeout)
+
+    def configure(self, base_url: str, pool_size: int, connect_timeout: float, read_timeout: float) -> None:
+        """
+        Ajustar URL base, tamaño del pool y timeouts (se crea una sesión nueva)
+
+        Args:
+            base_url: URL base del upstream
+            pool_size: Conexiones keep-alive que se conservan abiertas
+            connect_timeout: Timeout de conexión en segundos
+            read_timeout: Timeout de lectura por defecto en segundos
+        """
+        session = requests.Session()
+        # Sin reintentos automáticos: los comandos a máquinas no son idempotentes
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        previous = getattr(self, 'session', None)
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = session
+        if previous is not None:
+            previous.close()
+
+    def get(self, path: str, read_timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        """Enviar GET al upstream"""
+        return self.request('GET', path, read_timeout=read_timeout, **kwargs)
+
+    def post(self, path: str, read_timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        """Enviar POST al upstream"""
+        return self.request('POST', path, read_timeout=read_timeout, **kwargs)
+
+    def request(self, method: str, path: str, read_timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        """
+        Enviar una petición por la sesión del upstream registrando su latencia
+
+        Args:
+            method: Método HTTP
+            path: Ruta relativa a la URL base
+            read_timeout: Timeout de lectura para esta llamada (None = el configurado)
+            **kwargs: Argumentos adicionales para requests (json, params, ...)
+
+        Returns:
+            Response: Respuesta del upstream
+
+        Raises:
+            requests.RequestException: Si la petición falla (conexión, timeout)
+        """
+        timeout = (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+        except requests.RequestException:
+            self._errors += 1
+            raise
+        finally:
+            self.latency.observe((time.perf_counter() - start) * 1000)
+
+        self._status_counts[response.status_code] = self._status_counts.get(response.status_code, 0) + 1
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener métricas del upstream
+
+        Returns:
+            Dict: Configuración, errores, respuestas por código y latencias
+        """
+        return {
+            'base_url': self.base_url,
+            'pool_size': self.pool_size,
+            'timeouts': {'connect': self.connect_timeout, 'read': self.read_timeout},
+            'errors': self._errors,
+            'status_codes': dict(self._status_counts),
+            'latency': self.latency.snapshot()
+        }
+
+class HttpClientRegistry:
+    """
+    Clientes HTTP por nombre de upstream ('esp32', 'nfc'), compartidos por todo el proceso
+    """
+
+    # Valores por defecto si la aplicación no configuró el upstream
+    DEFAULTS = {
+        'esp32': {'base_url': 'http://localhost:5002', 'connect_timeout': 3, 'read_timeout': 10},
+        'nfc': {'base_url': 'http://localhost:5001', 'connect_timeout': 2, 'read_timeout': 5}
+    }
+
+    def __init__(self):
+        self._clients: Dict[str, HttpClient] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, base_url: str, pool_size: int = 10,
+                  connect_timeout: float = 3, read_timeout: float = 10) -> HttpClient:
+        """
+        Registrar (o reconfigurar) un upstream
+
+        Args:
+            name: Nombre del upstream
+            base_url: URL base
+            pool_size: Conexiones keep-alive del pool
+            connect_timeout: Timeout de conexión en segundos
+            read_timeout: Timeout de lectura por defecto en segundos
+
+        Returns:
+            HttpClient: Cliente del upstream
+        """
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                client = HttpClient(name, base_url, pool_size, connect_timeout, read_timeout)
+                self._clients[name] = client
+            else:
+                client.configure(base_url, pool_size, connect_timeout, read_timeout)
+            return client
+
+    def get(self, name: str) -> HttpClient:
+        """
+        Obtener el cliente de un upstream (se crea con los valores por defecto si no existe)
+
+        Args:
+            name: Nombre del upstream
+
+        Returns:
+            HttpClient: Cliente del upstream
+        """
+        client = self._clients.get(name)
+        if client is None:
+            client = self.configure(name, **self.DEFAULTS[name])
+        return client
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtener métricas de todos los upstreams
+
+        Returns:
+            Dict: Métricas por nombre de upstream
+        """
+        return {name: client.get_stats() for name, client in self._clients.items()}
+
+# Instancia global de los clientes HTTP
+http_clients = HttpClientRegistry()
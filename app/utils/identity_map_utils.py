@@ -0,0 +1,86 @@
+"""
+Mapa de identidad por request para las lecturas de los repositorios.
+
+Es opcional: solo se activa en los endpoints decorados con @with_identity_map.
+Mientras está activo, BaseRepository.find_by_id devuelve el documento ya
+cargado en el mismo request en lugar de volver a consultar MongoDB, y las
+escrituras del repositorio mantienen el mapa actualizado.
+"""
+
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+from flask import g, has_app_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+def enable_identity_map() -> None:
+    """
+    Activar el mapa de identidad para el request actual
+    """
+    g.identity_map = {}
+    g.identity_map_stats = {'hits': 0, 'misses': 0}
+
+def get_identity_map(collection_name: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Obtener el mapa de identidad de una colección
+
+    Args:
+        collection_name: Nombre de la colección
+
+    Returns:
+        Dict: Documentos cargados en el request por ID, o None si el mapa no está activo
+    """
+    if not has_app_context():
+        return None
+
+    identity_map = g.get('identity_map')
+    if identity_map is None:
+        return None
+
+    return identity_map.setdefault(collection_name, {})
+
+def record_identity_map_lookup(hit: bool) -> None:
+    """
+    Registrar una búsqueda en el mapa de identidad (acierto = lectura evitada)
+    """
+    stats = g.get('identity_map_stats')
+    if stats is not None:
+        stats['hits' if hit else 'misses'] += 1
+
+def get_identity_map_stats() -> Dict[str, int]:
+    """
+    Obtener estadísticas del mapa de identidad del request actual
+
+    Returns:
+        Dict: Lecturas evitadas (hits) y lecturas a la base de datos (misses)
+    """
+    if not has_app_context():
+        return {'hits': 0, 'misses': 0}
+    return dict(g.get('identity_map_stats') or {'hits': 0, 'misses': 0})
+
+def with_identity_map(f: Callable) -> Callable:
+    """
+    Decorador que activa el mapa de identidad durante el endpoint y
+    registra cuántas lecturas a la base de datos se evitaron
+
+    Args:
+        f: Función a decorar
+
+    Returns:
+        Función decorada
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        enable_identity_map()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            stats = get_identity_map_stats()
+            logger.info(
+                f"Mapa de identidad en {f.__name__}: {stats['hits']} lecturas evitadas, "
+                f"{stats['misses']} lecturas a la base de datos"
+            )
+            g.identity_map = None
+
+    return decorated_function
@@ -0,0 +1,101 @@
+"""
+Proveedor JSON de Flask basado en orjson
+
+Serializa en una sola pasada los tipos que devuelve pymongo (ObjectId,
+Decimal128, datetime), de modo que los documentos pueden ir del cursor a los
+bytes de la respuesta sin formatearlos antes en Python. Mantiene el formato de
+salida del proveedor por defecto de Flask (fechas HTTP, Decimal como texto).
+Si orjson no está instalado se usa el proveedor de Flask con los mismos conversores.
+"""
+
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from typing import Any, Union
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError: # pragma: no cover - dependencia opcional
+    orjson = None
+
+def _default(o: Any) -> Any:
+    """
+    Convertir los tipos que orjson no serializa de forma nativa
+    """
+    if isinstance(o, ObjectId):
+        return str(o)
+
+    if isinstance(o, Decimal128):
+        return float(o.to_decimal())
+
+    if isinstance(o, date):
+        return http_date(o)
+
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class BsonJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON por defecto de Flask que además serializa ObjectId y Decimal128
+    """
+
+    default = staticmethod(_default)
+
+class OrjsonProvider(BsonJSONProvider):
+    """
+    Proveedor JSON de Flask que usa orjson para serializar y deserializar
+    """
+
+    # Las fechas pasan por _default para conservar el formato HTTP de Flask
+    OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps_bytes(obj, kwargs).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """
+        Crear la respuesta JSON escribiendo directamente los bytes de orjson
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._dumps_bytes(obj, {'indent': 2} if indent else {})
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj: Any, kwargs: dict) -> bytes:
+        option = self.OPTIONS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys'):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+def configure_json(app) -> None:
+    """
+    Registrar el proveedor JSON de la aplicación (orjson si está disponible)
+
+    Args:
+        app: Instancia de Flask
+    """
+    if orjson is None:
+        app.logger.warning("orjson no está instalado; se usa el serializador JSON por defecto de Flask")
+        app.json = BsonJSONProvider(app)
+        return
+
+    app.json = OrjsonProvider(app)
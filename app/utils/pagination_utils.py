@@ -0,0 +1,103 @@
+"""
+Utilidades para paginación por cursor (keyset)
+
+El cursor es un token opaco que codifica (valor del campo de orden, _id) del
+último documento entregado; la página siguiente continúa a partir de ese par
+en lugar de usar skip, por lo que su costo no crece con la profundidad.
+"""
+
+import base64
+from typing import Any, Dict, Mapping, Optional, Tuple
+from bson import ObjectId, json_util
+
+# Modos de conteo del total: exacto, estimado (metadatos o conteo en caché) o sin total
+COUNT_MODES = ('exact', 'estimated', 'none')
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginación mal formado"""
+
+def encode_cursor(sort_value: Any, document_id: Any) -> str:
+    """
+    Codificar el cursor de un documento
+
+    Args:
+        sort_value: Valor del campo de ordenamiento
+        document_id: _id del documento (desempate)
+
+    Returns:
+        str: Token opaco seguro para URL
+    """
+    payload = json_util.dumps({'v': sort_value, 'id': document_id})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str) -> Tuple[Any, Any]:
+    """
+    Decodificar un cursor
+
+    Args:
+        token: Token generado por encode_cursor
+
+    Returns:
+        Tuple: (valor del campo de ordenamiento, _id)
+
+    Raises:
+        InvalidCursorError: Si el token no es válido
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        document_id = payload['id']
+        if isinstance(document_id, str) and ObjectId.is_valid(document_id):
+            document_id = ObjectId(document_id)
+        return payload['v'], document_id
+    except Exception:
+        raise InvalidCursorError('Cursor de paginación inválido')
+
+def get_cursor_params(args: Mapping[str, str]) -> Tuple[Optional[str], str]:
+    """
+    Leer los parámetros de paginación por cursor de la query string.
+    El modo cursor se activa con el parámetro 'after' (vacío = primera página).
+
+    Args:
+        args: Parámetros de la query (request.args)
+
+    Returns:
+        Tuple: (after o None si se usa paginación por página, modo de conteo)
+
+    Raises:
+        InvalidCursorError: Si el cursor o el modo de conteo no son válidos
+    """
+    after = args.get('after') if 'after' in args else None
+    count = args.get('count') or ('exact' if after is None else 'none')
+
+    if count not in COUNT_MODES:
+        raise InvalidCursorError(f"count debe ser uno de: {', '.join(COUNT_MODES)}")
+    if after:
+        decode_cursor(after)
+
+    return after, count
+
+def build_pagination(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construir el bloque 'pagination' de la respuesta a partir de find_many
+
+    Args:
+        result: Resultado de BaseRepository.find_many
+
+    Returns:
+        Dict: Información de paginación por página o por cursor
+    """
+    if 'next_cursor' in result:
+        return {
+            'per_page': result['per_page'],
+            'next_cursor': result['next_cursor'],
+            'has_more': result['has_more'],
+            'total': result['total']
+        }
+
+    return {
+        'page': result['page'],
+        'per_page': result['per_page'],
+        'total': result['total'],
+        'total_pages': result['total_pages']
+    }
@@ -0,0 +1,169 @@
+"""
+Hash y verificación de contraseñas (bcrypt) en un pool de hilos acotado
+
+bcrypt es costoso a propósito. Ejecutarlo en el hilo del request hace que una
+ráfaga de logins (cambio de turno, fuerza bruta) ocupe todos los workers; aquí
+el trabajo va a un pool con un número fijo de hilos y una cola limitada, y
+cuando ambos están llenos la operación se rechaza de inmediato.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+import os
+import threading
+import bcrypt
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusyError(RuntimeError):
+    """El pool de contraseñas está saturado o no respondió a tiempo"""
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool acotado (max_workers hilos + queue_limit en espera)
+    con el costo (rounds) configurado
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: Optional[int] = None, queue_limit: int = 32, wait_seconds: float = 10):
+        self.rounds = rounds
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.queue_limit = queue_limit
+        self.wait_seconds = wait_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_limit)
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._rejected = 0
+
+    def configure(self, rounds: int, max_workers: int, queue_limit: int, wait_seconds: float) -> None:
+        """
+        Ajustar costo y tamaño del pool (el pool se recrea en el siguiente uso)
+
+        Args:
+            rounds: Costo de bcrypt (log2 de iteraciones) para hashes nuevos
+            max_workers: Hilos que ejecutan bcrypt en paralelo
+            queue_limit: Operaciones que pueden esperar turno antes de rechazar
+            wait_seconds: Tiempo máximo de espera de una operación
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self.rounds = rounds
+            self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+            self.queue_limit = queue_limit
+            self.wait_seconds = wait_seconds
+            self._executor = None
+            self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_limit)
+
+    def hash(self, password: str, block: bool = False) -> str:
+        """
+        Generar hash de contraseña con el costo configurado
+
+        Args:
+            password: Contraseña en texto plano
+            block: Esperar un lugar en la cola en vez de rechazar si está llena
+
+        Returns:
+            str: Hash de la contraseña
+        """
+        return self._run(self._hash, password, self.rounds, block=block)
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Generar varios hashes en paralelo (p. ej. al cargar datos de prueba)
+
+        Args:
+            passwords: Contraseñas en texto plano
+
+        Returns:
+            List: Hashes en el mismo orden
+        """
+        executor = self._get_executor()
+        return list(executor.map(lambda password: self._hash(password, self.rounds), passwords))
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """
+        Verificar contraseña contra su hash
+
+        Args:
+            password: Contraseña en texto plano
+            password_hash: Hash de la contraseña almacenado
+
+        Returns:
+            bool: True si la contraseña es correcta
+        """
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Verificar si un hash se generó con un costo distinto al configurado
+
+        Args:
+            password_hash: Hash almacenado ($2b$<costo>$...)
+
+        Returns:
+            bool: True si conviene regenerar el hash
+        """
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener estadísticas del pool
+
+        Returns:
+            Dict: Configuración, operaciones completadas y rechazadas
+        """
+        return {
+            'rounds': self.rounds,
+            'max_workers': self.max_workers,
+            'queue_limit': self.queue_limit,
+            'completed': self._completed,
+            'rejected': self._rejected
+        }
+
+    def _run(self, func: Callable, *args: Any, block: bool = False) -> Any:
+        """
+        Ejecutar una operación en el pool respetando el límite de la cola
+        """
+        slots = self._slots
+        if not slots.acquire(blocking=block, timeout=self.wait_seconds if block else None):
+            self._rejected += 1
+            raise PasswordHasherBusyError('Pool de contraseñas saturado')
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            result = future.result(timeout=self.wait_seconds)
+        except FutureTimeoutError:
+            self._rejected += 1
+            raise PasswordHasherBusyError('Tiempo de espera agotado en el pool de contraseñas')
+
+        self._completed += 1
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Obtener (o crear) el pool de hilos"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='password-hasher'
+                    )
+        return self._executor
+
+    @staticmethod
+    def _hash(password: str, rounds: int) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+# Instancia global del pool de contraseñas
+password_hasher = PasswordHasher()
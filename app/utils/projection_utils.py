@@ -0,0 +1,103 @@
+"""
+Utilidades para proyección de campos (parámetro fields= de los listados)
+
+Los campos solicitados se validan contra el schema de respuesta del recurso,
+se envían a MongoDB como proyección y se usan para serializar solo esos campos.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+from marshmallow import Schema
+
+class InvalidFieldsError(ValueError):
+    """Campos solicitados que no existen en el recurso"""
+
+def parse_fields(args: Mapping[str, str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Leer el parámetro fields= (lista separada por comas) de la query string
+
+    Args:
+        args: Parámetros de la query (request.args)
+        allowed: Campos de primer nivel permitidos (se aceptan rutas como items.services)
+
+    Returns:
+        List: Campos solicitados, o None si no se indicó fields
+
+    Raises:
+        InvalidFieldsError: Si algún campo no está permitido
+    """
+    raw = args.get('fields')
+    if not raw:
+        return None
+
+    allowed = set(allowed)
+    requested = []
+    for field in raw.split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field.split('.')[0] not in allowed:
+            raise InvalidFieldsError(f"Campo no válido en fields: {field}")
+        if field not in requested:
+            requested.append(field)
+
+    return requested or None
+
+def build_projection(fields: Optional[List[str]], required: Iterable[str] = ()) -> Optional[Dict[str, int]]:
+    """
+    Construir la proyección de MongoDB para los campos solicitados
+
+    Args:
+        fields: Campos solicitados (None = documento completo)
+        required: Campos que siempre deben leerse (p. ej. el campo de orden del cursor)
+
+    Returns:
+        Dict: Proyección de inclusión, o None para leer el documento completo
+    """
+    if not fields:
+        return None
+
+    projection = {field: 1 for field in fields}
+    for field in required:
+        # Evitar colisiones de ruta (p. ej. 'items' e 'items.services')
+        if not any(field == f or field.startswith(f + '.') for f in projection):
+            projection[field] = 1
+    return projection
+
+def strip_fields(documents: List[Dict[str, Any]], fields: Iterable[str]) -> None:
+    """
+    Quitar de los documentos los campos leídos solo para uso interno (p. ej. el campo de orden del cursor)
+
+    Args:
+        documents: Documentos leídos de MongoDB (se modifican en el sitio)
+        fields: Campos de primer nivel a quitar
+    """
+    fields = list(fields)
+    if not fields:
+        return
+    for document in documents:
+        for field in fields:
+            document.pop(field, None)
+
+def dump_fields(schema_class: Type[Schema], documents: Any, fields: Optional[List[str]], many: bool = True) -> Any:
+    """
+    Serializar documentos limitando el schema a los campos solicitados
+
+    Args:
+        schema_class: Clase del schema de respuesta
+        documents: Documento(s) a serializar
+        fields: Campos solicitados (None = schema completo)
+        many: Si se serializa una lista
+
+    Returns:
+        Datos serializados
+    """
+    top_level = tuple(sorted({field.split('.')[0] for field in fields} | {'_id'})) if fields else None
+    return _get_schema(schema_class, top_level, many).dump(documents)
+
+@lru_cache(maxsize=128)
+def _get_schema(schema_class: Type[Schema], only: Optional[Tuple[str, ...]], many: bool) -> Schema:
+    """
+    Obtener (y reutilizar) una instancia del schema limitada a 'only'
+    """
+    return schema_class(many=many, only=only)
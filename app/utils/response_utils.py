@@ -70,6 +70,26 @@ def paginated_response(data: List[Any], page: int, per_page: int, total: int, me
     }
     return jsonify(response), 200
 
+def cursor_paginated_response(data: List[Any], pagination: Dict[str, Any], message: str = "Datos obtenidos exitosamente") -> tuple:
+    """
+    Crear respuesta paginada por cursor
+    
+    Args:
+        data: Lista de datos
+        pagination: Información de paginación (per_page, next_cursor, has_more, total)
+        message: Mensaje de éxito
+        
+    Returns:
+        tuple: (response_json, status_code)
+    """
+    response = {
+        "success": True,
+        "message": message,
+        "data": data,
+        "pagination": pagination
+    }
+    return jsonify(response), 200
+
 def validation_error_response(errors: Dict[str, List[str]]) -> tuple:
     """
     Crear respuesta de error de validación
@@ -85,3 +105,17 @@ def validation_error_response(errors: Dict[str, List[str]]) -> tuple:
         status_code=422,
         errors=errors
     )
+
+def busy_response(message: str = "Servidor ocupado, intente nuevamente", retry_after: int = 1) -> tuple:
+    """
+    Crear respuesta de servicio saturado (503) con Retry-After
+    
+    Args:
+        message: Mensaje de error
+        retry_after: Segundos sugeridos antes de reintentar
+        
+    Returns:
+        tuple: (response_json, status_code, headers)
+    """
+    response, status_code = error_response(message=message, status_code=503)
+    return response, status_code, {'Retry-After': str(retry_after)}
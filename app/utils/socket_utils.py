@@ -0,0 +1,85 @@
+"""
+Salas de Socket.IO por tienda y por tema
+
+Cada evento pertenece a un tema ('sales', 'machines', 'esp32'). Una conexión
+de una tienda entra en la sala '<tema>:<store_id>' de cada tema al que está
+suscrita, y los administradores en '<tema>:*' (todas las tiendas). Además,
+toda conexión suscrita a un tema entra en la sala '<tema>', usada para los
+eventos que no pertenecen a una tienda concreta. Así una emisión solo llega
+a las pestañas de la tienda afectada.
+"""
+
+from typing import Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tema de cada evento emitido por la API
+EVENT_TOPICS = {
+    'new_sale': 'sales',
+    'sale_updated': 'sales',
+    'sale_finalized': 'sales',
+    'machine_updated': 'machines',
+    'machines_changed': 'machines',
+    'services_completed': 'machines',
+    'esp32_command_result': 'esp32'
+}
+
+TOPICS = ('sales', 'machines', 'esp32')
+
+# Sufijo de las salas que reciben los eventos de todas las tiendas
+ALL_STORES = '*'
+
+def store_room(topic: str, store_id: Optional[str]) -> str:
+    """
+    Nombre de la sala de un tema para una tienda
+
+    Args:
+        topic: Tema del evento
+        store_id: ID de la tienda (None = todas las tiendas)
+
+    Returns:
+        str: Nombre de la sala
+    """
+    return f"{topic}:{store_id if store_id else ALL_STORES}"
+
+def rooms_for_connection(topics: List[str], store_id: Optional[str]) -> List[str]:
+    """
+    Salas a las que entra una conexión
+
+    Args:
+        topics: Temas suscritos
+        store_id: Tienda de la conexión (None = todas, administradores)
+
+    Returns:
+        List: Salas de la conexión
+    """
+    rooms = []
+    for topic in topics:
+        rooms.append(topic)
+        rooms.append(store_room(topic, store_id))
+    return rooms
+
+def emit_event(event: str, data: Any = None, store_id: Optional[str] = None) -> None:
+    """
+    Emitir un evento solo a las conexiones suscritas a su tema y a la tienda afectada
+
+    Args:
+        event: Nombre del evento
+        data: Datos del evento
+        store_id: Tienda a la que pertenece el evento (None = todas las conexiones del tema)
+    """
+    from app import socketio
+    if socketio is None:
+        return
+
+    topic = EVENT_TOPICS.get(event)
+    if topic is None:
+        socketio.emit(event, data)
+        return
+
+    if store_id:
+        rooms: Any = [store_room(topic, store_id), store_room(topic, None)]
+    else:
+        rooms = topic
+    socketio.emit(event, data, to=rooms)
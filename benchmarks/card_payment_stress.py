@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Prueba de estrés: cobros NFC concurrentes sobre la misma tarjeta.
+Verifica que no se pierdan actualizaciones ni se sobregire el saldo, y
+reporta los viajes a MongoDB por pago.
+Ejecutar: python benchmarks/card_payment_stress.py [--threads 16] [--payments 400]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+
+from common import CommandCounter, connect_database, format_counts, timed
+
+def run(threads: int, payments: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+
+    from app.repositories.card_repository import CardRepository
+    card_repository = CardRepository()
+
+    initial_balance = 100.0
+    amount = 1.0
+    db.cards.insert_one({
+        'card_number': '000000000001',
+        'nfc_uid': 'STRESS01',
+        'client_id': str(ObjectId()),
+        'balance': initial_balance,
+        'is_active': True
+    })
+
+    # Viajes por pago exitoso
+    counter.reset()
+    result = card_repository.process_nfc_payment('STRESS01', amount)
+    print(f"process_nfc_payment exitoso:       {format_counts(counter)}")
+    if not result['success']:
+        raise RuntimeError(result['message'])
+
+    # Pagos concurrentes: más intentos que saldo disponible
+    remaining = initial_balance - amount
+    counter.reset()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results, elapsed = timed(
+            lambda: list(executor.map(lambda _: card_repository.process_nfc_payment('STRESS01', amount), range(payments)))
+        )
+
+    succeeded = sum(1 for r in results if r['success'])
+    final_balance = float(db.cards.find_one({'nfc_uid': 'STRESS01'})['balance'])
+    expected_balance = remaining - succeeded * amount
+
+    print(f"Pagos concurrentes:                {payments} intentos en {threads} hilos - {elapsed:.1f} ms")
+    print(f"Pagos aceptados:                   {succeeded} (saldo disponible para {int(remaining / amount)})")
+    print(f"Saldo final:                       {final_balance:.2f} (esperado {expected_balance:.2f})")
+    print(f"Viajes por intento (promedio):     {counter.total / payments:.2f}")
+
+    lost_updates = abs(final_balance - expected_balance) > 0.001
+    overdraft = final_balance < 0 or succeeded > int(remaining / amount)
+    if lost_updates or overdraft:
+        raise SystemExit("❌ Inconsistencia detectada: actualizaciones perdidas o sobregiro")
+    print("✅ Sin actualizaciones perdidas ni sobregiros")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--payments', type=int, default=400)
+    args = parser.parse_args()
+    run(args.threads, args.payments)
@@ -0,0 +1,137 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Los benchmarks se ejecutan contra un MongoDB real (por defecto
+mongodb://localhost:27017/lavanderia_bench_db, configurable con
+MONGODB_URI_BENCH). La base de datos indicada se BORRA al iniciar.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from pymongo import MongoClient, monitoring
+
+# Agregar el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Cuenta los comandos enviados al servidor (un comando = un viaje de ida y vuelta)
+    """
+
+    # Comandos de infraestructura que no forman parte de la operación medida
+    IGNORED_COMMANDS = {'createIndexes', 'ping', 'hello', 'isMaster', 'ismaster', 'endSessions', 'dropDatabase'}
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        self.counts = Counter()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def started(self, event):
+        if event.command_name not in self.IGNORED_COMMANDS:
+            with self._lock:
+                self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def connect_database(counter: CommandCounter):
+    """
+    Conectar a la base de datos de benchmark y registrarla como la base de la app
+
+    Args:
+        counter: Listener que contará los comandos
+
+    Returns:
+        Database: Base de datos limpia
+    """
+    import app as app_module
+
+    uri = os.environ.get('MONGODB_URI_BENCH') or 'mongodb://localhost:27017/lavanderia_bench_db'
+    client = MongoClient(uri, event_listeners=[counter])
+    client.admin.command('ping')
+
+    db_name = uri.split('/')[-1].split('?')[0]
+    client.drop_database(db_name)
+    app_module.db = client[db_name]
+    return app_module.db
+
+class FakeESP32Service:
+    """
+    Sustituto del ESP32Service que responde de inmediato (el benchmark mide la base de datos)
+    """
+
+    def has_device(self, esp32_id: str) -> bool:
+        return True
+
+    def start_machine(self, esp32_id: str, machine_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {'success': True, 'message': f'Máquina {esp32_id} iniciada correctamente'}
+
+    def stop_machine(self, esp32_id: str, machine_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {'success': True, 'message': f'Máquina {esp32_id} detenida correctamente'}
+
+def seed_catalog(db, products: int = 5, washers: int = 5, dryers: int = 5, store_id: str = 'store_001') -> Dict[str, List[str]]:
+    """
+    Insertar productos, máquinas y un ciclo de servicio compatible con todas
+
+    Returns:
+        Dict: IDs insertados por colección
+    """
+    product_ids = db.products.insert_many([
+        {'nombre': f'Producto {i}', 'tipo': 'detergente', 'precio': 5.0, 'stock': 1000, 'is_active': True}
+        for i in range(products)
+    ]).inserted_ids
+    washer_ids = db.washers.insert_many([
+        {'numero': i + 1, 'store_id': store_id, 'tipo': 'lavadora', 'estado': 'disponible',
+         'capacidad': 10, 'esp32_id': '100', 'is_active': True}
+        for i in range(washers)
+    ]).inserted_ids
+    dryer_ids = db.dryers.insert_many([
+        {'numero': i + 1, 'store_id': store_id, 'tipo': 'secadora', 'estado': 'disponible',
+         'capacidad': 10, 'esp32_id': '101', 'is_active': True}
+        for i in range(dryers)
+    ]).inserted_ids
+    cycle_id = db.service_cycles.insert_one({
+        'name': 'Lavado normal',
+        'service_type': 'lavado',
+        'price': 30.0,
+        'duration_minutes': 30,
+        'machine_types_allowed': ['lavadora', 'secadora'],
+        'allowed_machines': [{'_id': str(m)} for m in list(washer_ids) + list(dryer_ids)],
+        'is_active': True
+    }).inserted_id
+
+    # Las máquinas se insertan sin pasar por los repositorios: recargar el directorio en el siguiente uso
+    from app.repositories.machine_directory import machine_directory
+    machine_directory.clear()
+
+    return {
+        'products': [str(i) for i in product_ids],
+        'washers': [str(i) for i in washer_ids],
+        'dryers': [str(i) for i in dryer_ids],
+        'service_cycles': [str(cycle_id)]
+    }
+
+def format_counts(counter: CommandCounter) -> str:
+    """Formatear conteo de comandos como 'total (find=2, update=1)'"""
+    detail = ', '.join(f'{name}={count}' for name, count in sorted(counter.counts.items()))
+    return f'{counter.total} ({detail})'
+
+def timed(func, *args, **kwargs):
+    """Ejecutar función y devolver (resultado, milisegundos)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
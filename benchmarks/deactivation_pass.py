@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark: viajes de ida y vuelta a MongoDB y tiempos por fase de
+check_and_deactivate_machines con muchos servicios vencidos a la vez.
+Ejecutar: python benchmarks/deactivation_pass.py [--services N]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from common import CommandCounter, FakeESP32Service, connect_database, seed_catalog, format_counts, timed
+
+def run(services: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    machines = (services + 1) // 2
+    catalog = seed_catalog(db, washers=machines, dryers=machines)
+
+    from app.services.esp32_dispatcher import esp32_dispatcher
+    from app.services.sale_service import SaleService
+    esp32_dispatcher.configure(False, 4, 5, 2, 60, 2)
+    sale_service = SaleService()
+    sale_service.esp32_service = FakeESP32Service()
+
+    machine_ids = (catalog['washers'] + catalog['dryers'])[:services]
+    for i in range(0, len(machine_ids), 2):
+        result = sale_service.create_sale({
+            'client_id': 'client_001',
+            'employee_id': 'employee_001',
+            'store_id': 'store_001',
+            'items': [
+                {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': machine_id}
+                for machine_id in machine_ids[i:i + 2]
+            ],
+            'payment_methods': [{'payment_type': 'efectivo', 'amount': 60.0}]
+        })
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        result = sale_service.complete_sale(result['data']['_id'])
+        if not result['success']:
+            raise RuntimeError(result['message'])
+
+    # Todos los servicios vencen a la vez
+    db.active_services.update_many({}, {'$set': {'estimated_end_at': datetime.utcnow() - timedelta(minutes=1)}})
+
+    counter.reset()
+    result, elapsed = timed(sale_service.check_and_deactivate_machines)
+    if not result['success'] or result['completed_count'] != len(machine_ids):
+        raise RuntimeError(result['message'])
+    print(f"{result['completed_count']} servicios vencidos: {format_counts(counter)} - {elapsed:.1f} ms")
+    print('  fases (ms): ' + ', '.join(f'{phase}={ms}' for phase, ms in result['timings_ms'].items()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--services', type=int, default=100)
+    args = parser.parse_args()
+    run(args.services)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark: consultas a MongoDB por carrito en SaleService._enrich_sale_data.
+Ejecutar: python benchmarks/enrich_queries.py
+"""
+
+from common import CommandCounter, connect_database, seed_catalog, format_counts, timed
+
+CART_SIZES = [1, 5, 10, 20]
+
+def build_cart(catalog, size: int):
+    """Carrito con la mitad de líneas de productos y la otra mitad de servicios"""
+    machines = catalog['washers'] + catalog['dryers']
+    items = []
+    for i in range(size):
+        if i % 2 == 0:
+            items.append({'product_id': catalog['products'][i % len(catalog['products'])], 'quantity': 1})
+        else:
+            items.append({'service_cycle_id': catalog['service_cycles'][0], 'machine_id': machines[i % len(machines)]})
+    return items
+
+def run():
+    counter = CommandCounter()
+    db = connect_database(counter)
+    catalog = seed_catalog(db, products=10, washers=10, dryers=10)
+
+    from app.services.sale_service import SaleService
+    from app.schemas.sale_schema import sale_schema
+    sale_service = SaleService()
+
+    for size in CART_SIZES:
+        sale_data = sale_schema.load({
+            'client_id': 'client_001',
+            'employee_id': 'employee_001',
+            'store_id': 'store_001',
+            'items': build_cart(catalog, size),
+            'payment_methods': [{'payment_type': 'efectivo', 'amount': 1.0}]
+        })
+
+        counter.reset()
+        result, elapsed = timed(sale_service._enrich_sale_data, sale_data)
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        print(f"Carrito de {size:>2} líneas: {format_counts(counter)} - {elapsed:.1f} ms")
+
+if __name__ == '__main__':
+    run()
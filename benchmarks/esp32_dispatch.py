@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark: consultas a MongoDB por comando enviado a un ESP32
+(start_machine / stop_machine) contra un microservicio ESP32 simulado.
+Ejecutar: python benchmarks/esp32_dispatch.py [--commands N] [--devices N]
+"""
+
+import argparse
+import threading
+
+from common import CommandCounter, connect_database, format_counts, timed
+from upstream_http import CountingServer, FakeUpstreamHandler
+
+def seed_devices(db, devices: int):
+    """Insertar la configuración de los ESP32 (uno inactivo duplicado por id, como en producción)"""
+    db.esp32_config.insert_many(
+        [{'esp32_id': str(100 + i), 'esp32_url': f'http://192.168.1.{100 + i}/laundry-update', 'is_active': True}
+         for i in range(devices)]
+        + [{'esp32_id': str(100 + i), 'esp32_url': 'http://0.0.0.0/old', 'is_active': False}
+           for i in range(devices)]
+    )
+
+def run(commands: int, devices: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    seed_devices(db, devices)
+
+    server = CountingServer(('127.0.0.1', 0), FakeUpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from app.utils.http_client import http_clients
+    from app.services.esp32_service import ESP32Service
+    http_clients.configure('esp32', f"http://127.0.0.1:{server.server_address[1]}")
+    esp32_service = ESP32Service()
+
+    def dispatch():
+        for i in range(commands):
+            esp32_id = str(100 + i % devices)
+            result = esp32_service.start_machine(esp32_id, {'machine_id': f'machine_{i}'})
+            if not result['success']:
+                raise RuntimeError(result['message'])
+
+    # El primer comando puede cargar el directorio; se mide después
+    esp32_service.start_machine('100', {'machine_id': 'warmup'})
+
+    counter.reset()
+    _, elapsed = timed(dispatch)
+    print(f"{commands} comandos a {devices} ESP32: {format_counts(counter)} - {elapsed:.1f} ms")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commands', type=int, default=500)
+    parser.add_argument('--devices', type=int, default=4)
+    args = parser.parse_args()
+    run(args.commands, args.devices)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia de complete_sale con placas ESP32 lentas.
+Compara el envío en línea (el request espera cada start_machine) con la
+bandeja de comandos (el request solo registra el comando y el despachador
+lo entrega en segundo plano).
+Ejecutar: python benchmarks/esp32_outbox.py [--sales N] [--board-delay-ms N]
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from common import CommandCounter, connect_database, seed_catalog
+from upstream_http import CountingServer, FakeUpstreamHandler
+
+def create_pending_sales(sale_service, catalog, sales: int):
+    """Crear ventas pendientes con una lavadora y una secadora cada una"""
+    sale_ids = []
+    for i in range(sales):
+        result = sale_service.create_sale({
+            'client_id': 'client_001',
+            'employee_id': 'employee_001',
+            'store_id': 'store_001',
+            'items': [
+                {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': catalog['washers'][i]},
+                {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': catalog['dryers'][i]}
+            ],
+            'payment_methods': [{'payment_type': 'efectivo', 'amount': 60.0}]
+        })
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        sale_ids.append(result['data']['_id'])
+    return sale_ids
+
+def measure(sale_service, sale_ids):
+    """Latencias (ms) de complete_sale"""
+    latencies = []
+    for sale_id in sale_ids:
+        start = time.perf_counter()
+        result = sale_service.complete_sale(sale_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not result['success']:
+            raise RuntimeError(result['message'])
+    return latencies
+
+def reset_machines(db):
+    db.washers.update_many({}, {'$set': {'estado': 'disponible'}, '$unset': {'current_service': ''}})
+    db.dryers.update_many({}, {'$set': {'estado': 'disponible'}, '$unset': {'current_service': ''}})
+
+def run(sales: int, board_delay_ms: float):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    catalog = seed_catalog(db, washers=sales, dryers=sales)
+    db.esp32_config.insert_many([
+        {'esp32_id': '100', 'esp32_url': 'http://192.168.1.100/laundry-update', 'is_active': True},
+        {'esp32_id': '101', 'esp32_url': 'http://192.168.1.101/laundry-update', 'is_active': True}
+    ])
+
+    FakeUpstreamHandler.delay_seconds = board_delay_ms / 1000
+    server = CountingServer(('127.0.0.1', 0), FakeUpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from app.utils.http_client import http_clients
+    from app.repositories.index_registry import index_registry
+    from app.repositories.esp32_command_repository import ESP32CommandRepository
+    from app.services.esp32_dispatcher import esp32_dispatcher
+    from app.services.sale_service import SaleService
+    http_clients.configure('esp32', f"http://127.0.0.1:{server.server_address[1]}")
+    index_registry.ensure_indexes()
+    sale_service = SaleService()
+
+    print(f"{sales} ventas (2 servicios cada una), placa con {board_delay_ms} ms de respuesta")
+
+    esp32_dispatcher.configure(False, 4, 5, 2, 60, 2)
+    latencies = measure(sale_service, create_pending_sales(sale_service, catalog, sales))
+    print(f"  en línea:           p50 {statistics.median(latencies):7.1f} ms  máx {max(latencies):7.1f} ms")
+
+    reset_machines(db)
+    esp32_dispatcher.configure(True, 4, 5, 2, 60, 0.5)
+    esp32_dispatcher.start()
+    sale_ids = create_pending_sales(sale_service, catalog, sales)
+    latencies = measure(sale_service, sale_ids)
+    print(f"  bandeja de comandos: p50 {statistics.median(latencies):7.1f} ms  máx {max(latencies):7.1f} ms")
+
+    start = time.perf_counter()
+    repository = ESP32CommandRepository()
+    while repository.count_by_status().get('delivered', 0) < sales * 2 and time.perf_counter() - start < 60:
+        time.sleep(0.05)
+    print(f"  entrega en segundo plano: {repository.count_by_status()} en {time.perf_counter() - start:.2f} s")
+
+    esp32_dispatcher.stop()
+    server.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sales', type=int, default=20)
+    parser.add_argument('--board-delay-ms', type=float, default=300)
+    args = parser.parse_args()
+    run(args.sales, args.board_delay_ms)
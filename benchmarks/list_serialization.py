@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serialización de listados de 100 elementos por página.
+Compara la ruta anterior (_format_document + proveedor JSON por defecto de Flask)
+con la lectura cruda + proveedor orjson (del cursor a los bytes en una pasada).
+Ejecutar: python benchmarks/list_serialization.py [--per-page N] [--repeat N]
+"""
+
+import argparse
+import statistics
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from common import CommandCounter, connect_database, seed_catalog, timed
+from sales_list_payload import seed_sales
+
+def build_cases(per_page: int):
+    """Listados a medir: (nombre, consulta(raw), schema de respuesta o None)"""
+    from app.repositories.sale_repository import SaleRepository
+    from app.repositories.product_repository import ProductRepository
+    from app.repositories.washer_repository import WasherRepository
+    from app.schemas.product_schema import products_response_schema
+    from app.schemas.washer_schema import washers_response_schema
+
+    sales = SaleRepository()
+    products = ProductRepository()
+    washers = WasherRepository()
+    return [
+        ('/api/sales', lambda raw: sales.find_many({}, 1, per_page, raw=raw), None),
+        ('/products', lambda raw: products.find_active_products(1, per_page, raw=raw), products_response_schema),
+        ('/washers', lambda raw: washers.find_by_store('store_001', 1, per_page, raw=raw), washers_response_schema),
+    ]
+
+def measure(app, query, schema, raw: bool, repeat: int):
+    """Mediana de consulta + schema + respuesta JSON, y bytes de la respuesta"""
+    timings = []
+    body = b''
+    with app.app_context():
+        for _ in range(repeat):
+            def render():
+                documents = query(raw)['documents']
+                data = schema.dump(documents) if schema else documents
+                return app.json.response({'success': True, 'data': data}).get_data()
+            body, elapsed = timed(render)
+            timings.append(elapsed)
+    return statistics.median(timings), len(body)
+
+def run(per_page: int, repeat: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    seed_catalog(db, products=per_page, washers=per_page, dryers=1)
+    seed_sales(db, per_page)
+
+    from app.utils.json_provider import OrjsonProvider
+
+    default_app = Flask('default')
+    default_app.json = DefaultJSONProvider(default_app)
+    orjson_app = Flask('orjson')
+    orjson_app.json = OrjsonProvider(orjson_app)
+
+    print(f"Listados de {per_page} elementos (mediana de {repeat})")
+    for name, query, schema in build_cases(per_page):
+        before_ms, before_bytes = measure(default_app, query, schema, False, repeat)
+        after_ms, after_bytes = measure(orjson_app, query, schema, True, repeat)
+        print(f"  {name:<12} antes {before_ms:6.1f} ms ({before_bytes} bytes) -> "
+              f"después {after_ms:6.1f} ms ({after_bytes} bytes)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    run(args.per_page, args.repeat)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput y latencia (p50/p99) de login bajo concurrencia.
+Compara bcrypt sin límite (equivalente a ejecutarlo en el hilo de cada request)
+con el pool acotado, que rechaza (503) cuando hilos y cola están llenos.
+Ejecutar: python benchmarks/login_throughput.py [--clients N] [--logins N] [--rounds N]
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from flask import Flask
+from flask_jwt_extended import JWTManager
+
+from common import CommandCounter, connect_database
+
+PASSWORD = 'Empleado123!'
+
+def seed_employees(db, clients: int, rounds: int):
+    """Insertar un empleado por cliente concurrente"""
+    import bcrypt
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    db.user_employees.insert_many([
+        {'username': f'empleado_{i}', 'email': f'empleado_{i}@bench.com', 'password_hash': password_hash,
+         'role': 'empleado', 'store_id': 'store_001', 'is_active': True}
+        for i in range(clients)
+    ])
+
+def run_case(app, clients: int, logins: int):
+    """Cada cliente hace 'logins' logins seguidos; devuelve latencias (ms), rechazos y duración"""
+    from app.services.auth_service import AuthService
+
+    auth_service = AuthService()
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients)
+
+    def client(index: int):
+        start_barrier.wait()
+        with app.app_context():
+            for _ in range(logins):
+                start = time.perf_counter()
+                result = auth_service.login({'username': f'empleado_{index}', 'password': PASSWORD})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    if result['success']:
+                        latencies.append(elapsed)
+                    elif result.get('busy'):
+                        rejected[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejected[0], time.perf_counter() - start
+
+def report(name: str, latencies, rejected: int, duration: float):
+    if not latencies:
+        print(f"  {name:<28} sin logins exitosos, {rejected} rechazados")
+        return
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"  {name:<28} {len(latencies) / duration:6.1f} logins/s  "
+          f"p50 {statistics.median(latencies):7.1f} ms  p99 {p99:7.1f} ms  rechazados {rejected}")
+
+def run(clients: int, logins: int, rounds: int, workers: int, queue_limit: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    seed_employees(db, clients, rounds)
+
+    from app.utils.password_hasher import password_hasher
+
+    app = Flask('bench')
+    app.config['JWT_SECRET_KEY'] = 'bench-jwt-secret-key-for-login-throughput'
+    JWTManager(app)
+
+    print(f"{clients} clientes x {logins} logins, bcrypt costo {rounds}")
+
+    # Sin límite: tantos hilos de bcrypt como requests simultáneos
+    password_hasher.configure(rounds, clients, clients * logins, 60)
+    report('sin límite', *run_case(app, clients, logins))
+
+    # Pool acotado: los excedentes se rechazan de inmediato
+    password_hasher.configure(rounds, workers, queue_limit, 10)
+    report(f'pool {workers} hilos + cola {queue_limit}', *run_case(app, clients, logins))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--logins', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue-limit', type=int, default=16)
+    args = parser.parse_args()
+    run(args.clients, args.logins, args.rounds, args.workers, args.queue_limit)
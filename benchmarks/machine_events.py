@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: eventos y bytes por minuto de Socket.IO para las máquinas de una
+tienda con mucho movimiento (ventas de lavadora + secadora y una verificación
+del monitor cada 10 segundos).
+
+Antes: un 'machine_updated' con el documento completo por cada cambio de
+máquina, más un 'machine_status_updated' por venta completada y por
+verificación. Después: un 'machines_changed' por ventana con solo los
+campos cambiados. 'services_completed' se emite igual en ambos casos.
+Ejecutar: python benchmarks/machine_events.py [--sales-per-minute N]
+"""
+
+import argparse
+import json
+from collections import Counter
+from datetime import datetime, timedelta
+
+from common import CommandCounter, FakeESP32Service, connect_database, seed_catalog
+
+MONITOR_INTERVAL_SECONDS = 10
+
+class CapturingSocketIO:
+    """Sustituto de Flask-SocketIO que cuenta los eventos y el tamaño de su JSON"""
+
+    def __init__(self):
+        self.events: Counter = Counter()
+        self.bytes: Counter = Counter()
+
+    def emit(self, event, data=None, to=None, **kwargs):
+        self.events[event] += 1
+        self.bytes[event] += len(json.dumps(data, default=str))
+
+def simulate(sales_per_minute: int, coalesce: bool) -> CapturingSocketIO:
+    """Un minuto simulado de la tienda; devuelve los eventos emitidos"""
+    import app as app_module
+    from app.services.esp32_dispatcher import esp32_dispatcher
+    from app.services.machine_events import machine_events
+    from app.services.sale_service import SaleService
+
+    db = connect_database(CommandCounter())
+    catalog = seed_catalog(db, washers=sales_per_minute, dryers=sales_per_minute)
+    esp32_dispatcher.configure(False, 4, 5, 2, 60, 2)
+    machine_events.configure(coalesce, 0.1, False)
+    sale_service = SaleService()
+    sale_service.esp32_service = FakeESP32Service()
+
+    capture = CapturingSocketIO()
+    app_module.socketio = capture
+
+    def step():
+        # Fin de la ventana de agrupación (entre ventas pasa mucho más que 100 ms)
+        if coalesce:
+            machine_events.flush()
+
+    seconds_between_sales = 60 / sales_per_minute
+    next_check = MONITOR_INTERVAL_SECONDS
+    for i in range(sales_per_minute):
+        now = i * seconds_between_sales
+        while next_check <= now:
+            # Los ciclos de las ventas anteriores ya terminaron
+            db.active_services.update_many({}, {'$set': {'estimated_end_at': datetime.utcnow() - timedelta(seconds=1)}})
+            result = sale_service.check_and_deactivate_machines()
+            if not coalesce and result.get('completed_count'):
+                capture.emit('machine_status_updated')
+            step()
+            next_check += MONITOR_INTERVAL_SECONDS
+
+        result = sale_service.create_sale({
+            'client_id': 'client_001',
+            'employee_id': 'employee_001',
+            'store_id': 'store_001',
+            'items': [
+                {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': catalog['washers'][i]},
+                {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': catalog['dryers'][i]}
+            ],
+            'payment_methods': [{'payment_type': 'efectivo', 'amount': 60.0}]
+        })
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        result = sale_service.complete_sale(result['data']['_id'])
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        if not coalesce:
+            capture.emit('machine_status_updated', None)
+        step()
+
+    return capture
+
+def run(sales_per_minute: int):
+    print(f"Tienda con {sales_per_minute} ventas/minuto (lavadora + secadora), monitor cada {MONITOR_INTERVAL_SECONDS} s")
+    for label, coalesce in (('antes (documento completo)', False), ('después (machines_changed)', True)):
+        capture = simulate(sales_per_minute, coalesce)
+        detail = ', '.join(
+            f"{event}={count} ({capture.bytes[event]} B)" for event, count in sorted(capture.events.items())
+        )
+        print(f"  {label:28} {sum(capture.events.values()):4} eventos/min  "
+              f"{sum(capture.bytes.values()):7} bytes/min  [{detail}]")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sales-per-minute', type=int, default=20)
+    args = parser.parse_args()
+    run(args.sales_per_minute)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark: viajes de ida y vuelta a MongoDB por create_sale y complete_sale.
+Ejecutar: python benchmarks/sale_round_trips.py
+"""
+
+from common import CommandCounter, FakeESP32Service, connect_database, seed_catalog, format_counts, timed
+
+def run():
+    counter = CommandCounter()
+    db = connect_database(counter)
+    catalog = seed_catalog(db)
+
+    from app.services.sale_service import SaleService
+    sale_service = SaleService()
+    sale_service.esp32_service = FakeESP32Service()
+
+    sale_data = {
+        'client_id': 'client_001',
+        'employee_id': 'employee_001',
+        'store_id': 'store_001',
+        'items': [
+            {'product_id': catalog['products'][0], 'quantity': 1},
+            {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': catalog['washers'][0]},
+            {'service_cycle_id': catalog['service_cycles'][0], 'machine_id': catalog['dryers'][0]}
+        ],
+        'payment_methods': [{'payment_type': 'efectivo', 'amount': 65.0}]
+    }
+
+    counter.reset()
+    result, elapsed = timed(sale_service.create_sale, sale_data)
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    print(f"create_sale   (1 producto, 2 servicios): {format_counts(counter)} - {elapsed:.1f} ms")
+
+    counter.reset()
+    result, elapsed = timed(sale_service.complete_sale, result['data']['_id'])
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    print(f"complete_sale (2 servicios):             {format_counts(counter)} - {elapsed:.1f} ms")
+
+if __name__ == '__main__':
+    run()
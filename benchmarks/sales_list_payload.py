@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tamaño de la respuesta y latencia del listado de ventas
+con el documento completo frente a fields=_id,status,total_amount,created_at.
+Ejecutar: python benchmarks/sales_list_payload.py [--sales N] [--per-page N] [--repeat N]
+"""
+
+import argparse
+import json
+import statistics
+from datetime import datetime, timedelta
+
+from common import CommandCounter, connect_database, timed
+
+LIST_FIELDS = ['_id', 'status', 'total_amount', 'created_at']
+
+def seed_sales(db, sales: int):
+    """Insertar ventas con carritos de tres productos y tres servicios"""
+    start = datetime.utcnow() - timedelta(days=30)
+    db.sales.insert_many([
+        {
+            'client_id': f'client_{i % 50}',
+            'employee_id': 'employee_001',
+            'store_id': 'store_001',
+            'status': 'completed',
+            'total_amount': 105.0,
+            'payment_methods': [{'payment_type': 'efectivo', 'amount': 105.0}],
+            'items': {
+                'products': [
+                    {'product_id': f'product_{j}', 'product_name': f'Producto {j}', 'quantity': 1,
+                     'unit_price': 5.0, 'subtotal': 5.0}
+                    for j in range(3)
+                ],
+                'services': [
+                    {'service_cycle_id': 'cycle_001', 'service_name': 'Lavado normal', 'machine_id': f'machine_{j}',
+                     'machine_type': 'lavadora', 'machine_numero': j + 1, 'price': 30.0, 'duration': 30,
+                     'status': 'completed', 'started_at': start, 'estimated_end_at': start, 'completed_at': start}
+                    for j in range(3)
+                ]
+            },
+            'created_at': start + timedelta(minutes=i)
+        }
+        for i in range(sales)
+    ])
+
+def measure(sale_service, per_page: int, repeat: int, fields):
+    """Latencia mediana (consulta + serialización) y bytes de la respuesta"""
+    timings = []
+    payload = b''
+    for _ in range(repeat):
+        result, elapsed_query = timed(sale_service.get_sales_list, 1, per_page, fields=fields)
+        payload, elapsed_dump = timed(lambda: json.dumps(result['data'], default=str).encode('utf-8'))
+        timings.append(elapsed_query + elapsed_dump)
+    return statistics.median(timings), len(payload)
+
+def run(sales: int, per_page: int, repeat: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    seed_sales(db, sales)
+
+    from app.services.sale_service import SaleService
+    sale_service = SaleService()
+
+    full_ms, full_bytes = measure(sale_service, per_page, repeat, None)
+    narrow_ms, narrow_bytes = measure(sale_service, per_page, repeat, LIST_FIELDS)
+
+    print(f"Listado de {per_page} ventas (mediana de {repeat})")
+    narrow_label = f"fields={','.join(LIST_FIELDS)}"
+    print(f"  {'Documento completo':<45} {full_bytes:>8} bytes - {full_ms:.1f} ms")
+    print(f"  {narrow_label:<45} {narrow_bytes:>8} bytes - {narrow_ms:.1f} ms")
+    print(f"  Reducción del payload: {100 * (1 - narrow_bytes / full_bytes):.0f}%")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sales', type=int, default=1000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.sales, args.per_page, args.repeat)
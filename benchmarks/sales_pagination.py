@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: paginación de /api/sales por página (skip + count_documents)
+frente a paginación por cursor (keyset, sin total).
+Ejecutar: python benchmarks/sales_pagination.py [--sales N] [--per-page N]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from common import CommandCounter, connect_database, timed
+
+DEPTHS = [1, 10, 100, 1000]
+
+def seed_sales(db, sales: int):
+    """Insertar un historial de ventas con created_at creciente"""
+    start = datetime.utcnow() - timedelta(days=365)
+    batch = []
+    for i in range(sales):
+        batch.append({
+            'client_id': f'client_{i % 50}',
+            'employee_id': 'employee_001',
+            'store_id': 'store_001',
+            'status': 'finalized' if i % 10 else 'completed',
+            'total_amount': 30.0,
+            'items': {'products': [], 'services': []},
+            'created_at': start + timedelta(seconds=i * 30)
+        })
+        if len(batch) == 5000:
+            db.sales.insert_many(batch)
+            batch = []
+    if batch:
+        db.sales.insert_many(batch)
+
+def run(sales: int, per_page: int):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    seed_sales(db, sales)
+
+    from app.services.sale_service import SaleService
+    try:
+        from app.repositories.index_registry import index_registry
+        index_registry.ensure_indexes()
+    except ImportError:
+        pass
+    sale_service = SaleService()
+
+    depths = [depth for depth in DEPTHS if depth * per_page <= sales]
+    print(f"{sales} ventas, {per_page} por página")
+
+    for depth in depths:
+        _, elapsed = timed(sale_service.get_sales_list, depth, per_page)
+        print(f"  Por página, página {depth:>4}:              {elapsed:7.1f} ms")
+
+    after = ''
+    page = 0
+    for depth in depths:
+        # Recorrer con cursores hasta la misma profundidad; solo se mide la última página
+        while page < depth - 1:
+            after = sale_service.get_sales_list(per_page=per_page, after=after, count='none')['pagination']['next_cursor']
+            page += 1
+        _, elapsed = timed(sale_service.get_sales_list, per_page=per_page, after=after, count='none')
+        print(f"  Por cursor, página {depth:>4} (sin total):  {elapsed:7.1f} ms")
+
+    for count in ('exact', 'estimated'):
+        _, elapsed = timed(sale_service.get_sales_list, per_page=per_page, after='', count=count)
+        print(f"  Primera página por cursor, count={count:<9}: {elapsed:7.1f} ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sales', type=int, default=50000)
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+    run(args.sales, args.per_page)
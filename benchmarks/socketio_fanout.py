@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: entrega de eventos Socket.IO con N workers.
+Cada evento se emite desde un worker (como sale_routes o el monitor) y se
+mide cuánto tarda en llegar a un cliente conectado a cada worker: sin cola
+de mensajes solo lo reciben los clientes del mismo proceso; con cola
+(SOCKETIO_MESSAGE_QUEUE) lo reciben todos.
+
+Por defecto la cola es un servidor Redis simulado en este proceso
+(requiere: pip install redis fakeredis). Con --queue redis://host:6379/0
+se usa un Redis real.
+Ejecutar: python benchmarks/socketio_fanout.py [--workers N] [--events N] [--queue URL]
+"""
+
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+CHANNEL = 'lavanderia-socketio-bench'
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def serve_worker(port: int, queue: str):
+    """Worker: Flask-SocketIO configurado como en create_app, con un endpoint que emite"""
+    import logging
+    from flask import Flask, request
+    from flask_socketio import SocketIO
+
+    logging.disable(logging.CRITICAL)
+    app = Flask(__name__)
+    socketio = SocketIO(app, message_queue=queue or None, channel=CHANNEL, async_mode='threading')
+
+    @app.route('/emit', methods=['POST'])
+    def emit():
+        socketio.emit('bench_event', request.get_json())
+        return {'success': True}
+
+    @app.route('/health')
+    def health():
+        return {'success': True}
+
+    socketio.run(app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True, log_output=False)
+
+def start_fake_redis() -> str:
+    """Servidor con protocolo Redis en memoria (sustituto local de Redis)"""
+    from fakeredis import TcpFakeServer
+
+    port = free_port()
+    server = TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'redis://127.0.0.1:{port}/0'
+
+def start_workers(workers: int, queue: str):
+    ports = [free_port() for _ in range(workers)]
+    processes = [
+        subprocess.Popen([sys.executable, __file__, '--serve', str(port), '--queue', queue or ''],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for port in ports
+    ]
+    for port in ports:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                requests.get(f'http://127.0.0.1:{port}/health', timeout=1)
+                break
+            except requests.RequestException:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'El worker del puerto {port} no inició')
+                time.sleep(0.1)
+    return ports, processes
+
+def measure(workers: int, events: int, queue: str):
+    """Emitir eventos repartidos entre los workers y medir la entrega a un cliente por worker"""
+    import socketio
+
+    ports, processes = start_workers(workers, queue)
+    received = {}
+    condition = threading.Condition()
+    clients = []
+    try:
+        for index, port in enumerate(ports):
+            client = socketio.Client()
+
+            def on_event(data, index=index):
+                with condition:
+                    received[(data['seq'], index)] = time.perf_counter()
+                    condition.notify_all()
+
+            client.on('bench_event', on_event)
+            client.connect(f'http://127.0.0.1:{port}', transports=['polling'])
+            clients.append(client)
+        time.sleep(0.5)
+
+        session = requests.Session()
+        same_worker, other_workers = [], []
+        delivered = 0
+        for seq in range(events):
+            origin = seq % workers
+            sent_at = time.perf_counter()
+            session.post(f'http://127.0.0.1:{ports[origin]}/emit', json={'seq': seq})
+            with condition:
+                condition.wait_for(
+                    lambda: all((seq, index) in received for index in range(workers)),
+                    timeout=1 if queue else 0.2
+                )
+                for index in range(workers):
+                    if (seq, index) in received:
+                        delivered += 1
+                        latency = (received[(seq, index)] - sent_at) * 1000
+                        (same_worker if index == origin else other_workers).append(latency)
+
+        return delivered / (events * workers), same_worker, other_workers
+    finally:
+        for client in clients:
+            client.disconnect()
+        for process in processes:
+            process.terminate()
+
+def describe(latencies) -> str:
+    if not latencies:
+        return 'sin entregas'
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    return f'p50 {statistics.median(latencies):6.1f} ms  p95 {p95:6.1f} ms'
+
+def run(workers: int, events: int, queue: str):
+    print(f"{events} eventos, {workers} workers, un cliente por worker")
+    for label, url in (('sin cola (en proceso)', None), ('con cola de mensajes', queue or start_fake_redis())):
+        ratio, same_worker, other_workers = measure(workers, events, url)
+        print(f"  {label:22} entregados {ratio * 100:5.1f}%  "
+              f"mismo worker: {describe(same_worker)}  otros workers: {describe(other_workers)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--queue', default=None)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve_worker(args.serve, args.queue)
+    else:
+        run(args.workers, args.events, args.queue)
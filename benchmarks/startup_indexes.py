@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: costo de construir repositorios y de iniciar la aplicación
+(comandos createIndexes enviados y tiempo).
+Ejecutar: python benchmarks/startup_indexes.py [--constructions N]
+"""
+
+import argparse
+import importlib
+
+from common import CommandCounter, connect_database, format_counts, timed
+
+ROUTE_MODULES = [
+    'auth_routes', 'employee_routes', 'client_routes', 'product_routes', 'washer_routes',
+    'dryer_routes', 'card_routes', 'service_cycle_routes', 'sale_routes'
+]
+
+def import_routes():
+    """Importar los blueprints (instancian los servicios a nivel de módulo)"""
+    for module in ROUTE_MODULES:
+        importlib.import_module(f'app.routes.{module}')
+
+def construct_per_request(constructions: int):
+    """Repositorios construidos por request (role_required, validate_nfc_payment)"""
+    from app.services.auth_service import AuthService
+    from app.repositories.user_client_repository import UserClientRepository
+    for _ in range(constructions):
+        AuthService()
+        UserClientRepository()
+
+def run(constructions: int):
+    counter = CommandCounter()
+    # En este benchmark createIndexes es justamente lo que se mide
+    counter.IGNORED_COMMANDS = CommandCounter.IGNORED_COMMANDS - {'createIndexes'}
+    connect_database(counter)
+
+    try:
+        from app.repositories.index_registry import index_registry
+    except ImportError:
+        index_registry = None
+
+    if index_registry is not None:
+        counter.reset()
+        _, elapsed = timed(index_registry.ensure_indexes)
+        print(f"Aplicar índices (una vez):          {format_counts(counter)} - {elapsed:.1f} ms")
+
+    counter.reset()
+    _, elapsed = timed(import_routes)
+    print(f"Importar blueprints:                {format_counts(counter)} - {elapsed:.1f} ms")
+
+    counter.reset()
+    _, elapsed = timed(construct_per_request, constructions)
+    print(f"{constructions} requests (AuthService + repo): {format_counts(counter)} - {elapsed:.1f} ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--constructions', type=int, default=200)
+    args = parser.parse_args()
+    run(args.constructions)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: verificación de tokens revocados por request.
+Compara una consulta a 'revoked_tokens' por verificación con la lista en
+memoria (TokenBlocklist) y mide cuánto tarda un logout en verse desde otro worker.
+Ejecutar: python benchmarks/token_revocation.py [--revoked N] [--checks N] [--sync-seconds S]
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from common import CommandCounter, connect_database, format_counts, timed
+
+def seed_revoked(db, revoked: int):
+    """Insertar revocaciones vigentes"""
+    now = datetime.utcnow()
+    db.revoked_tokens.insert_many([
+        {'jti': str(uuid.uuid4()), 'user_id': f'user_{i % 100}',
+         'expires_at': now + timedelta(hours=1), 'revoked_at': now}
+        for i in range(revoked)
+    ])
+
+def run(revoked: int, checks: int, sync_seconds: float):
+    counter = CommandCounter()
+    db = connect_database(counter)
+    seed_revoked(db, revoked)
+
+    from app.repositories.index_registry import index_registry
+    from app.services.token_blocklist import TokenBlocklist
+    index_registry.ensure_indexes()
+
+    jtis = [str(uuid.uuid4()) for _ in range(checks)]
+
+    def check_in_database():
+        for jti in jtis:
+            db.revoked_tokens.find_one({'jti': jti}, {'_id': 1})
+
+    counter.reset()
+    _, elapsed = timed(check_in_database)
+    print(f"{revoked} revocados, {checks} verificaciones")
+    print(f"Consulta por request:   {format_counts(counter)} - {elapsed:.1f} ms ({elapsed * 1000 / checks:.1f} µs/verificación)")
+
+    worker_a = TokenBlocklist(sync_seconds=sync_seconds)
+    worker_b = TokenBlocklist(sync_seconds=sync_seconds)
+
+    def check_in_memory():
+        for jti in jtis:
+            worker_a.is_revoked(jti)
+
+    counter.reset()
+    _, elapsed = timed(check_in_memory)
+    print(f"Lista en memoria:       {format_counts(counter)} - {elapsed:.1f} ms ({elapsed * 1000 / checks:.1f} µs/verificación)")
+
+    # Propagación: el worker A revoca y el worker B lo ve en su siguiente sincronización
+    worker_b.is_revoked('warmup')
+    jti = str(uuid.uuid4())
+    worker_a.revoke(jti, 'user_0', datetime.utcnow() + timedelta(hours=1))
+    start = time.perf_counter()
+    while not worker_b.is_revoked(jti):
+        time.sleep(0.05)
+    print(f"Logout visible en otro worker tras {time.perf_counter() - start:.2f} s (sync cada {sync_seconds} s)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--revoked', type=int, default=10000)
+    parser.add_argument('--checks', type=int, default=5000)
+    parser.add_argument('--sync-seconds', type=float, default=5)
+    args = parser.parse_args()
+    run(args.revoked, args.checks, args.sync_seconds)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: comandos HTTP al microservicio ESP32 / NFC.
+Compara requests.post por comando (una conexión TCP nueva cada vez) con el
+cliente keep-alive compartido (HttpClient), contra un servidor local que
+simula el microservicio y cuenta las conexiones aceptadas.
+Ejecutar: python benchmarks/upstream_http.py [--commands N] [--threads N] [--delay-ms N]
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import common  # noqa: F401 (agrega la raíz del proyecto al path)
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """Responde como /send-to-esp32 con keep-alive (HTTP/1.1)"""
+
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo van en escrituras separadas; sin esto Nagle agrega ~40 ms con keep-alive
+    disable_nagle_algorithm = True
+    delay_seconds = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        body = json.dumps({'success': True}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class CountingServer(ThreadingHTTPServer):
+    """Servidor que cuenta las conexiones TCP aceptadas"""
+
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+def measure(send, commands: int, threads: int):
+    """Latencias (ms) de enviar 'commands' comandos desde 'threads' hilos"""
+    def one(_):
+        start = time.perf_counter()
+        response = send()
+        response.content
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return sorted(executor.map(one, range(commands)))
+
+def report(name: str, latencies, connections: int):
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"  {name:<26} p50 {statistics.median(latencies):6.2f} ms  p99 {p99:6.2f} ms  "
+          f"conexiones TCP {connections}")
+
+def run(commands: int, threads: int, delay_ms: float):
+    from app.utils.http_client import HttpClient
+
+    FakeUpstreamHandler.delay_seconds = delay_ms / 1000
+    server = CountingServer(('127.0.0.1', 0), FakeUpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    payload = {'esp32_url': 'http://192.168.1.100/laundry-update', 'laundry_data': {'status': 'starting'}}
+
+    print(f"{commands} comandos desde {threads} hilos (upstream con {delay_ms} ms de proceso)")
+
+    server.connections = 0
+    latencies = measure(lambda: requests.post(f"{base_url}/send-to-esp32", json=payload, timeout=10), commands, threads)
+    report('requests.post por comando', latencies, server.connections)
+
+    client = HttpClient('esp32', base_url, pool_size=threads)
+    server.connections = 0
+    latencies = measure(lambda: client.post('/send-to-esp32', json=payload), commands, threads)
+    report('sesión keep-alive', latencies, server.connections)
+    print(f"  histograma del cliente: {client.get_stats()['latency']}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--delay-ms', type=float, default=0)
+    args = parser.parse_args()
+    run(args.commands, args.threads, args.delay_ms)
@@ -16,16 +16,73 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 3600)))
     JWT_ALGORITHM = 'HS256'
     
+    # Caché de perfiles de usuario (role_required usa los claims del token; la caché sirve el perfil completo)
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 1024))
+    
+    # Contraseñas: costo de bcrypt (los hashes con otro costo se regeneran al iniciar sesión)
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    # Pool acotado para bcrypt: hilos, operaciones en espera antes de rechazar (503) y espera máxima
+    PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_POOL_QUEUE_LIMIT = int(os.environ.get('PASSWORD_POOL_QUEUE_LIMIT', 32))
+    PASSWORD_POOL_WAIT_SECONDS = float(os.environ.get('PASSWORD_POOL_WAIT_SECONDS', 10))
+    
+    # Tokens revocados: segundos máximos para que un logout se aplique en los demás workers
+    TOKEN_REVOCATION_SYNC_SECONDS = int(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', 5))
+    
     # Configuración de MongoDB
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/lavanderia_db'
+    # Aplicar los índices de los repositorios al iniciar (si es False, usar ensure_indexes.py)
+    MONGODB_ENSURE_INDEXES = os.environ.get('MONGODB_ENSURE_INDEXES', 'true').lower() == 'true'
     
     # Configuración de CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5173').split(',')
     
+    # Socket.IO entre procesos: con una cola de mensajes (redis://, amqp://, kafka://, ...) cualquier
+    # worker o nodo puede emitir a todos los navegadores. Vacío = solo los conectados a este proceso
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'lavanderia-socketio')
+    # Las conexiones Socket.IO se autentican con el JWT y reciben solo los eventos de su tienda
+    SOCKETIO_REQUIRE_AUTH = os.environ.get('SOCKETIO_REQUIRE_AUTH', 'true').lower() == 'true'
+    # Cambios de máquinas agrupados en 'machines_changed' (solo campos cambiados) cada MACHINE_EVENTS_WINDOW_MS;
+    # MACHINE_EVENTS_LEGACY emite además el 'machine_updated' con el documento completo
+    MACHINE_EVENTS_COALESCE = os.environ.get('MACHINE_EVENTS_COALESCE', 'true').lower() == 'true'
+    MACHINE_EVENTS_WINDOW_MS = int(os.environ.get('MACHINE_EVENTS_WINDOW_MS', 100))
+    MACHINE_EVENTS_LEGACY = os.environ.get('MACHINE_EVENTS_LEGACY', 'false').lower() == 'true'
+    
     # Configuración de la aplicación
     FLASK_ENV = os.environ.get('FLASK_ENV', 'development')
     DEBUG = FLASK_ENV == 'development'
     
+    # Microservicios auxiliares (clientes HTTP keep-alive)
+    ESP32_SERVICE_URL = os.environ.get('ESP32_SERVICE_URL', 'http://localhost:5002')
+    NFC_SERVICE_URL = os.environ.get('NFC_SERVICE_URL', 'http://localhost:5001')
+    # Conexiones keep-alive conservadas por microservicio
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+    # Timeouts en segundos (conexión, lectura); la espera de tarjeta NFC usa su propio timeout + 5
+    ESP32_CONNECT_TIMEOUT = float(os.environ.get('ESP32_CONNECT_TIMEOUT', 3))
+    ESP32_READ_TIMEOUT = float(os.environ.get('ESP32_READ_TIMEOUT', 10))
+    NFC_CONNECT_TIMEOUT = float(os.environ.get('NFC_CONNECT_TIMEOUT', 2))
+    NFC_READ_TIMEOUT = float(os.environ.get('NFC_READ_TIMEOUT', 5))
+    # Vigencia del directorio en memoria esp32_id -> URL (colección esp32_config)
+    ESP32_DIRECTORY_TTL_SECONDS = int(os.environ.get('ESP32_DIRECTORY_TTL_SECONDS', 60))
+    # Bandeja de comandos ESP32: si está activa, las ventas y el monitor no esperan a las placas
+    ESP32_OUTBOX_ENABLED = os.environ.get('ESP32_OUTBOX_ENABLED', 'true').lower() == 'true'
+    ESP32_OUTBOX_CONCURRENCY = int(os.environ.get('ESP32_OUTBOX_CONCURRENCY', 4))
+    ESP32_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('ESP32_OUTBOX_MAX_ATTEMPTS', 5))
+    ESP32_OUTBOX_BACKOFF_SECONDS = float(os.environ.get('ESP32_OUTBOX_BACKOFF_SECONDS', 2))
+    ESP32_OUTBOX_MAX_BACKOFF_SECONDS = float(os.environ.get('ESP32_OUTBOX_MAX_BACKOFF_SECONDS', 60))
+    ESP32_OUTBOX_POLL_SECONDS = float(os.environ.get('ESP32_OUTBOX_POLL_SECONDS', 2))
+    
+    # Configuración del monitor de máquinas
+    # Barrido de reconciliación de respaldo; la finalización normal la dispara el planificador por fecha límite
+    MONITOR_RECONCILE_SECONDS = int(os.environ.get('MONITOR_RECONCILE_SECONDS', 300))
+    # Con varios workers o nodos, solo la instancia con el lease 'machine_monitor' ejecuta el monitor.
+    # Si el líder cae, otra instancia lo releva en como máximo MONITOR_LEASE_SECONDS
+    MONITOR_LEADER_ELECTION = os.environ.get('MONITOR_LEADER_ELECTION', 'true').lower() == 'true'
+    MONITOR_LEASE_SECONDS = float(os.environ.get('MONITOR_LEASE_SECONDS', 15))
+    MONITOR_HEARTBEAT_SECONDS = float(os.environ.get('MONITOR_HEARTBEAT_SECONDS', 5))
+    
     # Configuración de paginación
     DEFAULT_PAGE_SIZE = 10
     MAX_PAGE_SIZE = 100
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script para aplicar los índices declarados por los repositorios y mostrar
+las diferencias con los índices existentes en MongoDB.
+Ejecutar: python ensure_indexes.py            (aplicar y reportar)
+          python ensure_indexes.py --report   (solo reportar, sin cambios)
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Evitar que create_app aplique los índices por su cuenta
+os.environ['MONGODB_ENSURE_INDEXES'] = 'false'
+
+# Agregar el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from app import create_app
+from app.repositories.index_registry import index_registry
+
+def ensure_indexes(report_only: bool = False):
+    """
+    Aplicar índices (opcional) y mostrar el reporte de diferencias
+
+    Args:
+        report_only: Si es True, no se crea ningún índice
+    """
+    # Crear instancia de la aplicación
+    app = create_app(Config)
+
+    with app.app_context():
+        try:
+            if not report_only:
+                print("🚀 Aplicando índices...")
+                for collection_name, names in index_registry.ensure_indexes().items():
+                    print(f"   • {collection_name}: {len(names)} índices")
+
+            drift = index_registry.drift_report()
+            if not drift:
+                print("✅ Los índices existentes coinciden con los declarados")
+                return True
+
+            print("⚠️  Diferencias encontradas:")
+            for collection_name, differences in drift.items():
+                print(f"   • {collection_name}")
+                for kind, names in differences.items():
+                    if names:
+                        print(f"       {kind}: {', '.join(names)}")
+
+        except Exception as e:
+            print(f"❌ Error al procesar índices: {e}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🏪 LAVANDERÍA PURIMATIC - Índices de MongoDB")
+    print("=" * 60)
+
+    # Verificar variables de entorno
+    if not os.getenv('MONGODB_URI'):
+        print("❌ Error: MONGODB_URI no está configurada")
+        print("Asegúrate de tener el archivo .env con la configuración correcta")
+        sys.exit(1)
+
+    if not ensure_indexes(report_only='--report' in sys.argv):
+        print("\n❌ El proceso falló. Revisa los errores anteriores.")
+        sys.exit(1)
@@ -41,6 +41,9 @@ const SalesPage = () => {
 
   // Ref para la conexión WebSocket
   const socketRef = useRef(null);
+  // Última versión de 'machines_changed' recibida por emisor y tienda (para detectar mensajes perdidos)
+  const machineVersionsRef = useRef({});
+  const machinesRef = useRef([]);
 
   const getStatusText = (estado) => {
     switch(estado) {
@@ -136,6 +139,21 @@ const SalesPage = () => {
     }
   }, [machines, serviceCycles]);
 
+  useEffect(() => {
+    machinesRef.current = machines;
+  }, [machines]);
+
+  // Cargar todas las máquinas activas (carga inicial o tras perder un 'machines_changed')
+  const reloadMachines = async () => {
+    const washersData = await getAllActiveWashers();
+    const dryersData = await getAllActiveDryers();
+    const allMachines = [
+      ...(washersData.data?.map(w => ({ ...w, tipo: 'lavadora' })) || []),
+      ...(dryersData.data?.map(d => ({ ...d, tipo: 'secadora' })) || []),
+    ];
+    setMachines(allMachines);
+  };
+
   // Función para actualizar las ventas y máquinas (separada del WebSocket)
   const fetchAndUpdateSalesAndMachines = useCallback(async () => {
     try {
@@ -166,13 +184,7 @@ const SalesPage = () => {
         const productsData = await getProducts();
         setProducts(productsData.data.products || []);
 
-        const washersData = await getAllActiveWashers();
-        const dryersData = await getAllActiveDryers();
-        const allMachines = [
-          ...(washersData.data?.map(w => ({ ...w, tipo: 'lavadora' })) || []),
-          ...(dryersData.data?.map(d => ({ ...d, tipo: 'secadora' })) || []),
-        ];
-        setMachines(allMachines);
+        await reloadMachines();
 
         const serviceCyclesData = await getServiceCycles();
         setServiceCycles(serviceCyclesData.data || []);
@@ -201,6 +213,8 @@ const SalesPage = () => {
     if (!socketRef.current) {
       console.log('Creando conexión WebSocket...');
       socketRef.current = io(API_BASE_URL, {
+        // El servidor autentica la conexión y solo envía los eventos de la tienda del usuario
+        auth: (cb) => cb({ token: localStorage.getItem('token') }),
         autoConnect: true,
         reconnection: true,
         reconnectionDelay: 1000,
@@ -227,32 +241,42 @@ const SalesPage = () => {
         fetchAndUpdateSalesAndMachines();
       });
 
-      socketRef.current.on('machine_status_updated', () => {
-        console.log('Estado de máquinas actualizado por WebSocket.');
-        // Eliminado: fetchAndUpdateSalesAndMachines(); // Ahora machine_updated lo maneja
-      });
+      // Cambios de máquinas agrupados: solo llegan los campos que cambiaron
+      socketRef.current.on('machines_changed', (data) => {
+        console.log('Máquinas actualizadas en tiempo real:', data);
+        const { source, version, store_id, machines: changedMachines } = data;
+
+        // Un salto de versión significa que se perdió un mensaje: recargar las máquinas completas
+        const versionKey = `${source}:${store_id}`;
+        const lastVersion = machineVersionsRef.current[versionKey];
+        machineVersionsRef.current[versionKey] = version;
+        if (lastVersion !== undefined && version !== lastVersion + 1) {
+          reloadMachines().catch(err => console.error('Error recargando máquinas:', err));
+        } else {
+          const changesById = Object.fromEntries(changedMachines.map(m => [m.machine_id, m.changes]));
+          setMachines(prevMachines =>
+            prevMachines.map(machine => {
+              const changes = changesById[machine._id];
+              if (!changes) return machine;
+              const updated = { ...machine, ...changes };
+              // Los campos eliminados llegan como null
+              Object.keys(changes).forEach(key => {
+                if (changes[key] === null) delete updated[key];
+              });
+              return updated;
+            })
+          );
+        }
 
-      // Nuevo listener para actualizaciones específicas de máquinas
-      socketRef.current.on('machine_updated', (data) => {
-        console.log('Máquina actualizada en tiempo real:', data);
-        const { machine_id, machine_data, operation } = data;
-        
-        // Actualizar solo esta máquina específica en el estado
-        setMachines(prevMachines => 
-          prevMachines.map(machine => 
-            machine._id === machine_id ? { ...machine, ...machine_data } : machine
-          )
-        );
-        
         // Mostrar notificación según la operación
-        if (operation === 'activated') {
-          toast.success(`⚡ Máquina ${machine_data.numero} activada`);
-        } else if (operation === 'available') {
-          toast.success(`✅ Máquina ${machine_data.numero} disponible`);
-        }
-        
-        // Actualizar ciclos activos (esto ahora depende del estado 'machines' actualizado)
-        fetchAndUpdateActiveCycles();
+        changedMachines.forEach(({ machine_id, operation }) => {
+          const numero = machinesRef.current.find(machine => machine._id === machine_id)?.numero;
+          if (operation === 'activated') {
+            toast.success(`⚡ Máquina ${numero ?? ''} activada`);
+          } else if (operation === 'available') {
+            toast.success(`✅ Máquina ${numero ?? ''} disponible`);
+          }
+        });
       });
 
       socketRef.current.on('services_completed', (data) => {
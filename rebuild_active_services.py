@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script para regenerar el índice de servicios activos (colección 'active_services')
+a partir de la colección 'sales'.
+Ejecutar: python rebuild_active_services.py
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Agregar el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from app import create_app
+from app.repositories.sale_repository import SaleRepository
+from app.repositories.active_service_repository import ActiveServiceRepository
+
+def rebuild_active_services():
+    """
+    Regenerar el índice de servicios activos desde las ventas
+    """
+    print("🚀 Regenerando índice de servicios activos...")
+
+    # Crear instancia de la aplicación
+    app = create_app(Config)
+
+    with app.app_context():
+        try:
+            active_service_repository = ActiveServiceRepository()
+            count = active_service_repository.rebuild_from_sales(SaleRepository())
+
+            print(f"✅ Índice regenerado: {count} servicios activos")
+
+            for row in active_service_repository.find_all_active():
+                print(f"   • Venta {row['sale_id']} [{row['service_index']}] - máquina {row['machine_id']} - fin estimado {row['estimated_end_at']}")
+
+        except Exception as e:
+            print(f"❌ Error al regenerar índice: {e}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🏪 LAVANDERÍA PURIMATIC - Índice de servicios activos")
+    print("=" * 60)
+
+    # Verificar variables de entorno
+    if not os.getenv('MONGODB_URI'):
+        print("❌ Error: MONGODB_URI no está configurada")
+        print("Asegúrate de tener el archivo .env con la configuración correcta")
+        sys.exit(1)
+
+    if not rebuild_active_services():
+        print("\n❌ El proceso falló. Revisa los errores anteriores.")
+        sys.exit(1)
@@ -1,8 +1,8 @@
 from app import create_app, socketio # Importar socketio
 from config import get_config
 
-# Crear la aplicación Flask
-app = create_app(get_config())
+# Crear la aplicación Flask (con despachador ESP32 y monitor de máquinas)
+app = create_app(get_config(), background_workers=True)
 
 if __name__ == '__main__':
     socketio.run(
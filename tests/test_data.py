@@ -3,7 +3,7 @@ Datos de prueba para el sistema de lavandería
 """
 
 from datetime import datetime
-from app.utils.auth_utils import hash_password
+from app.utils.auth_utils import hash_passwords
 
 # Datos de tiendas (se asumeque ya existen en MongoDB)
 STORES_DATA = [
@@ -33,12 +33,17 @@ STORES_DATA = [
     }
 ]
 
+# Hashes de las contraseñas de empleados, generados en paralelo
+ADMIN_PASSWORD_HASH, CENTRO_PASSWORD_HASH, NORTE_PASSWORD_HASH = hash_passwords([
+    "AdminPurimatic2024!", "Empleado123!", "Empleado123!"
+])
+
 # Datos de empleados
 EMPLOYEES_DATA = [
     {
         "username": "admin",
         "email": "admin@purimatic.com",
-        "password_hash": hash_password("AdminPurimatic2024!"),
+        "password_hash": ADMIN_PASSWORD_HASH,
         "role": "admin",
         "store_id": "store_001",
         "is_active": True,
@@ -48,7 +53,7 @@ EMPLOYEES_DATA = [
     {
         "username": "empleado_centro",
         "email": "empleado.centro@purimatic.com", 
-        "password_hash": hash_password("Empleado123!"),
+        "password_hash": CENTRO_PASSWORD_HASH,
         "role": "empleado",
         "store_id": "store_001",
         "is_active": True,
@@ -58,7 +63,7 @@ EMPLOYEES_DATA = [
     {
         "username": "empleado_norte",
         "email": "empleado.norte@purimatic.com",
-        "password_hash": hash_password("Empleado123!"),
+        "password_hash": NORTE_PASSWORD_HASH,
         "role": "empleado", 
         "store_id": "store_002",
         "is_active": True,
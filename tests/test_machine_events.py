@@ -0,0 +1,88 @@
+"""
+Pruebas de los cambios de máquinas agrupados ('machines_changed') con varios workers
+"""
+
+import pytest
+
+import app as app_module
+from app.services.machine_events import MachineEventCoalescer
+
+STORE_ID = 'store_001'
+MACHINE_ID = 'machine_001'
+
+AVAILABLE = {'_id': MACHINE_ID, 'numero': 1, 'store_id': STORE_ID, 'estado': 'disponible'}
+OCCUPIED = {
+    **AVAILABLE,
+    'estado': 'ocupada',
+    'current_service': {'sale_id': 'sale_001', 'service_index': 0}
+}
+REOCCUPIED = {
+    **AVAILABLE,
+    'estado': 'ocupada',
+    'current_service': {'sale_id': 'sale_002', 'service_index': 0}
+}
+
+class CapturingSocketIO:
+    """Sustituto de Flask-SocketIO que guarda los eventos emitidos"""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, data=None, to=None, **kwargs):
+        self.events.append((event, data))
+
+@pytest.fixture
+def socketio(monkeypatch):
+    capture = CapturingSocketIO()
+    monkeypatch.setattr(app_module, 'socketio', capture)
+    return capture
+
+def publish_and_flush(coalescer, machine, operation, previous=None):
+    """Publicar un cambio y emitirlo sin esperar la ventana"""
+    coalescer.publish(MACHINE_ID, machine, operation, previous=previous)
+    coalescer.flush()
+
+def last_changes(socketio):
+    event, data = socketio.events[-1]
+    assert event == 'machines_changed'
+    return data['machines'][0]['changes']
+
+def test_reactivation_after_release_by_another_worker(socketio):
+    worker = MachineEventCoalescer()
+    leader = MachineEventCoalescer()
+
+    # El worker ocupa la máquina; el líder del monitor la libera
+    publish_and_flush(worker, OCCUPIED, 'activated', previous=AVAILABLE)
+    assert last_changes(socketio)['estado'] == 'ocupada'
+    publish_and_flush(leader, AVAILABLE, 'available', previous=OCCUPIED)
+    assert last_changes(socketio) == {'estado': 'disponible', 'current_service': None}
+
+    # La copia local del worker sigue en 'ocupada': prevalece el documento anterior indicado
+    publish_and_flush(worker, REOCCUPIED, 'activated', previous=AVAILABLE)
+    changes = last_changes(socketio)
+    assert changes['estado'] == 'ocupada'
+    assert changes['current_service'] == REOCCUPIED['current_service']
+
+def test_state_fields_sent_with_stale_local_copy(socketio):
+    worker = MachineEventCoalescer()
+    leader = MachineEventCoalescer()
+
+    publish_and_flush(worker, OCCUPIED, 'activated', previous=AVAILABLE)
+    publish_and_flush(leader, AVAILABLE, 'available', previous=OCCUPIED)
+
+    # Sin documento anterior el worker compara contra su copia (ya ocupada): el estado viaja igual
+    publish_and_flush(worker, OCCUPIED, 'activated')
+    changes = last_changes(socketio)
+    assert changes['estado'] == 'ocupada'
+    assert changes['current_service'] == OCCUPIED['current_service']
+
+def test_versions_are_consecutive_per_source(socketio):
+    worker = MachineEventCoalescer()
+    leader = MachineEventCoalescer()
+
+    publish_and_flush(worker, OCCUPIED, 'activated', previous=AVAILABLE)
+    publish_and_flush(leader, AVAILABLE, 'available', previous=OCCUPIED)
+    publish_and_flush(worker, REOCCUPIED, 'activated', previous=AVAILABLE)
+
+    versions = [(data['source'], data['version']) for _, data in socketio.events]
+    assert versions == [(worker.source, 1), (leader.source, 1), (worker.source, 2)]
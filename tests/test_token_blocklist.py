@@ -0,0 +1,45 @@
+"""
+Pruebas de la revocación de todos los tokens de un usuario
+"""
+
+from datetime import datetime, timedelta
+import time
+
+import pytest
+
+from app.repositories import revoked_token_repository
+from app.services.token_blocklist import TokenBlocklist, USER_REVOCATION_SKEW_SECONDS
+
+USER_ID = 'user_001'
+
+class InMemoryRevokedTokenRepository:
+    """Sustituto de RevokedTokenRepository que guarda la revocación en memoria"""
+
+    def revoke_user(self, user_id, expires_at):
+        return datetime.utcnow().replace(microsecond=0)
+
+@pytest.fixture
+def blocklist(monkeypatch):
+    monkeypatch.setattr(revoked_token_repository, 'RevokedTokenRepository', InMemoryRevokedTokenRepository)
+    blocklist = TokenBlocklist(sync_seconds=3600)
+    # Sin sincronizaciones con MongoDB durante la prueba
+    monkeypatch.setattr(blocklist, '_maybe_sync', lambda: None)
+    return blocklist
+
+def test_token_issued_before_revocation_is_rejected(blocklist):
+    issued_at = int(time.time()) - USER_REVOCATION_SKEW_SECONDS - 5
+    blocklist.revoke_user(USER_ID, timedelta(hours=1))
+
+    assert blocklist.is_revoked('jti-old', USER_ID, issued_at)
+
+def test_new_token_in_same_second_is_accepted(blocklist):
+    blocklist.revoke_user(USER_ID, timedelta(hours=1))
+    # Inicio de sesión inmediatamente después del cambio de rol: iat trunca al segundo
+    issued_at = int(time.time())
+
+    assert not blocklist.is_revoked('jti-new', USER_ID, issued_at)
+
+def test_other_users_are_not_affected(blocklist):
+    blocklist.revoke_user(USER_ID, timedelta(hours=1))
+
+    assert not blocklist.is_revoked('jti-other', 'user_002', int(time.time()) - 60)